@@ -89,6 +89,32 @@ SERIES_FREQUENCIES = {
     "SWPT": "weekly",
 }
 
+# As-of alignment (see utils.alignment)
+# Tolerance: max days a value is carried after publication (None = until next print)
+# Lag: days between the observation date and its availability
+ALIGNMENT_TOLERANCE_DAYS = {
+    "daily": 0,        # No carry-forward: gaps stay NaN (imputed downstream)
+    "weekly": None,    # H.4.1 levels hold until the next Wednesday
+    "policy": None,    # IORB holds until the next FOMC change
+}
+
+ALIGNMENT_PUBLICATION_LAG_DAYS = {
+    "daily": 0,
+    "weekly": 0,       # Set to 1 for point-in-time backtests (H.4.1 is out Thursday)
+    "policy": 0,
+}
+
+# Per-column overrides (column names, not series IDs)
+ALIGNMENT_OVERRIDES = {
+    # Short carry (weekend + holiday Monday) for TGA and overnight rates
+    "TGA_Balance": {"frequency": "daily", "tolerance_days": 4},
+    "SOFR_Rate": {"tolerance_days": 4},
+    "EFFR_Rate": {"tolerance_days": 4},
+    "TGCR_Rate": {"tolerance_days": 4},
+    "BGCR_Rate": {"frequency": "daily", "tolerance_days": 4},
+    "OBFR_Rate": {"frequency": "daily", "tolerance_days": 4},
+}
+
 # ============================================================================
 # NY Fed API Endpoints
 # ============================================================================
@@ -133,6 +159,18 @@ QTD_WINDOW = "Q"  # Quarter
 ROLLING_3M_DAYS = 63  # ~3 months of business days
 ROLLING_20D_DAYS = 20  # 20-day moving average
 
+# Rolling trend regression (slope history + N-day forecast)
+TREND_WINDOW_DAYS = 20      # Rows per trend fit
+TREND_MIN_PERIODS = 10      # Minimum valid observations per fit
+TREND_FORECAST_PERIODS = 5  # Forecast horizon (rows)
+TREND_COLUMNS = [
+    "Net_Liquidity",
+    "RRP_Balance",
+    "Fed_Total_Assets",
+    "TGA_Balance",
+    "Spread_SOFR_IORB",
+]
+
 # Spike detection thresholds
 SPIKE_THRESHOLD_STD = 2.0  # Standard deviations
 SPIKE_ABSOLUTE_BPS = 10    # Basis points
@@ -146,6 +184,77 @@ STRESS_WEIGHTS = {
     "repo_usage": 0.15
 }
 
+# ============================================================================
+# Alert Rules (see utils.alert_rules)
+# ============================================================================
+# Evaluated over the full history; the report shows the latest alerts
+# (most severe rule per type) and each rule's hit history.
+
+ALERT_RULES = [
+    {"name": "stress_high", "type": "STRESS", "column": "Stress_Index",
+     "op": ">=", "threshold": 75, "persistence": 1, "severity": "CRITICAL",
+     "message": "Stress Index at {value:.0f}/100 (HIGH STRESS)"},
+    {"name": "stress_elevated", "type": "STRESS", "column": "Stress_Index",
+     "op": ">=", "threshold": 50, "persistence": 1, "severity": "WARNING",
+     "message": "Stress Index at {value:.0f}/100 (ELEVATED)"},
+    {"name": "spread_spike_critical", "type": "SPREAD_SPIKE", "column": "Spread_SOFR_IORB_Z20",
+     "op": ">", "threshold": 3.0, "persistence": 1, "severity": "CRITICAL",
+     "message": "SOFR-IORB Spread spike detected: {value:.1f} std above MA20 (CRITICAL)"},
+    {"name": "spread_spike_warning", "type": "SPREAD_SPIKE", "column": "Spread_SOFR_IORB_Z20",
+     "op": ">", "threshold": 2.0, "persistence": 1, "severity": "WARNING",
+     "message": "SOFR-IORB Spread spike detected: {value:.1f} std above MA20 (WARNING)"},
+    {"name": "rrp_large_move", "type": "RRP_FLOW", "column": "RRP_QTD_Pct",
+     "op": "abs>", "threshold": 50, "persistence": 1, "severity": "INFO",
+     "message": "Large RRP movement: {value:+.0f}% QTD"},
+    {"name": "qt_pace_aggressive", "type": "QT_PACE", "column": "QT_Pace_Annualized",
+     "op": "<", "threshold": -1000000, "persistence": 1, "severity": "WARNING",
+     "message": "Aggressive QT pace: ${value:,.0f}M/year annualized"},
+    {"name": "net_liq_very_low", "type": "LIQUIDITY", "column": "Net_Liq_3M_Percentile",
+     "op": "<", "threshold": 10, "persistence": 1, "severity": "WARNING",
+     "message": "Net Liquidity at {value:.0f}th percentile (3M) - Very Low"},
+    {"name": "net_liq_very_high", "type": "LIQUIDITY", "column": "Net_Liq_3M_Percentile",
+     "op": ">", "threshold": 90, "persistence": 1, "severity": "INFO",
+     "message": "Net Liquidity at {value:.0f}th percentile (3M) - Very High"},
+    {"name": "swap_lines_active", "type": "SWAP_LINES", "column": "Swap_Lines",
+     "op": ">", "threshold": 1000, "persistence": 1, "severity": "CRITICAL",
+     "message": "Central Bank Swap Lines active: ${value:,.0f}M"},
+]
+
+ALERT_HISTORY_DAYS = 252  # Rows summarized in the alert history section
+
+# ============================================================================
+# Liquidity Scenarios (see liquidity_scenarios.py / utils.scenarios)
+# ============================================================================
+# Shocks are paths on input series over the horizon (calendar days):
+# TGA_Balance ($M), RRP_Balance ($B), Fed_Total_Assets ($M),
+# Spread_SOFR_IORB (bps). A baseline (no shocks) is always included.
+
+SCENARIO_HORIZON_DAYS = 42  # 6 weeks
+
+SCENARIOS = [
+    {"name": "tga_rebuild_rrp_drain",
+     "description": "TGA +$300B over 6 weeks, RRP drains to zero",
+     "shocks": [
+         {"series": "TGA_Balance", "change": 300000, "days": 42},
+         {"series": "RRP_Balance", "target": 0, "days": 42},
+     ]},
+    {"name": "tga_rebuild",
+     "description": "TGA +$300B over 6 weeks",
+     "shocks": [{"series": "TGA_Balance", "change": 300000, "days": 42}]},
+    {"name": "tga_drawdown",
+     "description": "TGA -$200B over 4 weeks (debt ceiling)",
+     "shocks": [{"series": "TGA_Balance", "change": -200000, "days": 28}]},
+    {"name": "qt_acceleration",
+     "description": "Fed assets -$150B over 6 weeks",
+     "shocks": [{"series": "Fed_Total_Assets", "change": -150000, "days": 42}]},
+    {"name": "funding_squeeze",
+     "description": "SOFR-IORB +15bps in 1 week, RRP to zero",
+     "shocks": [
+         {"series": "Spread_SOFR_IORB", "change": 15, "days": 5},
+         {"series": "RRP_Balance", "target": 0, "days": 10},
+     ]},
+]
+
 # ============================================================================
 # Liquidity Composite Index Weights
 # ============================================================================
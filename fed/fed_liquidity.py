@@ -14,6 +14,8 @@ import os
 
 # Add fed directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import from utilities
 from config import (
@@ -22,11 +24,24 @@ from config import (
     DEFAULT_START_DATE as START_DATE,
     ROLLING_3M_DAYS,
     SPIKE_THRESHOLD_STD,
-    SPIKE_ABSOLUTE_BPS
+    SPIKE_ABSOLUTE_BPS,
+    TREND_WINDOW_DAYS,
+    TREND_MIN_PERIODS,
+    TREND_FORECAST_PERIODS,
+    TREND_COLUMNS,
+    ALIGNMENT_TOLERANCE_DAYS,
+    ALIGNMENT_PUBLICATION_LAG_DAYS,
+    ALIGNMENT_OVERRIDES,
+    ALERT_RULES,
+    ALERT_HISTORY_DAYS
 )
 from utils.api_client import FREDClient
 from utils.data_loader import load_tga_data, get_output_path
-from utils.db_manager import TimeSeriesDB
+from storage import open_snapshot, open_writer, period_value, read_rollup, to_arrow_table
+from utils.rolling_regression import rolling_ols
+from utils.feature_graph import FeatureRegistry
+from utils.alignment import align_asof, build_alignment_rules
+from utils.alert_rules import compile_rules, alert_statistics, latest_alerts
 
 # FRED client instance (reusable)
 fred_client = FREDClient()
@@ -87,10 +102,59 @@ def load_tga_data_wrapper(csv_path=None):
     """Wrapper for backward compatibility."""
     return load_tga_data(csv_path)
 
-def fetch_all_data():
+# NY Fed reference rates that complement the FRED series
+NYFED_RATE_COLUMNS = ['SOFR_Rate', 'EFFR_Rate', 'TGCR_Rate', 'BGCR_Rate', 'OBFR_Rate']
+
+# Inputs of the stress index (see stress_index_values)
+STRESS_INDEX_INPUTS = [
+    'Spread_SOFR_IORB', 'Spread_EFFR_IORB', 'SOFR_Vol_5D',
+    'RRP_Balance', 'MA20_RRP', 'Repo_Ops_Balance_M',
+]
+
+def align_fed_inputs(df, tga_series=None, nyfed_rates=None):
+    """
+    As-of aligns FRED, TGA and NY Fed series onto one daily panel.
+
+    Each column follows its alignment rule (frequency, staleness tolerance,
+    publication lag). NY Fed rates fill dates where FRED has no print.
+    Returns: (panel, staleness) where staleness holds the age in days of
+    every value (0 = observed that day, NaN = missing).
+    """
+    observations = {col: df[col] for col in df.columns}
+    index = df.index
+
+    if tga_series is not None and not tga_series.empty:
+        observations['TGA_Balance'] = tga_series
+        index = index.union(tga_series.index)
+
+    if nyfed_rates is not None:
+        for col in NYFED_RATE_COLUMNS:
+            if col not in nyfed_rates.columns:
+                continue
+            if col in observations:
+                # FRED print takes precedence, NY Fed fills the gaps
+                observations[col] = observations[col].combine_first(nyfed_rates[col])
+            else:
+                observations[col] = nyfed_rates[col]
+
+    frequencies = {
+        SERIES_MAP[series_id]: freq for series_id, freq in SERIES_FREQUENCIES.items()
+        if series_id in SERIES_MAP
+    }
+    rules = build_alignment_rules(
+        observations.keys(),
+        frequencies,
+        ALIGNMENT_TOLERANCE_DAYS,
+        ALIGNMENT_PUBLICATION_LAG_DAYS,
+        ALIGNMENT_OVERRIDES
+    )
+    return align_asof(observations, index, rules)
+
+def fetch_all_data(return_staleness=False):
     """
-    Fetches all required series and merges them into a single DataFrame.
-    Returns: (df, series_metadata)
+    Fetches all required series and aligns them into a single DataFrame.
+    Returns: (df, series_metadata), plus the staleness matrix if
+    return_staleness is True.
     """
     # Use FREDClient to fetch multiple series
     print("Starting Fed Liquidity Monitor...")
@@ -102,402 +166,473 @@ def fetch_all_data():
         if 'last_update' in meta and meta['last_update']:
             series_metadata[series_id] = pd.to_datetime(meta['last_update'])
     
-    # Load TGA data and join properly with outer join
+    # Load TGA data
     tga_series = load_tga_data()
     if not tga_series.empty:
-        # Use outer join to preserve all dates
-        df = df.join(tga_series, how='outer')
         series_metadata['TGA'] = tga_series.index[-1]
-        print("Merging data...")
         print(f"TGA data successfully integrated: {len(tga_series)} records")
     else:
         print("⚠️  TGA data not available - proceeding without TGA (Net Liquidity will be partial)")
-        # Add placeholder TGA column with NaN to maintain structure
-        df['TGA_Balance'] = np.nan
-    
-    # Forward fill ONLY weekly data (Fed Balance Sheet) to preserve daily data integrity
-    # Weekly series from FRED (update Wednesdays, should carry forward)
-    weekly_series = ['WALCL', 'WSHOMCB', 'TREAST', 'WSHOBL', 'WSHONBNL', 'SWPT']
-    
-    # Get column names for weekly series from our mapping
-    weekly_columns = []
-    for series_id in weekly_series:
-        if series_id in SERIES_MAP:
-            col_name = SERIES_MAP[series_id]
-            if col_name in df.columns:
-                weekly_columns.append(col_name)
-    
-    # Apply forward fill only to weekly series
-    if weekly_columns:
-        print(f"Applying forward fill to {len(weekly_columns)} weekly series: {weekly_columns}")
-        df[weekly_columns] = df[weekly_columns].ffill()
-    else:
-        print("No weekly series found for forward fill")
-    
-    # For TGA data, apply minimal forward fill (max 3 days) to avoid weekend gaps
-    if 'TGA_Balance' in df.columns:
-        print("Applying limited forward fill (3 days) to TGA data")
-        df['TGA_Balance'] = df['TGA_Balance'].ffill(limit=3)
-    
-    print("✓ Selective forward fill applied - preserving daily data integrity")
     
     # ==========================================================================
     # INTEGRATE NY FED REFERENCE RATES (more timely than FRED)
     # ==========================================================================
+    nyfed_rates = None
     nyfed_rates_path = get_output_path("nyfed_reference_rates.csv")
     if os.path.exists(nyfed_rates_path):
         try:
             nyfed_rates = pd.read_csv(nyfed_rates_path, index_col=0, parse_dates=True)
             print(f"Loading NY Fed reference rates: {len(nyfed_rates)} records")
-            
-            # Map NY Fed columns to our column names
-            rate_mapping = {
-                'SOFR_Rate': 'SOFR_Rate',
-                'EFFR_Rate': 'EFFR_Rate',
-                'TGCR_Rate': 'TGCR_Rate',
-                'BGCR_Rate': 'BGCR_Rate',  # Additional rate
-                'OBFR_Rate': 'OBFR_Rate',  # Additional rate
-            }
-            
-            # Update FRED rates with NY Fed data where FRED has NaN
-            for nyfed_col, our_col in rate_mapping.items():
-                if nyfed_col in nyfed_rates.columns:
-                    if our_col in df.columns:
-                        # Fill NaN in FRED data with NY Fed data
-                        mask = df[our_col].isna()
-                        nyfed_reindexed = nyfed_rates.reindex(df.index)[nyfed_col]
-                        df.loc[mask, our_col] = nyfed_reindexed.loc[mask]
-                    else:
-                        # Column doesn't exist, add it from NY Fed
-                        df[our_col] = nyfed_rates.reindex(df.index)[nyfed_col]
-            
-            # Forward fill rates for recent days (max 3 days to cover weekends)
-            rate_cols = [c for c in rate_mapping.values() if c in df.columns]
-            for col in rate_cols:
-                df[col] = df[col].ffill(limit=3)
-            
-            print("✓ NY Fed reference rates integrated (fills FRED gaps + 3-day forward fill)")
             if not nyfed_rates.empty:
                 series_metadata['NYFED_RATES'] = nyfed_rates.index[-1]
         except Exception as e:
             print(f"⚠️  Could not load NY Fed rates: {e}")
+            nyfed_rates = None
     else:
         print("ℹ️  NY Fed rates file not found - run nyfed_reference_rates.py first for fresher data")
     
+    # As-of alignment: weekly series hold until the next release, TGA and
+    # rates carry over weekends, other daily series keep their gaps
+    print("Merging data...")
+    df, staleness = align_fed_inputs(df, tga_series, nyfed_rates)
+    if 'TGA_Balance' not in df.columns:
+        # Add placeholder TGA column with NaN to maintain structure
+        df['TGA_Balance'] = np.nan
+        staleness['TGA_Balance'] = np.nan
+    
+    carried = (staleness > 0).sum()
+    carried = carried[carried > 0]
+    if not carried.empty:
+        print(f"✓ As-of alignment carried forward {int(carried.sum())} values in {len(carried)} series")
+    
     # Ensure START_DATE is datetime for comparison and filter
     start_dt = pd.to_datetime(START_DATE)
     df = df[df.index >= start_dt]
+    staleness = staleness[staleness.index >= start_dt]
 
+    if return_staleness:
+        return df, series_metadata, staleness
     return df, series_metadata
 
-def calculate_effective_policy_stance(df):
-    """
-    Distingue tra QT nominale e QE effettivo.
-    
-    QT Nominale: Riduzione Fed_Total_Assets
-    QE Effettivo: Reinvestimento MBS -> T-Bills + REPO attivo
-    """
-    
+# ============================================================================
+# DERIVED FEATURES
+# Each feature declares its inputs; calculate_metrics() plans and evaluates
+# only the features needed for the requested outputs.
+# Units: Fed_Total_Assets (WALCL) and TGA_Balance (DTS) are in Millions;
+# RRP_Balance and Repo_Ops_Balance (RPONTTLD) are in Billions.
+# ============================================================================
+
+FED_FEATURES = FeatureRegistry()
+
+POLICY_STANCE_COLUMNS = [
+    'MBS_Runoff_Weekly', 'Bill_Purchases_Weekly', 'MBS_to_Bills_Reinvestment',
+    'Flow_Nominal_Assets', 'Net_Balance_Sheet_Flow', 'QT_Pace_Nominal',
+    'QE_Effective', 'Qualitative_Easing_Support', 'Net_Policy_Stance',
+]
+
+# --- Unit conversions (Billions -> Millions) ---
+
+@FED_FEATURES.feature(outputs=['RRP_Balance_M'], inputs=['RRP_Balance'])
+def _rrp_millions(x, index):
+    # Uses the forward-filled RRP (see _rrp_fill)
+    return {'RRP_Balance_M': x['RRP_Balance'] * 1000}
+
+@FED_FEATURES.feature(outputs=['Repo_Ops_Balance_M'], inputs=['Repo_Ops_Balance'])
+def _repo_ops_millions(x, index):
+    return {'Repo_Ops_Balance_M': x['Repo_Ops_Balance'] * 1000}
+
+# --- Non-trading days: flag imputed values, then forward-fill RRP and TGA ---
+
+@FED_FEATURES.feature(outputs=['RRP_Imputed', 'RRP_Balance'], inputs=['RRP_Balance'])
+def _rrp_fill(x, index):
+    imputed = x['RRP_Balance'].isna()
+    if imputed.any():
+        print(f"✓ Forward-filled {imputed.sum()} RRP values for non-trading days")
+    return {'RRP_Imputed': imputed, 'RRP_Balance': x['RRP_Balance'].ffill()}
+
+@FED_FEATURES.feature(outputs=['TGA_Imputed', 'TGA_Balance'], inputs=['TGA_Balance'])
+def _tga_fill(x, index):
+    imputed = x['TGA_Balance'].isna()
+    if imputed.any():
+        print(f"✓ Forward-filled {imputed.sum()} TGA values for non-trading days")
+    return {'TGA_Imputed': imputed, 'TGA_Balance': x['TGA_Balance'].ffill()}
+
+# --- Effective Policy Stance (QT nominale vs QE effettivo) ---
+
+@FED_FEATURES.feature(outputs=['MBS_Runoff_Weekly'], inputs=['Fed_MBS_Holdings'])
+def _mbs_runoff(x, index):
     # 1. Calcola il runoff MBS
-    if 'Fed_MBS_Holdings' in df.columns:
-        df['MBS_Runoff_Weekly'] = -df['Fed_MBS_Holdings'].diff(5)  # Negativo = runoff
-    
+    return {'MBS_Runoff_Weekly': -x['Fed_MBS_Holdings'].diff(5)}  # Negativo = runoff
+
+@FED_FEATURES.feature(outputs=['Bill_Purchases_Weekly'], inputs=['Fed_Bill_Holdings'])
+def _bill_purchases(x, index):
     # 2. Calcola l'acquisto di T-Bills
-    if 'Fed_Bill_Holdings' in df.columns:
-        df['Bill_Purchases_Weekly'] = df['Fed_Bill_Holdings'].diff(5)
-    
+    return {'Bill_Purchases_Weekly': x['Fed_Bill_Holdings'].diff(5)}
+
+@FED_FEATURES.feature(outputs=['MBS_to_Bills_Reinvestment'], inputs=['MBS_Runoff_Weekly', 'Bill_Purchases_Weekly'])
+def _mbs_to_bills_reinvestment(x, index):
     # 3. Calcola il reinvestimento (MBS runoff -> T-Bills)
-    if 'MBS_Runoff_Weekly' in df.columns and 'Bill_Purchases_Weekly' in df.columns:
-        # Se i T-Bills aumentano mentre MBS diminuiscono = reinvestimento
-        # Usiamo numpy where per gestire le condizioni vettoriali
-        # Logica: Reinvestimento = min(abs(MBS_Runoff), Bill_Purchases) se entrambi attivi nella direzione giusta
-        
-        # Condizione: MBS scendono (runoff > 0 perché abbiamo invertito il segno sopra) E Bills salgono
-        # Nota: MBS_Runoff_Weekly è calcolato come -diff, quindi se MBS scendono, diff è neg, -diff è pos.
-        # Quindi cerchiamo MBS_Runoff_Weekly > 0 e Bill_Purchases_Weekly > 0
-        
-        df['MBS_to_Bills_Reinvestment'] = np.where(
-            (df['MBS_Runoff_Weekly'] > 0) & (df['Bill_Purchases_Weekly'] > 0),
-            np.minimum(df['MBS_Runoff_Weekly'], df['Bill_Purchases_Weekly']),
-            0
-        )
-    
-    # 4. Calcola le due dimensioni separate della policy stance
+    # MBS_Runoff_Weekly è calcolato come -diff, quindi se MBS scendono è positivo.
+    # Reinvestimento = min(MBS_Runoff, Bill_Purchases) se entrambi > 0
+    runoff = x['MBS_Runoff_Weekly']
+    purchases = x['Bill_Purchases_Weekly']
+    reinvestment = np.where(
+        (runoff > 0) & (purchases > 0),
+        np.minimum(runoff, purchases),
+        0
+    )
+    return {'MBS_to_Bills_Reinvestment': pd.Series(reinvestment, index=index)}
+
+@FED_FEATURES.feature(
+    outputs=['Flow_Nominal_Assets', 'Net_Balance_Sheet_Flow', 'QT_Pace_Nominal'],
+    inputs=['Fed_Total_Assets']
+)
+def _nominal_balance_sheet_flow(x, index):
+    # 4a. QUANTITÀ: Misura il QT/QE puro in termini di net liquidity
     #
     # IMPORTANTE: Non sommare Flow_Nominal_Assets e MBS_to_Bills_Reinvestment!
-    # Questo causa DOUBLE COUNTING perché il reinvestimento è già incluso in Flow_Nominal_Assets.
-    #
-    # Esempio: Se MBS scendono -30B e Bills salgono +20B:
-    #   - Flow_Nominal_Assets = -10B (net QT, già include il +20B di Bills)
-    #   - MBS_to_Bills_Reinvestment = 20B (isolated reinvestment)
-    #   - Sommarli = -10B + 20B = +10B ❌ ERRORE: conta 2 volte i Bills!
-    #
-    # SOLUZIONE: Separare le due dimensioni (Gemini + Cursor consensus):
+    # Il reinvestimento è già incluso in Flow_Nominal_Assets (double counting).
+    # Esempio: MBS -30B e Bills +20B -> Flow = -10B (già include i +20B di Bills).
+    flow = x['Fed_Total_Assets'].diff(5)  # Pos = QE, Neg = QT
+    return {
+        'Flow_Nominal_Assets': flow,
+        # Alias per backward compatibility e chiarezza semantica
+        'Net_Balance_Sheet_Flow': flow,
+        # Legacy metric: positivo = pace of contraction
+        'QT_Pace_Nominal': -flow,
+    }
 
-    if 'Fed_Total_Assets' in df.columns:
-        # 4a. QUANTITÀ: Misura il QT/QE puro in termini di net liquidity
-        df['Flow_Nominal_Assets'] = df['Fed_Total_Assets'].diff(5) # Pos = QE, Neg = QT
+@FED_FEATURES.feature(
+    outputs=['QE_Effective', 'Qualitative_Easing_Support'],
+    inputs=['MBS_to_Bills_Reinvestment', 'Repo_Ops_Balance_M']
+)
+def _qualitative_easing(x, index):
+    # 4b. QUALITÀ: Effetto "shadow QE" da reinvestimento + repo operations
+    # NON è net liquidity ma ha effetto bullish per asset prices
+    qe_effective = x['MBS_to_Bills_Reinvestment'] + x['Repo_Ops_Balance_M']
+    return {'QE_Effective': qe_effective, 'Qualitative_Easing_Support': qe_effective}
+
+@FED_FEATURES.feature(outputs=['Net_Policy_Stance'], inputs=['Flow_Nominal_Assets'])
+def _net_policy_stance(x, index):
+    # DEPRECATO: alias puro di Flow_Nominal_Assets (no double counting)
+    return {'Net_Policy_Stance': x['Flow_Nominal_Assets']}
+
+# --- Net Liquidity = Fed Assets - RRP - TGA ---
+
+@FED_FEATURES.feature(
+    outputs=['Net_Liquidity_No_TGA', 'Net_Liquidity', 'Net_Liq_Imputed'],
+    inputs=['Fed_Total_Assets', 'RRP_Balance_M'],
+    optional=['TGA_Balance', 'RRP_Imputed', 'TGA_Imputed', 'RRP_Balance']
+)
+def _net_liquidity(x, index):
+    assets = x['Fed_Total_Assets']
+    rrp_m = x['RRP_Balance_M']
 
-        # Alias per backward compatibility e chiarezza semantica
-        df['Net_Balance_Sheet_Flow'] = df['Flow_Nominal_Assets']
+    if 'TGA_Balance' not in x:
+        # Fallback without TGA column
+        no_tga = assets - rrp_m
+        print("⚠️  Net Liquidity calculated without TGA (TGA column missing)")
+        return {'Net_Liquidity_No_TGA': no_tga, 'Net_Liquidity': no_tga}
+
+    tga = x['TGA_Balance']
+    if not tga.notna().any():
+        # Fallback without TGA (calculate but mark as degraded)
+        no_tga = assets - rrp_m
+        print("⚠️  Net Liquidity calculated without TGA (degraded accuracy)")
+        return {'Net_Liquidity_No_TGA': no_tga, 'Net_Liquidity': no_tga}
+
+    net_liq = assets - rrp_m - tga
+    result = {'Net_Liquidity': net_liq}
+
+    # Flag Net Liquidity as imputed if either RRP or TGA was imputed
+    if 'RRP_Imputed' in x and 'TGA_Imputed' in x:
+        result['Net_Liq_Imputed'] = x['RRP_Imputed'] | x['TGA_Imputed']
+    elif 'RRP_Imputed' in x:
+        result['Net_Liq_Imputed'] = x['RRP_Imputed']
+    elif 'TGA_Imputed' in x:
+        result['Net_Liq_Imputed'] = x['TGA_Imputed']
+
+    print("✓ Net Liquidity calculated: Fed Assets - RRP - TGA")
+
+    # Net Liquidity reconciliation check and debug logging
+    components = pd.DataFrame({
+        'Fed_Total_Assets': assets, 'RRP_Balance_M': rrp_m,
+        'TGA_Balance': tga, 'Net_Liquidity': net_liq
+    })
+    last_idx = components.last_valid_index()
+    if last_idx is not None:
+        last_row = components.loc[last_idx]
+        fed_assets = last_row['Fed_Total_Assets']
+        rrp_last = rrp_m.loc[last_idx]
+        tga_last = last_row['TGA_Balance']
+        net_liq_actual = last_row['Net_Liquidity']
+
+        # Reconciliation check
+        net_liq_calculated = fed_assets - rrp_last - tga_last
+        delta = abs(net_liq_calculated - net_liq_actual)
+        rrp_b = x['RRP_Balance'].loc[last_idx] if 'RRP_Balance' in x else rrp_last / 1000
+
+        print(f"DEBUG Net Liquidity Components (last valid date {last_idx.strftime('%Y-%m-%d')}):")
+        print(f"  Fed_Total_Assets: ${fed_assets:,.0f}M")
+        print(f"  RRP_Balance: ${rrp_b:,.0f}B")
+        print(f"  RRP_Balance_M: ${rrp_last:,.0f}M")
+        print(f"  TGA_Balance: ${tga_last:,.0f}M")
+        print(f"  Net_Liquidity (calculated): ${net_liq_calculated:,.0f}M")
+        print(f"  Net_Liquidity (stored): ${net_liq_actual:,.0f}M")
+        print(f"  Delta: ${delta:,.0f}M")
+
+        # Warning for significant mismatch (> $500M)
+        if delta > 500:
+            print(f"⚠️ Net Liquidity mismatch detected: ${delta:,.0f}M (threshold $500M)")
+            print("  Possible causes: unit conversion issues, rounding, or component mismatch")
+
+    return result
+
+# --- Spreads (Stress Indicators) ---
+
+@FED_FEATURES.feature(outputs=['Spread_SOFR_IORB'], inputs=['SOFR_Rate', 'IORB_Rate'])
+def _spread_sofr_iorb(x, index):
+    return {'Spread_SOFR_IORB': (x['SOFR_Rate'] - x['IORB_Rate']) * 100}  # bps
+
+@FED_FEATURES.feature(outputs=['Spread_EFFR_IORB'], inputs=['EFFR_Rate', 'IORB_Rate'])
+def _spread_effr_iorb(x, index):
+    # Policy Transmission
+    return {'Spread_EFFR_IORB': (x['EFFR_Rate'] - x['IORB_Rate']) * 100}  # bps
+
+@FED_FEATURES.feature(outputs=['Spread_TGCR_SOFR'], inputs=['TGCR_Rate', 'SOFR_Rate'])
+def _spread_tgcr_sofr(x, index):
+    # Tri-party vs GC
+    return {'Spread_TGCR_SOFR': (x['TGCR_Rate'] - x['SOFR_Rate']) * 100}  # bps
+
+@FED_FEATURES.feature(outputs=['Curve_2s10s'], inputs=['UST_10Y', 'UST_2Y'])
+def _curve_2s10s(x, index):
+    return {'Curve_2s10s': x['UST_10Y'] - x['UST_2Y']}  # In percent already
+
+@FED_FEATURES.feature(outputs=['Curve_5s30s'], inputs=['UST_30Y', 'UST_5Y'])
+def _curve_5s30s(x, index):
+    return {'Curve_5s30s': x['UST_30Y'] - x['UST_5Y']}
+
+# --- RRP Change (multiple time horizons, RRP already forward-filled) ---
+
+@FED_FEATURES.feature(
+    outputs=['RRP_Change', 'RRP_Weekly_Change', 'RRP_Monthly_Change', 'RRP_Quarterly_Change'],
+    inputs=['RRP_Balance']
+)
+def _rrp_changes(x, index):
+    rrp = x['RRP_Balance']
+    return {
+        'RRP_Change': rrp.diff(),              # Daily
+        'RRP_Weekly_Change': rrp.diff(5),      # Weekly (5 trading days)
+        'RRP_Monthly_Change': rrp.diff(22),    # Monthly (~22 trading days)
+        'RRP_Quarterly_Change': rrp.diff(65),  # Quarterly (~65 trading days)
+    }
 
-        # Legacy metric per calcoli che usano solo la direzione del QT
-        df['QT_Pace_Nominal'] = -df['Flow_Nominal_Assets']  # Positivo = pace of contraction
+# --- QT Pace (5 business days approx 1 week) ---
 
-    if 'MBS_to_Bills_Reinvestment' in df.columns and 'Repo_Ops_Balance_M' in df.columns:
-        # 4b. QUALITÀ: Effetto "shadow QE" da reinvestimento + repo operations
-        # Questo misura il supporto qualitativo al mercato (duration, risk)
-        # NON è net liquidity ma ha effetto bullish per asset prices
-        df['QE_Effective'] = df['MBS_to_Bills_Reinvestment'] + df['Repo_Ops_Balance_M']
+@FED_FEATURES.feature(outputs=['QT_Pace_Assets_Weekly'], inputs=['Fed_Total_Assets'])
+def _qt_pace_assets(x, index):
+    return {'QT_Pace_Assets_Weekly': x['Fed_Total_Assets'].diff(5)}
 
-        # Alias semantico per chiarezza
-        df['Qualitative_Easing_Support'] = df['QE_Effective']
+@FED_FEATURES.feature(outputs=['QT_Pace_Treasury_Weekly'], inputs=['Fed_Treasury_Holdings'])
+def _qt_pace_treasury(x, index):
+    return {'QT_Pace_Treasury_Weekly': x['Fed_Treasury_Holdings'].diff(5)}
 
-    # DEPRECATO: Net_Policy_Stance causava double counting
-    # Se necessario per backward compatibility, ridefinito come alias puro di Flow_Nominal_Assets
-    # (senza sommare il reinvestimento che è già incluso)
-    if 'Flow_Nominal_Assets' in df.columns:
-        df['Net_Policy_Stance'] = df['Flow_Nominal_Assets']  # Solo quantità, no double counting
+@FED_FEATURES.feature(outputs=['Bill_Buying_Pace_Weekly'], inputs=['Fed_Bill_Holdings'])
+def _bill_buying_pace(x, index):
+    return {'Bill_Buying_Pace_Weekly': x['Fed_Bill_Holdings'].diff(5)}
 
-    return df
+@FED_FEATURES.feature(
+    outputs=['Fed_Coupon_Holdings'],
+    inputs=['Fed_Treasury_Holdings', 'Fed_Bill_Holdings', 'Fed_Notes_Bonds_Holdings']
+)
+def _coupon_holdings(x, index):
+    # Notes & Bonds combined series (WSHONBNL) represents all coupons
+    return {'Fed_Coupon_Holdings': x['Fed_Notes_Bonds_Holdings']}
 
-def calculate_metrics(df):
-    """
-    Calculates derived metrics: Net Liquidity, Spreads, Changes.
-    """
-    # 0. Unit Conversions FIRST (before any calculations)
-    # Net Liq = Fed Assets - RRP - TGA
-    # Units: All in Millions
-    # - Fed_Total_Assets: Millions (WALCL from FRED)
-    # - RRP_Balance: Billions (convert to Millions)
-    # - Repo_Ops_Balance: Billions (convert to Millions) - RPONTTLD
-    # - TGA_Balance: Millions (from DTS)
+# --- Volatility & Stress ---
 
-    if 'RRP_Balance' in df.columns:
-        df['RRP_Balance_M'] = df['RRP_Balance'] * 1000 # Billions -> Millions
+@FED_FEATURES.feature(outputs=['SOFR_Vol_5D'], inputs=['SOFR_Rate'])
+def _sofr_volatility(x, index):
+    # Rolling 5-day Standard Deviation (min_periods=2 for weekend gaps)
+    return {'SOFR_Vol_5D': x['SOFR_Rate'].rolling(window=5, min_periods=2).std()}
 
-    # RPONTTLD (Repo_Ops_Balance) is also in Billions - convert to Millions
-    if 'Repo_Ops_Balance' in df.columns:
-        df['Repo_Ops_Balance_M'] = df['Repo_Ops_Balance'] * 1000 # Billions -> Millions
+@FED_FEATURES.feature(outputs=['Stress_Flag'], inputs=['SOFR_Rate', 'IORB_Rate'])
+def _stress_flag(x, index):
+    # Stress Flag: SOFR > IORB + 5bps (0.05%)
+    return {'Stress_Flag': x['SOFR_Rate'] > (x['IORB_Rate'] + 0.05)}
 
-    if 'Fed_Total_Assets' in df.columns:
-        # WALCL is in Millions
-        pass
+# --- Moving Averages (min_periods for weekend/holiday gaps) ---
 
-    # ==========================================================================
-    # HANDLE NON-TRADING DAYS - Forward-fill RRP and TGA
-    # ==========================================================================
-    
-    # Flag imputed values BEFORE forward-filling
-    if 'RRP_Balance' in df.columns:
-        df['RRP_Imputed'] = df['RRP_Balance'].isna()
-        # Forward-fill RRP for weekends/holidays
-        df['RRP_Balance'] = df['RRP_Balance'].ffill()
-        df['RRP_Balance_M'] = df['RRP_Balance'] * 1000  # Recalculate after ffill
-    
-    if 'TGA_Balance' in df.columns:
-        df['TGA_Imputed'] = df['TGA_Balance'].isna()
-        # Forward-fill TGA for rare NULL days
-        df['TGA_Balance'] = df['TGA_Balance'].ffill()
-    
-    # Count imputed values for logging
-    rrp_imputed_count = df['RRP_Imputed'].sum() if 'RRP_Imputed' in df.columns else 0
-    tga_imputed_count = df['TGA_Imputed'].sum() if 'TGA_Imputed' in df.columns else 0
-    if rrp_imputed_count > 0 or tga_imputed_count > 0:
-        print(f"✓ Forward-filled {rrp_imputed_count} RRP values and {tga_imputed_count} TGA values for non-trading days")
-
-    # 1. Calculate Effective Policy Stance (needs _M versions)
-    df = calculate_effective_policy_stance(df)
-
-    # Calculate Net Liquidity
-    if all(col in df.columns for col in ['Fed_Total_Assets', 'RRP_Balance_M', 'TGA_Balance']):
-        # Check if TGA data has actual values (not all NaN)
-        if df['TGA_Balance'].notna().any():
-            df['Net_Liquidity'] = df['Fed_Total_Assets'] - df['RRP_Balance_M'] - df['TGA_Balance']
-            
-            # Flag Net Liquidity as imputed if either RRP or TGA was imputed
-            if 'RRP_Imputed' in df.columns and 'TGA_Imputed' in df.columns:
-                df['Net_Liq_Imputed'] = df['RRP_Imputed'] | df['TGA_Imputed']
-            elif 'RRP_Imputed' in df.columns:
-                df['Net_Liq_Imputed'] = df['RRP_Imputed']
-            elif 'TGA_Imputed' in df.columns:
-                df['Net_Liq_Imputed'] = df['TGA_Imputed']
-            
-            print("✓ Net Liquidity calculated: Fed Assets - RRP - TGA")
-            
-            # ADDED: Net Liquidity reconciliation check and debug logging
-            if not df.empty:
-                last_idx = df.last_valid_index()
-                if last_idx is not None:
-                    last_row = df.loc[last_idx]
-                    fed_assets = last_row.get('Fed_Total_Assets', 0)
-                    rrp_m = last_row.get('RRP_Balance_M', 0)
-                    tga = last_row.get('TGA_Balance', 0)
-                    net_liq_actual = last_row.get('Net_Liquidity', 0)
-                    
-                    # Reconciliation check
-                    net_liq_calculated = fed_assets - rrp_m - tga
-                    delta = abs(net_liq_calculated - net_liq_actual)
-                    
-                    # Debug logging
-                    print(f"DEBUG Net Liquidity Components (last valid date {last_idx.strftime('%Y-%m-%d')}):")
-                    print(f"  Fed_Total_Assets: ${fed_assets:,.0f}M")
-                    print(f"  RRP_Balance: ${last_row.get('RRP_Balance', 0):,.0f}B")
-                    print(f"  RRP_Balance_M: ${rrp_m:,.0f}M")
-                    print(f"  TGA_Balance: ${tga:,.0f}M")
-                    print(f"  Net_Liquidity (calculated): ${net_liq_calculated:,.0f}M")
-                    print(f"  Net_Liquidity (stored): ${net_liq_actual:,.0f}M")
-                    print(f"  Delta: ${delta:,.0f}M")
-                    
-                    # Warning for significant mismatch
-                    if delta > 500:  # Threshold for significant mismatch (> $500M)
-                        print(f"⚠️ Net Liquidity mismatch detected: ${delta:,.0f}M (threshold $500M)")
-                        print("  Possible causes: unit conversion issues, rounding, or component mismatch")
-        else:
-            # Fallback without TGA (calculate but warn)
-            df['Net_Liquidity_No_TGA'] = df['Fed_Total_Assets'] - df['RRP_Balance_M']
-            # Use this as Net_Liquidity but mark as degraded
-            df['Net_Liquidity'] = df['Net_Liquidity_No_TGA']
-            print("⚠️  Net Liquidity calculated without TGA (degraded accuracy)")
-    elif 'Fed_Total_Assets' in df.columns and 'RRP_Balance_M' in df.columns:
-        # Fallback without TGA column
-        df['Net_Liquidity_No_TGA'] = df['Fed_Total_Assets'] - df['RRP_Balance_M']
-        df['Net_Liquidity'] = df['Net_Liquidity_No_TGA']
-        print("⚠️  Net Liquidity calculated without TGA (TGA column missing)")
-    else:
-        print("❌ Cannot calculate Net Liquidity - missing required columns")
-        
-    # 2. Spreads (Stress Indicators)
-    if 'SOFR_Rate' in df.columns and 'IORB_Rate' in df.columns:
-        df['Spread_SOFR_IORB'] = (df['SOFR_Rate'] - df['IORB_Rate']) * 100 # bps
-        
-    # EFFR - IORB (Policy Transmission)
-    if 'EFFR_Rate' in df.columns and 'IORB_Rate' in df.columns:
-        df['Spread_EFFR_IORB'] = (df['EFFR_Rate'] - df['IORB_Rate']) * 100 # bps
-        
-    # TGCR - SOFR (Tri-party vs GC)
-    if 'TGCR_Rate' in df.columns and 'SOFR_Rate' in df.columns:
-        df['Spread_TGCR_SOFR'] = (df['TGCR_Rate'] - df['SOFR_Rate']) * 100 # bps
-
-    # UST Curve Spreads (if not already provided)
-    # 2s10s (most watched)
-    if 'UST_10Y' in df.columns and 'UST_2Y' in df.columns:
-        df['Curve_2s10s'] = df['UST_10Y'] - df['UST_2Y']  # In percent already
-    # 5s30s
-    if 'UST_30Y' in df.columns and 'UST_5Y' in df.columns:
-        df['Curve_5s30s'] = df['UST_30Y'] - df['UST_5Y']
-
-    # 3. RRP Change (multiple time horizons)
-    # Use ffill() to handle weekend/holiday gaps before computing diffs
-    if 'RRP_Balance' in df.columns:
-        rrp_filled = df['RRP_Balance'].ffill()  # Fill gaps with last valid value
-        df['RRP_Change'] = df['RRP_Balance'].diff()  # Daily (original, may have NaN)
-        df['RRP_Weekly_Change'] = rrp_filled.diff(5)  # Weekly (5 trading days)
-        df['RRP_Monthly_Change'] = rrp_filled.diff(22)  # Monthly (~22 trading days)
-        df['RRP_Quarterly_Change'] = rrp_filled.diff(65)  # Quarterly (~65 trading days)
-        
-    # 4. QT Pace (Weekly Change in Assets)
-    # Resample to weekly to get a smoother trend or just take 5-day diff
-    if 'Fed_Total_Assets' in df.columns:
-        df['QT_Pace_Assets_Weekly'] = df['Fed_Total_Assets'].diff(5) # 5 business days approx 1 week
-        
-    if 'Fed_Treasury_Holdings' in df.columns:
-        df['QT_Pace_Treasury_Weekly'] = df['Fed_Treasury_Holdings'].diff(5)
-        
-    if 'Fed_Bill_Holdings' in df.columns:
-        df['Bill_Buying_Pace_Weekly'] = df['Fed_Bill_Holdings'].diff(5)
-        
-    # Derive Coupons (Notes + Bonds) from combined series
-    if 'Fed_Treasury_Holdings' in df.columns and 'Fed_Bill_Holdings' in df.columns and 'Fed_Notes_Bonds_Holdings' in df.columns:
-        # Total Treasury = Bills + Notes & Bonds (combined)
-        # We can derive Bills from the data, and Notes_Bonds is the combined series
-        df['Fed_Coupon_Holdings'] = df['Fed_Notes_Bonds_Holdings']  # Now represents both Notes and Bonds
+@FED_FEATURES.feature(outputs=['MA20_RRP', 'MA5_RRP'], inputs=['RRP_Balance'])
+def _rrp_moving_averages(x, index):
+    rrp = x['RRP_Balance']
+    return {
+        'MA20_RRP': rrp.rolling(window=20, min_periods=10).mean(),
+        'MA5_RRP': rrp.rolling(window=5, min_periods=2).mean(),
+    }
 
-    # 5. Volatility & Stress
-    if 'SOFR_Rate' in df.columns:
-        # Rolling 5-day Standard Deviation (min_periods=2 for weekend gaps)
-        df['SOFR_Vol_5D'] = df['SOFR_Rate'].rolling(window=5, min_periods=2).std()
-        
-        # Stress Flag: SOFR > IORB + 5bps (0.05%)
-        if 'IORB_Rate' in df.columns:
-            df['Stress_Flag'] = df['SOFR_Rate'] > (df['IORB_Rate'] + 0.05)
-            
-    # 6. Analytical Alignment (Phase 3)
+@FED_FEATURES.feature(outputs=['MA20_Assets'], inputs=['Fed_Total_Assets'])
+def _assets_moving_average(x, index):
+    return {'MA20_Assets': x['Fed_Total_Assets'].rolling(window=20, min_periods=10).mean()}
+
+@FED_FEATURES.feature(outputs=['MA20_Spread_SOFR_IORB'], inputs=['Spread_SOFR_IORB'])
+def _spread_moving_average(x, index):
+    return {'MA20_Spread_SOFR_IORB': x['Spread_SOFR_IORB'].rolling(window=20, min_periods=10).mean()}
+
+# --- YoY Comparisons (Shift 252 days) and 3-Year Baseline ---
+
+@FED_FEATURES.feature(outputs=['Prev_Year_RRP', 'YoY_RRP_Change'], inputs=['RRP_Balance'])
+def _rrp_yoy(x, index):
+    prev = x['RRP_Balance'].shift(252)
+    return {'Prev_Year_RRP': prev, 'YoY_RRP_Change': x['RRP_Balance'] - prev}
+
+@FED_FEATURES.feature(
+    outputs=['Prev_Year_Assets', 'YoY_Assets_Change', 'Prev_3Year_Assets', 'MA20_Assets_3Y_Avg'],
+    inputs=['Fed_Total_Assets']
+)
+def _assets_yoy(x, index):
+    assets = x['Fed_Total_Assets']
+    prev = assets.shift(252)
+    return {
+        'Prev_Year_Assets': prev,
+        'YoY_Assets_Change': assets - prev,  # Cumulative QT over 1 year
+        'Prev_3Year_Assets': assets.shift(756),
+        # 3-Year baseline: average of the MA20 one, two and three years ago
+        'MA20_Assets_3Y_Avg': (
+            assets.shift(252).rolling(20, min_periods=10).mean() +
+            assets.shift(504).rolling(20, min_periods=10).mean() +
+            assets.shift(756).rolling(20, min_periods=10).mean()
+        ) / 3,
+    }
+
+# --- MTD Flows ---
+# Stocks: MTD Change = Current - Month Start; Flows: MTD = Sum of daily changes
+
+@FED_FEATURES.feature(outputs=['YearMonth'])
+def _year_month(x, index):
+    return {'YearMonth': pd.Series(index.to_period('M'), index=index)}
+
+@FED_FEATURES.feature(outputs=['Month_Start_Assets', 'MTD_Assets_Change'], inputs=['YearMonth', 'Fed_Total_Assets'])
+def _assets_mtd(x, index):
+    month_start = x['Fed_Total_Assets'].groupby(x['YearMonth']).transform('first')
+    return {
+        'Month_Start_Assets': month_start,
+        'MTD_Assets_Change': x['Fed_Total_Assets'] - month_start,
+    }
+
+@FED_FEATURES.feature(outputs=['MTD_RRP_Flow'], inputs=['YearMonth', 'RRP_Change'])
+def _rrp_mtd_flow(x, index):
+    return {'MTD_RRP_Flow': x['RRP_Change'].groupby(x['YearMonth']).cumsum()}
+
+# --- Net Liquidity Analytics (multiple time horizons) ---
+
+@FED_FEATURES.feature(outputs=['_Net_Liquidity_Filled'], inputs=['Net_Liquidity'])
+def _net_liquidity_filled(x, index):
+    # Fill weekend/holiday gaps with last valid value before computing diffs
+    return {'_Net_Liquidity_Filled': x['Net_Liquidity'].ffill()}
+
+@FED_FEATURES.feature(
+    outputs=['Net_Liq_Change', 'Net_Liq_Weekly_Change', 'Net_Liq_Monthly_Change', 'Net_Liq_Quarterly_Change'],
+    inputs=['Net_Liquidity', '_Net_Liquidity_Filled']
+)
+def _net_liquidity_changes(x, index):
+    filled = x['_Net_Liquidity_Filled']
+    return {
+        'Net_Liq_Change': x['Net_Liquidity'].diff(),  # Daily (original, may have NaN)
+        'Net_Liq_Weekly_Change': filled.diff(5),       # Weekly (5 trading days)
+        'Net_Liq_Monthly_Change': filled.diff(22),     # Monthly (~22 trading days)
+        'Net_Liq_Quarterly_Change': filled.diff(65),   # Quarterly (~65 trading days)
+    }
+
+@FED_FEATURES.feature(outputs=['MA20_Net_Liq', 'MA5_Net_Liq'], inputs=['Net_Liquidity'])
+def _net_liquidity_moving_averages(x, index):
+    net_liq = x['Net_Liquidity']
+    return {
+        'MA20_Net_Liq': net_liq.rolling(window=20, min_periods=10).mean(),
+        'MA5_Net_Liq': net_liq.rolling(window=5, min_periods=2).mean(),
+    }
+
+@FED_FEATURES.feature(outputs=['Prev_Year_Net_Liq', 'YoY_Net_Liq_Change'], inputs=['Net_Liquidity'])
+def _net_liquidity_yoy(x, index):
+    prev = x['Net_Liquidity'].shift(252)
+    return {'Prev_Year_Net_Liq': prev, 'YoY_Net_Liq_Change': x['Net_Liquidity'] - prev}
+
+@FED_FEATURES.feature(outputs=['Month_Start_Net_Liq', 'MTD_Net_Liq_Change'], inputs=['YearMonth', 'Net_Liquidity'])
+def _net_liquidity_mtd(x, index):
+    month_start = x['Net_Liquidity'].groupby(x['YearMonth']).transform('first')
+    return {
+        'Month_Start_Net_Liq': month_start,
+        'MTD_Net_Liq_Change': x['Net_Liquidity'] - month_start,
+    }
+
+# --- Trend slope history (rolling OLS, backtestable) ---
+
+@FED_FEATURES.feature(
+    outputs=[f'{col}_Trend_Slope' for col in TREND_COLUMNS],
+    optional=list(TREND_COLUMNS)
+)
+def _trend_slopes(x, index):
+    trends = calculate_trend_slopes(pd.DataFrame(x, index=index))
+    return {col: trends[col] for col in trends.columns if col.endswith('_Trend_Slope')}
+
+def calculate_effective_policy_stance(df):
+    """
+    Distingue tra QT nominale e QE effettivo.
     
-    # Moving Averages (Smooth Noise)
-    # Use min_periods to handle weekend/holiday gaps (NaN values)
-    # 20-day calendar window has ~13-14 business days, use min_periods=10 for robustness
-    # 5-day calendar window has ~3-4 business days, use min_periods=2
-    if 'RRP_Balance' in df.columns:
-        df['MA20_RRP'] = df['RRP_Balance'].rolling(window=20, min_periods=10).mean()
-        df['MA5_RRP'] = df['RRP_Balance'].rolling(window=5, min_periods=2).mean()
-        
-    if 'Fed_Total_Assets' in df.columns:
-        df['MA20_Assets'] = df['Fed_Total_Assets'].rolling(window=20, min_periods=10).mean()
-        
-    if 'Spread_SOFR_IORB' in df.columns:
-        df['MA20_Spread_SOFR_IORB'] = df['Spread_SOFR_IORB'].rolling(window=20, min_periods=10).mean()
+    QT Nominale: Riduzione Fed_Total_Assets
+    QE Effettivo: Reinvestimento MBS -> T-Bills + REPO attivo
+    """
+    stance = FED_FEATURES.compute(df, POLICY_STANCE_COLUMNS)
+    return df.assign(**{col: stance[col] for col in stance.columns})
 
-    # YoY Comparisons (Shift 252 days)
-    if 'RRP_Balance' in df.columns:
-        df['Prev_Year_RRP'] = df['RRP_Balance'].shift(252)
-        df['YoY_RRP_Change'] = df['RRP_Balance'] - df['Prev_Year_RRP']
-        
-    if 'Fed_Total_Assets' in df.columns:
-        df['Prev_Year_Assets'] = df['Fed_Total_Assets'].shift(252)
-        df['YoY_Assets_Change'] = df['Fed_Total_Assets'] - df['Prev_Year_Assets'] # Cumulative QT over 1 year
+def calculate_metrics(df, outputs=None, max_workers=None):
+    """
+    Calculates derived metrics: Net Liquidity, Spreads, Changes.
 
-    # 3-Year Baseline (Assets)
-    if 'Fed_Total_Assets' in df.columns:
-        df['Prev_3Year_Assets'] = df['Fed_Total_Assets'].shift(756)
-        # Simple baseline: Average of last 3 years? Or just vs 3 years ago?
-        # Let's use 3-Year Moving Average as baseline (min_periods=10 for gaps)
-        df['MA20_Assets_3Y_Avg'] = (
-            df['Fed_Total_Assets'].shift(252).rolling(20, min_periods=10).mean() + 
-            df['Fed_Total_Assets'].shift(504).rolling(20, min_periods=10).mean() + 
-            df['Fed_Total_Assets'].shift(756).rolling(20, min_periods=10).mean()
-        ) / 3
-        
-    # MTD Flows
-    # For Balance Sheet items (Stocks), MTD Change = Current - Month Start
-    # For Flows (like RRP Change), MTD = Sum of daily changes
-    # Ensure index is DatetimeIndex
+    With `outputs=None` returns the input columns plus every derived
+    metric that can be computed. Otherwise only the requested columns are
+    returned, and only the features they depend on are evaluated.
+    The input frame is not modified.
+    """
     if not isinstance(df.index, pd.DatetimeIndex):
+        df = df.copy()
         df.index = pd.to_datetime(df.index)
-    df['YearMonth'] = df.index.to_period('M')
-    
-    if 'Fed_Total_Assets' in df.columns:
-        # Get the first value of the month for each row's month
-        # This is a bit tricky with daily data gaps. 
-        # Easier: Resample to month start, reindex?
-        # Or: Groupby transform 'first'
-        df['Month_Start_Assets'] = df.groupby('YearMonth')['Fed_Total_Assets'].transform('first')
-        df['MTD_Assets_Change'] = df['Fed_Total_Assets'] - df['Month_Start_Assets']
-        
-    if 'RRP_Change' in df.columns:
-        df['MTD_RRP_Flow'] = df.groupby('YearMonth')['RRP_Change'].cumsum()
 
-    # Net Liquidity Analytics (multiple time horizons)
-    # Use ffill() to handle weekend/holiday gaps before computing diffs
-    if 'Net_Liquidity' in df.columns:
-        net_liq_filled = df['Net_Liquidity'].ffill()  # Fill gaps with last valid value
-        # Daily, Weekly, Monthly, Quarterly changes
-        df['Net_Liq_Change'] = df['Net_Liquidity'].diff()  # Daily (original, may have NaN)
-        df['Net_Liq_Weekly_Change'] = net_liq_filled.diff(5)  # Weekly (5 trading days)
-        df['Net_Liq_Monthly_Change'] = net_liq_filled.diff(22)  # Monthly (~22 trading days)
-        df['Net_Liq_Quarterly_Change'] = net_liq_filled.diff(65)  # Quarterly (~65 trading days)
-        
-        # Moving averages
-        df['MA20_Net_Liq'] = df['Net_Liquidity'].rolling(window=20, min_periods=10).mean()
-        df['MA5_Net_Liq'] = df['Net_Liquidity'].rolling(window=5, min_periods=2).mean()
-        
-        # YoY
-        df['Prev_Year_Net_Liq'] = df['Net_Liquidity'].shift(252)
-        df['YoY_Net_Liq_Change'] = df['Net_Liquidity'] - df['Prev_Year_Net_Liq']
+    result = FED_FEATURES.compute(df, outputs, max_workers=max_workers)
+
+    wants_net_liq = outputs is None or 'Net_Liquidity' in outputs
+    if wants_net_liq and 'Net_Liquidity' not in result.columns:
+        print("❌ Cannot calculate Net Liquidity - missing required columns")
+
+    return result
+
+def classify_trend(slope, flat_threshold=0):
+    """
+    Maps a trend slope to the arrow label used in reports.
+    """
+    if pd.isna(slope):
+        return "N/A"
+    if slope > flat_threshold:
+        return "↑ Rising"
+    elif slope < -flat_threshold:
+        return "↓ Declining"
+    return "→ Flat"
+
+def calculate_trend_slopes(df, columns=None, window=TREND_WINDOW_DAYS, min_periods=TREND_MIN_PERIODS):
+    """
+    Adds a `<column>_Trend_Slope` column for each trend series.
+    Slopes come from a rolling OLS fit over the last `window` rows,
+    so every date carries the trend that was visible on that date.
+    """
+    if columns is None:
+        columns = TREND_COLUMNS
+    columns = [c for c in columns if c in df.columns]
+    if not columns or df.empty:
+        return df
 
-        # MTD Net Liquidity Change
-        df['Month_Start_Net_Liq'] = df.groupby('YearMonth')['Net_Liquidity'].transform('first')
-        df['MTD_Net_Liq_Change'] = df['Net_Liquidity'] - df['Month_Start_Net_Liq']
+    fits = rolling_ols(df[columns], window=window, min_periods=min_periods)
+    for col in columns:
+        df[f'{col}_Trend_Slope'] = fits['slope'][col]
 
     return df
 
@@ -662,6 +797,86 @@ def calculate_qtd_metrics(df):
     
     return metrics
 
+def load_period_metrics(db_path="database/treasury_data.duckdb", asof=None):
+    """
+    MTD and QTD metrics read from the stored month/quarter rollups of
+    'fed_liquidity_daily' (same keys as calculate_mtd_metrics and
+    calculate_qtd_metrics, without re-aggregating the daily history).
+    Returns: (mtd_metrics, qtd_metrics); empty dicts if no rollup is stored.
+    """
+    try:
+        db = open_snapshot(db_path)
+    except Exception as e:
+        print(f"⚠️ Could not open {db_path}: {e}")
+        return {}, {}
+    try:
+        month = read_rollup(db, 'fed_liquidity_daily', 'month', asof=asof)
+        quarter = read_rollup(db, 'fed_liquidity_daily', 'quarter', asof=asof)
+    finally:
+        db.close()
+
+    def change(row, col):
+        return period_value(row, f'{col}_last') - period_value(row, f'{col}_first')
+
+    mtd = {}
+    if not month.empty:
+        row = month.iloc[-1]
+        days = int(row['days'])
+        mtd = {
+            'mtd_days': days,
+            'month_start': month.index[-1].strftime('%Y-%m-%d'),
+            'month_end': row['period_end'].strftime('%Y-%m-%d')
+        }
+        if 'RRP_Balance_first' in row and days > 1:
+            first = period_value(row, 'RRP_Balance_first')
+            valid = pd.notna(first) and first != 0
+            mtd['rrp_mtd_change'] = change(row, 'RRP_Balance') if valid else np.nan
+            mtd['rrp_mtd_pct'] = change(row, 'RRP_Balance') / first * 100 if valid else np.nan
+            mtd['rrp_mtd_avg'] = period_value(row, 'RRP_Balance_avg')
+            if 'RRP_Change_sum' in row:
+                mtd['rrp_mtd_flow'] = period_value(row, 'RRP_Change_sum')
+        if 'Net_Liquidity_first' in row and days > 1:
+            mtd['net_liq_mtd_change'] = change(row, 'Net_Liquidity')
+            mtd['net_liq_mtd_avg'] = period_value(row, 'Net_Liquidity_avg')
+            if 'Net_Liq_Change_sum' in row:
+                mtd['net_liq_mtd_flow'] = period_value(row, 'Net_Liq_Change_sum')
+        if 'Fed_Total_Assets_first' in row:
+            mtd['assets_mtd_change'] = change(row, 'Fed_Total_Assets')
+            mtd['assets_mtd_avg'] = period_value(row, 'Fed_Total_Assets_avg')
+        if 'Spread_SOFR_IORB_avg' in row:
+            mtd['sofr_iorb_mtd_avg'] = period_value(row, 'Spread_SOFR_IORB_avg')
+            mtd['sofr_iorb_mtd_max'] = period_value(row, 'Spread_SOFR_IORB_max')
+            mtd['sofr_iorb_mtd_min'] = period_value(row, 'Spread_SOFR_IORB_min')
+        if 'Spread_EFFR_IORB_avg' in row:
+            mtd['effr_iorb_mtd_avg'] = period_value(row, 'Spread_EFFR_IORB_avg')
+
+    qtd = {}
+    if not quarter.empty:
+        row = quarter.iloc[-1]
+        days = int(row['days'])
+        qtd = {
+            'qtd_days': days,
+            'quarter_start': quarter.index[-1].strftime('%Y-%m-%d'),
+            'quarter_end': row['period_end'].strftime('%Y-%m-%d')
+        }
+        if 'RRP_Balance_first' in row and days > 1:
+            first = period_value(row, 'RRP_Balance_first')
+            valid = pd.notna(first) and first != 0
+            qtd['rrp_qtd_change'] = change(row, 'RRP_Balance') if valid else np.nan
+            qtd['rrp_qtd_pct'] = change(row, 'RRP_Balance') / first * 100 if valid else np.nan
+            qtd['rrp_qtd_avg'] = period_value(row, 'RRP_Balance_avg')
+        if 'Fed_Total_Assets_first' in row:
+            qtd['qt_pace_qtd'] = change(row, 'Fed_Total_Assets')
+            # Annualize: (change / days) * 252
+            qtd['qt_pace_annualized'] = qtd['qt_pace_qtd'] / days * 252
+        if 'Spread_SOFR_IORB_std' in row:
+            qtd['sofr_spread_qtd_vol'] = period_value(row, 'Spread_SOFR_IORB_std')
+            qtd['sofr_spread_qtd_avg'] = period_value(row, 'Spread_SOFR_IORB_avg')
+        if 'Repo_Ops_Balance_M_avg' in row:
+            qtd['repo_qtd_avg'] = period_value(row, 'Repo_Ops_Balance_M_avg')
+
+    return mtd, qtd
+
 def calculate_rolling_3m_metrics(df):
     """
     Calculate 3-month rolling metrics.
@@ -695,20 +910,12 @@ def calculate_rolling_3m_metrics(df):
         metrics['sofr_spread_3m_avg'] = rolling_3m_data['Spread_SOFR_IORB'].mean()
         metrics['sofr_spread_3m_std'] = rolling_3m_data['Spread_SOFR_IORB'].std()
     
-    # Trend Detection (simple linear regression slope)
+    # Trend Detection (rolling OLS slope over the 3M window)
     if 'Net_Liquidity' in df.columns:
-        x = np.arange(len(rolling_3m_data))
-        y = rolling_3m_data['Net_Liquidity'].values
-        if len(x) > 1:
-            slope = np.polyfit(x, y, 1)[0]
-            if slope > 1000:  # Millions per day
-                metrics['net_liq_3m_trend'] = "↑ Rising"
-            elif slope < -1000:
-                metrics['net_liq_3m_trend'] = "↓ Declining"
-            else:
-                metrics['net_liq_3m_trend'] = "→ Flat"
-        else:
-            metrics['net_liq_3m_trend'] = "N/A"
+        fit = rolling_ols(rolling_3m_data['Net_Liquidity'], window=63, min_periods=2)
+        slope = fit['slope']['Net_Liquidity'].iloc[-1]
+        metrics['net_liq_3m_slope'] = slope
+        metrics['net_liq_3m_trend'] = classify_trend(slope, flat_threshold=1000)  # Millions per day
     
     return metrics
 
@@ -1009,136 +1216,161 @@ def calculate_correlations(df):
     
     return correlations
 
-def forecast_simple_trend(df, column, periods=5):
+def forecast_simple_trend(df, column, periods=TREND_FORECAST_PERIODS):
     """
     Simple linear trend forecast for next N periods.
     Returns dict with forecast values and trend direction.
     """
-    if df.empty or column not in df.columns or len(df) < 20:
+    if df.empty or column not in df.columns or len(df) < TREND_WINDOW_DAYS:
         return {}
-    
-    # Use last 20 days for trend
-    recent = df[column].tail(20).dropna()
-    
-    if len(recent) < 10:
+
+    # Fit only the latest window; full slope history lives in *_Trend_Slope
+    recent = df[column].tail(TREND_WINDOW_DAYS)
+    fit = rolling_ols(recent, window=TREND_WINDOW_DAYS, min_periods=TREND_MIN_PERIODS, horizon=periods)
+
+    slope = fit['slope'][column].iloc[-1]
+    if pd.isna(slope):
         return {}
-    
-    # Simple linear regression
-    x = np.arange(len(recent))
-    y = recent.values
-    
-    # Fit line: y = mx + b
-    coeffs = np.polyfit(x, y, 1)
-    slope = coeffs[0]
-    intercept = coeffs[1]
-    
-    # Forecast next periods
-    future_x = np.arange(len(recent), len(recent) + periods)
+
+    intercept = fit['intercept'][column].iloc[-1]
+    n_obs = int(fit['n_obs'][column].iloc[-1])
+
+    # Forecast next periods (x = 0 is the first valid point of the window)
+    future_x = np.arange(n_obs, n_obs + periods)
     forecast = slope * future_x + intercept
-    
-    # Determine trend
-    if slope > 0:
-        trend = "↑ Rising"
-    elif slope < 0:
-        trend = "↓ Declining"
-    else:
-        trend = "→ Flat"
-    
-    # Calculate confidence (R²)
-    y_pred = slope * x + intercept
-    ss_res = np.sum((y - y_pred) ** 2)
-    ss_tot = np.sum((y - np.mean(y)) ** 2)
-    r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-    
+
     return {
         'forecast': forecast.tolist(),
-        'trend': trend,
+        'trend': classify_trend(slope),
         'slope': slope,
-        'r_squared': r_squared,
-        'current': recent.iloc[-1],
+        'r_squared': fit['r_squared'][column].iloc[-1],
+        'current': recent.dropna().iloc[-1],
         'forecast_5d': forecast[-1]
     }
 
-def check_alerts(df, mtd_metrics, qtd_metrics, spike_analysis, stress_metrics):
+def stress_index_values(columns):
     """
-    Check for alert conditions and return list of alerts.
+    Stress index (0-100) from a dict of input arrays of any common shape
+    (e.g. dates, or scenarios x dates). Missing inputs count as 0 stress.
+    Inputs: Spread_SOFR_IORB, Spread_EFFR_IORB, SOFR_Vol_5D, RRP_Balance,
+    MA20_RRP, Repo_Ops_Balance_M.
     """
-    alerts = []
-    
+    shape = np.shape(next(iter(columns.values())))
+
+    def _col(name):
+        if name in columns:
+            return np.asarray(columns[name], dtype=float)
+        return np.full(shape, np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Component 1: SOFR-IORB Spread (0-20 bps = 0-100 scale)
+        sofr_stress = np.clip(_col('Spread_SOFR_IORB'), 0, 0.20) / 0.20 * 100
+
+        # Component 2: EFFR-IORB Spread, only positive spreads contribute
+        effr_spread = np.clip(_col('Spread_EFFR_IORB'), -0.05, 0.15)
+        effr_stress = np.where(effr_spread > 0, effr_spread / 0.15 * 100, 0)
+
+        # Component 3: Spread Volatility (5-day std)
+        vol_stress = np.clip(_col('SOFR_Vol_5D'), 0, 0.10) / 0.10 * 100
+
+        # Component 4: RRP Usage (inverted: low RRP vs MA20 = high stress)
+        rrp_ma = _col('MA20_RRP')
+        rrp_ratio = _col('RRP_Balance') / rrp_ma
+        rrp_stress = np.where(rrp_ma > 0, np.clip((1 - rrp_ratio) * 100, 0, 100), 0)
+
+        # Component 5: Repo Ops Usage (100B = 100)
+        repo_stress = np.maximum(_col('Repo_Ops_Balance_M'), 0) / 100000 * 100
+
+    components = np.stack([sofr_stress, effr_stress, vol_stress, rrp_stress, repo_stress], axis=-1)
+    components = np.clip(np.nan_to_num(components, nan=0.0, posinf=0.0, neginf=0.0), 0, 100)
+
+    weights = np.array([0.30, 0.20, 0.15, 0.20, 0.15])  # Fixed weights
+    return np.clip(components @ weights, 0, 100)
+
+def calculate_stress_index_history(df):
+    """
+    Vectorized calculate_stress_index() for every row of the panel.
+    Returns a Series (0-100) aligned with df.
+    """
+    columns = {
+        name: df[name].to_numpy(dtype=float, na_value=np.nan)
+        for name in STRESS_INDEX_INPUTS if name in df.columns
+    }
+    if not columns:
+        return pd.Series(0.0, index=df.index, name='Stress_Index')
+    return pd.Series(stress_index_values(columns), index=df.index, name='Stress_Index')
+
+def build_alert_panel(df):
+    """
+    Builds the history of every quantity tested by ALERT_RULES.
+    Returns a DataFrame aligned with df.
+    """
+    panel = pd.DataFrame(index=df.index)
     if df.empty:
-        return alerts
-    
-    last_row = df.iloc[-1]
-    
-    # Alert 1: High Stress Index
-    if stress_metrics.get('stress_index', 0) >= 75:
-        alerts.append({
-            'severity': 'CRITICAL',
-            'type': 'STRESS',
-            'message': f"Stress Index at {stress_metrics['stress_index']:.0f}/100 (HIGH STRESS)"
-        })
-    elif stress_metrics.get('stress_index', 0) >= 50:
-        alerts.append({
-            'severity': 'WARNING',
-            'type': 'STRESS',
-            'message': f"Stress Index at {stress_metrics['stress_index']:.0f}/100 (ELEVATED)"
-        })
-    
-    # Alert 2: Spread Spike
-    if spike_analysis.get('current_spike', False):
-        severity = spike_analysis.get('severity', 'NORMAL')
-        if severity in ['CRITICAL', 'WARNING']:
-            alerts.append({
-                'severity': severity,
-                'type': 'SPREAD_SPIKE',
-                'message': f"SOFR-IORB Spread spike detected: {spike_analysis.get('current_value', 0):.2f} bps ({severity})"
-            })
-    
-    # Alert 3: Large MTD RRP Change
-    if 'rrp_mtd_change' in mtd_metrics:
-        rrp_change_pct = abs(mtd_metrics.get('rrp_qtd_pct', 0)) if 'rrp_qtd_pct' in mtd_metrics else 0
-        if rrp_change_pct > 50:  # >50% change
-            alerts.append({
-                'severity': 'INFO',
-                'type': 'RRP_FLOW',
-                'message': f"Large RRP movement: {mtd_metrics['rrp_mtd_change']:+,.0f}B MTD"
-            })
-    
-    # Alert 4: QT Pace Acceleration
-    if 'qt_pace_annualized' in qtd_metrics:
-        qt_pace = qtd_metrics['qt_pace_annualized']
-        if qt_pace < -1000000:  # QT > 1T/year
-            alerts.append({
-                'severity': 'WARNING',
-                'type': 'QT_PACE',
-                'message': f"Aggressive QT pace: ${qt_pace:,.0f}M/year annualized"
-            })
-    
-    # Alert 5: Net Liquidity Extreme
-    if 'Net_Liquidity' in df.columns and 'net_liq_3m_percentile' in mtd_metrics:
-        percentile = mtd_metrics.get('net_liq_3m_percentile', 50)
-        if percentile < 10:
-            alerts.append({
-                'severity': 'WARNING',
-                'type': 'LIQUIDITY',
-                'message': f"Net Liquidity at {percentile:.0f}th percentile (3M) - Very Low"
-            })
-        elif percentile > 90:
-            alerts.append({
-                'severity': 'INFO',
-                'type': 'LIQUIDITY',
-                'message': f"Net Liquidity at {percentile:.0f}th percentile (3M) - Very High"
-            })
-    
-    # Alert 6: Swap Lines Activation
-    if 'Swap_Lines' in last_row and last_row['Swap_Lines'] > 1000:  # >1B
-        alerts.append({
-            'severity': 'CRITICAL',
-            'type': 'SWAP_LINES',
-            'message': f"Central Bank Swap Lines active: ${last_row['Swap_Lines']:,.0f}M"
-        })
-    
-    return alerts
+        return panel
+
+    panel['Stress_Index'] = calculate_stress_index_history(df)
+
+    # Spread distance from MA20 in standard deviations (as of last print)
+    if 'Spread_SOFR_IORB' in df.columns:
+        spread = df['Spread_SOFR_IORB'].dropna()
+        ma20 = spread.rolling(20, min_periods=10).mean()
+        std20 = spread.rolling(20, min_periods=10).std()
+        panel['Spread_SOFR_IORB_Z20'] = ((spread - ma20) / std20).reindex(df.index).ffill()
+
+    quarter = df.index.to_period('Q')
+
+    # RRP QTD % change (first valid vs latest valid value in the quarter)
+    if 'RRP_Balance' in df.columns:
+        rrp = df['RRP_Balance']
+        first = rrp.groupby(quarter).transform('first')
+        latest = rrp.groupby(quarter).ffill()
+        panel['RRP_QTD_Pct'] = ((latest - first) / first.where(first != 0)) * 100
+
+    # QT pace, annualized from the QTD change in assets
+    if 'Fed_Total_Assets' in df.columns:
+        assets = df['Fed_Total_Assets']
+        first = assets.groupby(quarter).transform('first')
+        days = assets.groupby(quarter).cumcount() + 1
+        panel['QT_Pace_Annualized'] = (assets - first) / days * 252
+
+    # Net Liquidity percentile rank within the trailing 3M window
+    if 'Net_Liquidity' in df.columns and len(df) >= ROLLING_3M_DAYS:
+        values = df['Net_Liquidity'].to_numpy(dtype=float, na_value=np.nan)
+        windows = np.lib.stride_tricks.sliding_window_view(values, ROLLING_3M_DAYS)
+        with np.errstate(invalid='ignore'):
+            below = (windows < windows[:, -1:]).sum(axis=1)
+        percentile = np.full(len(values), np.nan)
+        # No rank for a missing current value (NaN compares as not below)
+        percentile[ROLLING_3M_DAYS - 1:] = np.where(np.isnan(windows[:, -1]), np.nan,
+                                                    below / ROLLING_3M_DAYS * 100)
+        panel['Net_Liq_3M_Percentile'] = percentile
+
+    if 'Swap_Lines' in df.columns:
+        panel['Swap_Lines'] = df['Swap_Lines']
+
+    return panel
+
+def evaluate_alert_rules(df, rules=None):
+    """
+    Compiles alert rules into boolean masks over the full history.
+    Returns: (alert panel, masks)
+    """
+    if rules is None:
+        rules = ALERT_RULES
+    panel = build_alert_panel(df)
+    return panel, compile_rules(panel, rules)
+
+def check_alerts(df, rules=None):
+    """
+    Check for alert conditions on the latest date and return list of alerts.
+    """
+    if df.empty:
+        return []
+    if rules is None:
+        rules = ALERT_RULES
+    panel, masks = evaluate_alert_rules(df, rules)
+    return latest_alerts(panel, masks, rules)
 
 def generate_report(df, series_metadata=None):
     """
@@ -1181,7 +1413,9 @@ def generate_report(df, series_metadata=None):
     correlations = calculate_correlations(df)
     net_liq_forecast = forecast_simple_trend(df, 'Net_Liquidity', periods=5)
     rrp_forecast = forecast_simple_trend(df, 'RRP_Balance', periods=5)
-    alerts = check_alerts(df, mtd_metrics, qtd_metrics, spike_analysis, stress_metrics)
+    alert_panel, alert_masks = evaluate_alert_rules(df)
+    alerts = latest_alerts(alert_panel, alert_masks, ALERT_RULES)
+    alert_history = alert_statistics(alert_masks.tail(ALERT_HISTORY_DAYS))
 
     # Data freshness check
     freshness_report = {}
@@ -1214,6 +1448,18 @@ def generate_report(df, series_metadata=None):
                 'INFO': 'ℹ️'
             }.get(alert['severity'], '•')
             print(f"{severity_icon} [{alert['severity']}] {alert['message']}")
+
+    # ===== ALERT HISTORY =====
+    fired = alert_history[alert_history['episodes'] > 0]
+    if not fired.empty:
+        print("\n" + "─"*60)
+        print(f"ALERT HISTORY (Last {ALERT_HISTORY_DAYS} Days)")
+        print("─"*60)
+        for name, row in fired.iterrows():
+            last_alert = row['last_alert'].strftime('%Y-%m-%d') if pd.notna(row['last_alert']) else 'N/A'
+            status = " (ACTIVE)" if row['active'] else ""
+            print(f"  {name:<24} {row['alert_rate']:>6.1%} of days, "
+                  f"{int(row['episodes'])} episodes, last {last_alert}{status}")
     
     # ===== REGIME DETECTION =====
     if regime_info:
@@ -1563,21 +1809,13 @@ def generate_report(df, series_metadata=None):
     print(f"\n{'='*60}")
     print("💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
-        # Save full data
-        df_save = df.reset_index()
-        if 'index' in df_save.columns:
-            df_save = df_save.rename(columns={'index': 'record_date'})
-        elif 'date' in df_save.columns:
-            df_save = df_save.rename(columns={'date': 'record_date'})
-            
-        # Convert Period objects to string for DuckDB compatibility
-        for col in df_save.columns:
-            if isinstance(df_save[col].dtype, pd.PeriodDtype):
-                df_save[col] = df_save[col].astype(str)
-                
-        db.upsert_data(df_save, "fed_liquidity_daily", key_col="record_date")
+        # Save full data (one Arrow conversion; date index stored as record_date)
+        df_save = to_arrow_table(df, index_col="record_date")
+        with db.transaction():
+            db.upsert_data(df_save, "fed_liquidity_daily", key_col="record_date")
+            db.write_series(df_save, "fed_liquidity_daily")
         print("✅ Fed liquidity data saved to 'fed_liquidity_daily'")
         db.close()
     except Exception as e:
@@ -5,7 +5,13 @@ import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from utils.db_manager import TimeSeriesDB
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import open_snapshot, open_writer, to_arrow_table
+from utils.data_loader import load_sources
+from utils.online_stats import WelfordAccumulator, rolling_zscore, load_state, save_state
+from utils.walk_forward import run_walk_forward
+from utils.alignment import align_asof
 
 """
 Liquidity Composite Index (LCI)
@@ -70,6 +76,52 @@ FAILS_SEARCH_PATHS = [
     "fed/outputs/fed/nyfed_settlement_fails.csv",
 ]
 
+# Columns read from each source (primary names plus legacy fallbacks)
+FISCAL_COLUMNS = ["MA20_Net_Impulse", "MA20_Impulse", "TGA_Balance", "Withheld_Tax", "Total_Taxes"]
+
+FED_COLUMNS = [
+    "Net_Liquidity",
+    "Net_Balance_Sheet_Flow", "Flow_Nominal_Assets", "QT_Pace_Assets_Weekly",
+    "Qualitative_Easing_Support", "QE_Effective",
+    "RRP_Change",
+    "Repo_Ops_Balance_M", "Repo_Ops_Balance",
+    "Spread_SOFR_IORB",
+]
+
+REPO_COLUMNS = ["submission_ratio"]
+FAILS_COLUMNS = ["totalFails"]
+OFR_COLUMNS = ["Repo_Stress_Index"]
+
+# Source registry: where each input lives and which columns the index uses
+DB_PATH = "database/treasury_data.duckdb"
+
+SOURCES = {
+    "fiscal": {"paths": FISCAL_SEARCH_PATHS, "columns": FISCAL_COLUMNS,
+               "table": "fiscal_daily_metrics", "db_path": DB_PATH},
+    "fed": {"paths": FED_SEARCH_PATHS, "columns": FED_COLUMNS,
+            "table": "fed_liquidity_daily", "db_path": DB_PATH},
+    "repo": {"paths": REPO_SEARCH_PATHS, "columns": REPO_COLUMNS,
+             "table": "nyfed_repo_ops", "db_path": DB_PATH},
+    "fails": {"paths": FAILS_SEARCH_PATHS, "columns": FAILS_COLUMNS,
+              "table": "nyfed_settlement_fails", "db_path": DB_PATH},
+    "ofr": {"paths": OFR_SEARCH_PATHS, "columns": OFR_COLUMNS,
+            "table": "ofr_financial_stress", "db_path": DB_PATH},
+}
+
+SOURCE_LABELS = {
+    "fiscal": "Fiscal data",
+    "fed": "Fed liquidity data",
+    "repo": "Repo operations data",
+    "fails": "Settlement fails data",
+    "ofr": "OFR repo analysis data",
+}
+
+# Backends tried in order for every source (csv, parquet, duckdb)
+DATA_BACKENDS = tuple(b.strip() for b in os.getenv("LCI_DATA_BACKENDS", "csv").split(","))
+
+# Full-sample LCI engine: 'pandas' or 'duckdb' (SQL over the stored tables)
+ENGINE = os.getenv("LCI_ENGINE", "pandas")
+
 # ... (Weights are imported from config.py, assuming config.py is imported or defined here. 
 # Wait, config.py is NOT imported in the original file! It defines WEIGHTS locally!
 # I need to update the local WEIGHTS definitions to match config.py or import them.
@@ -109,86 +161,71 @@ PLUMBING_WEIGHTS = {
     "ofr_stress": 0.30              # NEW: OFR Repo Market Stress
 }
 
-def load_data():
-    """
-    Loads data from all modules.
-    """
-    print("Loading data from CSV files...")
-
-    data = {}
-
-    # Resolve paths
-    fiscal_path = find_file("fiscal_analysis_full.csv", FISCAL_SEARCH_PATHS)
-    fed_path = find_file("fed_liquidity_full.csv", FED_SEARCH_PATHS)
-    repo_path = find_file("nyfed_repo_ops.csv", REPO_SEARCH_PATHS)
-    fails_path = find_file("nyfed_settlement_fails.csv", FAILS_SEARCH_PATHS)
-    ofr_path = find_file("ofr_repo_analysis.csv", OFR_SEARCH_PATHS)
+# As-of rules of the plumbing signals (see utils.alignment.align_asof):
+# daily series carry over weekends/holidays, weekly fails hold until the
+# next publication (tolerance None)
+PLUMBING_ALIGNMENT = {
+    "repo_stress": {"frequency": "daily", "tolerance_days": 4, "lag_days": 0},
+    "fails_stress": {"frequency": "weekly", "tolerance_days": None, "lag_days": 0},
+    "ofr_stress": {"frequency": "daily", "tolerance_days": 4, "lag_days": 0},
+}
 
-    try:
-        if fiscal_path:
-            df_fiscal = pd.read_csv(fiscal_path, index_col=0, parse_dates=True)
-            data['fiscal'] = df_fiscal
-            print(f"Fiscal data loaded: {len(df_fiscal)} records")
-        else:
-            print("Fiscal data file not found")
-            data['fiscal'] = pd.DataFrame()
-    except Exception as e:
-        print(f"Could not load fiscal data: {e}")
-        data['fiscal'] = pd.DataFrame()
+# Pillar -> (index column, WEIGHTS key, sub-component weights)
+PILLARS = {
+    "fiscal": ("Fiscal_Index", "fiscal_liquidity", FISCAL_WEIGHTS),
+    "monetary": ("Monetary_Index", "monetary_liquidity", MONETARY_WEIGHTS),
+    "plumbing": ("Plumbing_Index", "market_plumbing", PLUMBING_WEIGHTS),
+}
 
-    try:
-        if fed_path:
-            df_fed = pd.read_csv(fed_path, index_col=0, parse_dates=True)
-            data['fed'] = df_fed
-            print(f"Fed liquidity data loaded: {len(df_fed)} records")
-        else:
-            print("Fed liquidity data file not found")
-            data['fed'] = pd.DataFrame()
-    except Exception as e:
-        print(f"Could not load Fed data: {e}")
-        data['fed'] = pd.DataFrame()
+REGIME_BINS = [-np.inf, -1, -0.5, 0.5, 1, np.inf]
+REGIME_LABELS = ['Very Tight', 'Tight', 'Neutral', 'Easy', 'Very Easy']
+
+# Component normalization
+# 'zscore' (full sample, default) rewrites history as data arrives;
+# 'expanding' / 'rolling' are point-in-time and updated incrementally
+# from a persisted Welford state (see update_composite_index)
+NORMALIZATION = {
+    "method": os.getenv("LCI_NORMALIZATION", "zscore"),
+    "window": 252,          # Observations per rolling window
+    "min_periods": 20,      # Observations before a component is scored
+    "state_path": "outputs/composite/lci_normalization_state.json",
+}
 
-    try:
-        if repo_path:
-            df_repo = pd.read_csv(repo_path, index_col=0, parse_dates=True)
-            data['repo'] = df_repo
-            print(f"Repo operations data loaded: {len(df_repo)} records")
-        else:
-            print("Repo operations data file not found")
-            data['repo'] = pd.DataFrame()
-    except Exception as e:
-        print(f"Could not load repo data: {e}")
-        data['repo'] = pd.DataFrame()
+# Block bootstrap of the full-sample LCI (see bootstrap_composite_index)
+BOOTSTRAP = {
+    "replicates": int(os.getenv("LCI_BOOTSTRAP_REPLICATES", "5000")),
+    "block": 20,                        # Rows per resampled block (~1 month)
+    "percentiles": (5, 25, 50, 75, 95),
+}
 
-    try:
-        if fails_path:
-            df_fails = pd.read_csv(fails_path, index_col=0, parse_dates=True)
-            data['fails'] = df_fails
-            print(f"Settlement fails data loaded: {len(df_fails)} records")
-        else:
-            print("Settlement fails data file not found")
-            data['fails'] = pd.DataFrame()
-    except Exception as e:
-        print(f"Could not load fails data: {e}")
-        data['fails'] = pd.DataFrame()
-        
-    try:
-        if ofr_path:
-            df_ofr = pd.read_csv(ofr_path, index_col=0, parse_dates=True)
-            data['ofr'] = df_ofr
-            print(f"OFR repo analysis data loaded: {len(df_ofr)} records")
+def load_data(backends=None, max_workers=None):
+    """
+    Loads data from all modules (only the columns the index uses).
+    Sources load in parallel and unchanged files are served from the
+    in-process cache.
+    """
+    if backends is None:
+        backends = DATA_BACKENDS
+    print(f"Loading data ({' > '.join(backends)})...")
+
+    data = load_sources(SOURCES, backends, max_workers)
+    for name, df in data.items():
+        if df.empty:
+            print(f"{SOURCE_LABELS[name]} not found")
         else:
-            print("OFR repo analysis data file not found")
-            data['ofr'] = pd.DataFrame()
-    except Exception as e:
-        print(f"Could not load OFR data: {e}")
-        data['ofr'] = pd.DataFrame()
+            print(f"{SOURCE_LABELS[name]} loaded: {len(df)} records")
 
     return data
 
-def normalize_series(series, method='zscore'):
+def normalize_series(series, method='zscore', window=None, min_periods=None):
     """
     Normalizes a series using z-score or min-max scaling.
+
+    Methods:
+    - 'zscore': full-sample mean/std (rewrites history as data arrives)
+    - 'expanding': point-in-time z-score using all observations so far
+    - 'rolling': point-in-time z-score over the last `window` observations
+    - 'minmax': full-sample scaling to [0, 1]
     """
     if series.empty or series.isna().all():
         return series
@@ -201,6 +238,15 @@ def normalize_series(series, method='zscore'):
             return series - mean
         return (series - mean) / std
 
+    elif method in ('expanding', 'rolling'):
+        if window is None:
+            window = NORMALIZATION['window']
+        if min_periods is None:
+            min_periods = NORMALIZATION['min_periods']
+        frame = series.to_frame()
+        z = rolling_zscore(frame, window if method == 'rolling' else None, min_periods)
+        return z.iloc[:, 0]
+
     elif method == 'minmax':
         # Min-Max scaling to [0, 1]
         min_val = series.min()
@@ -211,220 +257,1168 @@ def normalize_series(series, method='zscore'):
 
     return series
 
-def calculate_fiscal_component(df_fiscal):
+def _dedupe_dates(df):
+    """Aggregates duplicate dates (numeric columns only)."""
+    if not df.empty and df.index.duplicated().any():
+        return df.groupby(df.index).mean(numeric_only=True)
+    return df
+
+def fiscal_inputs(df_fiscal):
     """
-    Calculates Fiscal Liquidity sub-index.
-    Higher = More fiscal liquidity injection.
+    Signed raw inputs of the Fiscal sub-index (higher = more liquidity).
+    Returns a DataFrame with one column per sub-component.
     """
     if df_fiscal.empty:
-        return pd.Series(dtype=float)
-
-    # Remove duplicate dates by aggregating
-    if df_fiscal.index.duplicated().any():
-        df_fiscal = df_fiscal.groupby(df_fiscal.index).mean()
+        return pd.DataFrame(index=df_fiscal.index)
 
-    fiscal_index = pd.Series(0.0, index=df_fiscal.index)
+    df_fiscal = _dedupe_dates(df_fiscal)
+    inputs = pd.DataFrame(index=df_fiscal.index)
 
-    # 1. Fiscal Impulse (MA20, normalized)
+    # 1. Fiscal Impulse (MA20)
     # Try MA20_Net_Impulse first (new name), fall back to MA20_Impulse (old name)
-    impulse_col = None
     if 'MA20_Net_Impulse' in df_fiscal.columns:
-        impulse_col = 'MA20_Net_Impulse'
+        inputs['impulse'] = df_fiscal['MA20_Net_Impulse']
     elif 'MA20_Impulse' in df_fiscal.columns:
-        impulse_col = 'MA20_Impulse'
-    
-    if impulse_col:
-        impulse_norm = normalize_series(df_fiscal[impulse_col], method='zscore')
-        fiscal_index += impulse_norm * FISCAL_WEIGHTS['impulse']
+        inputs['impulse'] = df_fiscal['MA20_Impulse']
 
     # 2. TGA Drawdown (negative change = injection, so invert sign)
     if 'TGA_Balance' in df_fiscal.columns:
-        tga_change = df_fiscal['TGA_Balance'].diff()
-        tga_drawdown = -tga_change  # Negative change = positive liquidity
-        tga_norm = normalize_series(tga_drawdown, method='zscore')
-        fiscal_index += tga_norm * FISCAL_WEIGHTS['tga']
+        inputs['tga'] = -df_fiscal['TGA_Balance'].diff()
 
     # 3. Tax Receipts (negative impact on liquidity, invert)
     # Try Withheld_Tax first, fall back to Total_Taxes
-    tax_col = None
     if 'Withheld_Tax' in df_fiscal.columns:
-        tax_col = 'Withheld_Tax'
+        inputs['taxes'] = -df_fiscal['Withheld_Tax']  # Tax = drain
     elif 'Total_Taxes' in df_fiscal.columns:
-        tax_col = 'Total_Taxes'
-
-    if tax_col:
-        tax_extraction = -df_fiscal[tax_col]  # Tax = drain
-        tax_norm = normalize_series(tax_extraction, method='zscore')
-        fiscal_index += tax_norm * FISCAL_WEIGHTS['taxes']
+        inputs['taxes'] = -df_fiscal['Total_Taxes']
 
-    return fiscal_index
+    return inputs
 
-def calculate_monetary_component(df_fed):
+def monetary_inputs(df_fed):
     """
-    Calculates Monetary Liquidity sub-index.
-    Higher = More Fed liquidity in the system.
+    Signed raw inputs of the Monetary sub-index (higher = more liquidity).
+    Returns a DataFrame with one column per sub-component.
     """
     if df_fed.empty:
-        return pd.Series(dtype=float)
-
-    # Remove duplicate dates by aggregating
-    if df_fed.index.duplicated().any():
-        df_fed = df_fed.groupby(df_fed.index).mean()
+        return pd.DataFrame(index=df_fed.index)
 
-    monetary_index = pd.Series(0.0, index=df_fed.index)
+    df_fed = _dedupe_dates(df_fed)
+    inputs = pd.DataFrame(index=df_fed.index)
 
     # 1. Net Liquidity (primary driver)
     if 'Net_Liquidity' in df_fed.columns:
-        net_liq_norm = normalize_series(df_fed['Net_Liquidity'], method='zscore')
-        monetary_index += net_liq_norm * MONETARY_WEIGHTS['net_liquidity']
+        inputs['net_liquidity'] = df_fed['Net_Liquidity']
 
     # 2a. Net Balance Sheet Flow (QUANTITÀ: QT/QE puro)
-    # Misura il cambio netto negli assets della Fed (liquidity injection/drain)
-    if 'Net_Balance_Sheet_Flow' in df_fed.columns:
-        # Positive = QE (Injection), Negative = QT (Drain)
-        flow_norm = normalize_series(df_fed['Net_Balance_Sheet_Flow'], method='zscore')
-        monetary_index += flow_norm * MONETARY_WEIGHTS['net_balance_sheet_flow']
-    elif 'Flow_Nominal_Assets' in df_fed.columns:
-        # Alias fallback
-        flow_norm = normalize_series(df_fed['Flow_Nominal_Assets'], method='zscore')
-        monetary_index += flow_norm * MONETARY_WEIGHTS['net_balance_sheet_flow']
-    elif 'QT_Pace_Assets_Weekly' in df_fed.columns:
-        # Legacy fallback: QT_Pace_Assets_Weekly è alias di Flow_Nominal_Assets
-        flow_norm = normalize_series(df_fed['QT_Pace_Assets_Weekly'], method='zscore')
-        monetary_index += flow_norm * MONETARY_WEIGHTS['net_balance_sheet_flow']
+    # Positive = QE (Injection), Negative = QT (Drain)
+    # Fallback: Flow_Nominal_Assets (alias), QT_Pace_Assets_Weekly (legacy alias)
+    for col in ['Net_Balance_Sheet_Flow', 'Flow_Nominal_Assets', 'QT_Pace_Assets_Weekly']:
+        if col in df_fed.columns:
+            inputs['net_balance_sheet_flow'] = df_fed[col]
+            break
 
     # 2b. Qualitative Easing Support (QUALITÀ: Shadow QE)
-    # Misura l'effetto di supporto qualitativo da reinvestimento MBS→Bills + Repo
-    if 'Qualitative_Easing_Support' in df_fed.columns:
-        # Positive = supporto al mercato (duration, risk appetite)
-        qual_norm = normalize_series(df_fed['Qualitative_Easing_Support'], method='zscore')
-        monetary_index += qual_norm * MONETARY_WEIGHTS['qualitative_easing_support']
-    elif 'QE_Effective' in df_fed.columns:
-        # Alias fallback
-        qual_norm = normalize_series(df_fed['QE_Effective'], method='zscore')
-        monetary_index += qual_norm * MONETARY_WEIGHTS['qualitative_easing_support']
+    # Supporto qualitativo da reinvestimento MBS→Bills + Repo (fallback: QE_Effective)
+    for col in ['Qualitative_Easing_Support', 'QE_Effective']:
+        if col in df_fed.columns:
+            inputs['qualitative_easing_support'] = df_fed[col]
+            break
 
     # 3. RRP Change (decline = liquidity release)
     if 'RRP_Change' in df_fed.columns:
-        rrp_release = -df_fed['RRP_Change']  # Decline in RRP = positive
-        rrp_norm = normalize_series(rrp_release, method='zscore')
-        monetary_index += rrp_norm * MONETARY_WEIGHTS['rrp_change']
-        
-    # 4. Repo Operations (Active Injection) - use _M version in Millions
-    if 'Repo_Ops_Balance_M' in df_fed.columns:
-        repo_ops_norm = normalize_series(df_fed['Repo_Ops_Balance_M'], method='zscore')
-    elif 'Repo_Ops_Balance' in df_fed.columns:
-        # Fallback: assume original is in Billions, convert
-        repo_ops_norm = normalize_series(df_fed['Repo_Ops_Balance'] * 1000, method='zscore')
-        monetary_index += repo_ops_norm * MONETARY_WEIGHTS['repo_operations']
+        inputs['rrp_change'] = -df_fed['RRP_Change']
+
+    # 4. Repo Operations (Active Injection)
+    # Already part of Qualitative_Easing_Support: only the legacy Billions
+    # column (no Repo_Ops_Balance_M) contributes on its own
+    if 'Repo_Ops_Balance_M' not in df_fed.columns and 'Repo_Ops_Balance' in df_fed.columns:
+        inputs['repo_operations'] = df_fed['Repo_Ops_Balance'] * 1000
 
     # 5. SOFR Stress (wider spread = tighter, negative for liquidity)
     if 'Spread_SOFR_IORB' in df_fed.columns:
-        sofr_stress = -df_fed['Spread_SOFR_IORB']  # Higher spread = stress
-        sofr_norm = normalize_series(sofr_stress, method='zscore')
-        monetary_index += sofr_norm * MONETARY_WEIGHTS['sofr_stress']
+        inputs['sofr_stress'] = -df_fed['Spread_SOFR_IORB']
 
-    return monetary_index
+    return inputs
 
-def calculate_plumbing_component(df_repo, df_fails, df_ofr):
+def plumbing_inputs(df_repo, df_fails, df_ofr, index=None, return_staleness=False):
     """
-    Calculates Market Plumbing sub-index.
-    Higher = Less stress in market plumbing.
+    Signed raw inputs of the Market Plumbing sub-index (higher = less stress).
+    Returns a DataFrame with one column per sub-component.
+
+    Only the three signals are carried. Each is as-of aligned onto `index`
+    (default: union of the source dates) following PLUMBING_ALIGNMENT, so
+    weekly fails hold until the next publication instead of leaving NaN
+    on the days in between. With return_staleness=True also returns the
+    age in days of every value (see utils.alignment.align_asof).
     """
-    # Remove duplicate dates by aggregating (numeric columns only)
-    if not df_repo.empty and df_repo.index.duplicated().any():
-        df_repo = df_repo.groupby(df_repo.index).mean(numeric_only=True)
-
-    if not df_fails.empty and df_fails.index.duplicated().any():
-        df_fails = df_fails.groupby(df_fails.index).mean(numeric_only=True)
-        
-    if not df_ofr.empty and df_ofr.index.duplicated().any():
-        df_ofr = df_ofr.groupby(df_ofr.index).mean(numeric_only=True)
-
-    plumbing_index = pd.Series(dtype=float)
-
-    # Need a common index
-    # Merge all available
-    dfs_to_merge = []
-    if not df_repo.empty: dfs_to_merge.append(df_repo)
-    if not df_fails.empty: dfs_to_merge.append(df_fails)
-    if not df_ofr.empty: dfs_to_merge.append(df_ofr)
-    
-    if not dfs_to_merge:
-        return plumbing_index
-        
-    combined = pd.concat(dfs_to_merge, axis=1, join='outer').sort_index()
-    plumbing_index = pd.Series(0.0, index=combined.index)
+    signals = {}
 
     # 1. Repo Stress (high submission ratio = stress, invert)
     if not df_repo.empty and 'submission_ratio' in df_repo.columns:
-        # High submission ratio = stress = negative
-        repo_stress = -df_repo['submission_ratio'].reindex(plumbing_index.index)
-        repo_norm = normalize_series(repo_stress, method='zscore')
-        plumbing_index += repo_norm * PLUMBING_WEIGHTS['repo_stress']
+        signals['repo_stress'] = -_dedupe_dates(df_repo[['submission_ratio']])['submission_ratio']
 
     # 2. Settlement Fails (high fails = stress, invert)
     if not df_fails.empty and 'totalFails' in df_fails.columns:
-        fails_stress = -df_fails['totalFails'].reindex(plumbing_index.index)
-        fails_norm = normalize_series(fails_stress, method='zscore')
-        plumbing_index += fails_norm * PLUMBING_WEIGHTS['fails_stress']
-        
+        signals['fails_stress'] = -_dedupe_dates(df_fails[['totalFails']])['totalFails']
+
     # 3. OFR Repo Stress (high index = stress, invert)
     if not df_ofr.empty and 'Repo_Stress_Index' in df_ofr.columns:
-        ofr_stress = -df_ofr['Repo_Stress_Index'].reindex(plumbing_index.index)
-        ofr_norm = normalize_series(ofr_stress, method='zscore')
-        plumbing_index += ofr_norm * PLUMBING_WEIGHTS['ofr_stress']
+        signals['ofr_stress'] = -_dedupe_dates(df_ofr[['Repo_Stress_Index']])['Repo_Stress_Index']
+
+    if index is None:
+        index = pd.DatetimeIndex([])
+        for df in (df_repo, df_fails, df_ofr):
+            if not df.empty:
+                index = index.union(pd.DatetimeIndex(df.index).unique())
 
-    return plumbing_index
+    inputs, staleness = align_asof(signals, index, PLUMBING_ALIGNMENT)
+    if return_staleness:
+        return inputs, staleness
+    return inputs
 
-def calculate_composite_index(data):
+def build_component_inputs(data, return_staleness=False):
     """
-    Combines all components into a single Liquidity Composite Index.
+    Collects the signed raw inputs of every pillar on a common date index.
+    Columns are a (pillar, sub-component) MultiIndex. With
+    return_staleness=True also returns the staleness of the plumbing
+    signals (see plumbing_inputs).
     """
-    print("\nCalculating Liquidity Composite Index...")
+    index = pd.DatetimeIndex([])
+    for key in ('fiscal', 'fed', 'repo', 'fails', 'ofr'):
+        if not data[key].empty:
+            index = index.union(pd.DatetimeIndex(data[key].index).unique())
 
-    # Calculate sub-indices
-    fiscal_index = calculate_fiscal_component(data['fiscal'])
-    monetary_index = calculate_monetary_component(data['fed'])
-    plumbing_index = calculate_plumbing_component(data['repo'], data['fails'], data['ofr'])
+    plumbing, staleness = plumbing_inputs(
+        data['repo'], data['fails'], data['ofr'], index=index, return_staleness=True
+    )
+    frames = {
+        'fiscal': fiscal_inputs(data['fiscal']),
+        'monetary': monetary_inputs(data['fed']),
+        'plumbing': plumbing,
+    }
+
+    columns = {}
+    for pillar, frame in frames.items():
+        for sub in frame.columns:
+            columns[(pillar, sub)] = frame[sub].reindex(index)
+
+    inputs = pd.DataFrame(columns, index=index)
+    inputs.columns = pd.MultiIndex.from_tuples(list(columns.keys()), names=['pillar', 'component'])
+    if return_staleness:
+        return inputs.sort_index(), staleness.sort_index()
+    return inputs.sort_index()
+
+def normalize_components(inputs, method=None, window=None, min_periods=None):
+    """
+    Normalizes every component input (see normalize_series).
+    """
+    if method is None:
+        method = NORMALIZATION['method']
+    if method in ('expanding', 'rolling'):
+        if window is None:
+            window = NORMALIZATION['window']
+        if min_periods is None:
+            min_periods = NORMALIZATION['min_periods']
+        return rolling_zscore(inputs, window if method == 'rolling' else None, min_periods)
+    return inputs.apply(lambda col: normalize_series(col, method=method))
+
+def combine_components(normalized):
+    """
+    Weighted sum of normalized components per pillar.
 
-    # Merge all on common dates
-    indices = pd.concat([
-        fiscal_index.rename('Fiscal_Index'),
-        monetary_index.rename('Monetary_Index'),
-        plumbing_index.rename('Plumbing_Index')
-    ], axis=1, join='outer').sort_index()
+    A pillar is NaN on dates where any of its components is missing;
+    pillars without any component are 0.
+    """
+    indices = pd.DataFrame(index=normalized.index)
+    for pillar, (index_col, _, sub_weights) in PILLARS.items():
+        if pillar in normalized.columns.get_level_values(0):
+            block = normalized[pillar]
+            weights = pd.Series({col: sub_weights[col] for col in block.columns})
+            indices[index_col] = block.mul(weights, axis=1).sum(axis=1, skipna=False, min_count=1)
+        else:
+            indices[index_col] = 0.0
+    return indices
 
+def finalize_index(indices, history=None):
+    """
+    Adds LCI, moving averages and regime to the pillar indices.
+    `history` holds earlier LCI values used to seed the moving averages.
+    """
     # Fill NaN with 0 for missing components
     indices = indices.fillna(0)
 
     # Calculate composite
-    indices['LCI'] = (
-        indices['Fiscal_Index'] * WEIGHTS['fiscal_liquidity'] +
-        indices['Monetary_Index'] * WEIGHTS['monetary_liquidity'] +
-        indices['Plumbing_Index'] * WEIGHTS['market_plumbing']
+    indices['LCI'] = sum(
+        indices[index_col] * WEIGHTS[weight_key]
+        for index_col, weight_key, _ in PILLARS.values()
     )
 
     # Smooth with MA (min_periods for weekend gaps)
-    indices['LCI_MA20'] = indices['LCI'].rolling(window=20, min_periods=14).mean()
-    indices['LCI_MA5'] = indices['LCI'].rolling(window=5, min_periods=3).mean()
+    lci = indices['LCI'] if history is None else pd.concat([history, indices['LCI']])
+    indices['LCI_MA20'] = lci.rolling(window=20, min_periods=14).mean().reindex(indices.index)
+    indices['LCI_MA5'] = lci.rolling(window=5, min_periods=3).mean().reindex(indices.index)
 
     # Regime indicators
     indices['LCI_Regime'] = pd.cut(
         indices['LCI'],
-        bins=[-np.inf, -1, -0.5, 0.5, 1, np.inf],
-        labels=['Very Tight', 'Tight', 'Neutral', 'Easy', 'Very Easy']
+        bins=REGIME_BINS,
+        labels=REGIME_LABELS
     )
 
     return indices
 
-def generate_report(indices):
+def calculate_fiscal_component(df_fiscal):
+    """
+    Calculates Fiscal Liquidity sub-index.
+    Higher = More fiscal liquidity injection.
+    """
+    if df_fiscal.empty:
+        return pd.Series(dtype=float)
+    inputs = pd.concat({'fiscal': fiscal_inputs(df_fiscal)}, axis=1)
+    return combine_components(normalize_components(inputs))['Fiscal_Index']
+
+def calculate_monetary_component(df_fed):
+    """
+    Calculates Monetary Liquidity sub-index.
+    Higher = More Fed liquidity in the system.
+    """
+    if df_fed.empty:
+        return pd.Series(dtype=float)
+    inputs = pd.concat({'monetary': monetary_inputs(df_fed)}, axis=1)
+    return combine_components(normalize_components(inputs))['Monetary_Index']
+
+def calculate_plumbing_component(df_repo, df_fails, df_ofr):
+    """
+    Calculates Market Plumbing sub-index.
+    Higher = Less stress in market plumbing.
+    """
+    inputs = pd.concat({'plumbing': plumbing_inputs(df_repo, df_fails, df_ofr)}, axis=1)
+    if inputs.empty:
+        return pd.Series(dtype=float)
+    return combine_components(normalize_components(inputs))['Plumbing_Index']
+
+def calculate_composite_index(data, method=None, return_attribution=False):
+    """
+    Combines all components into a single Liquidity Composite Index.
+    With return_attribution=True also returns the sub-component
+    attribution table (see attribution_table).
+    """
+    print("\nCalculating Liquidity Composite Index...")
+
+    inputs = build_component_inputs(data)
+    normalized = normalize_components(inputs, method=method)
+    indices = finalize_index(combine_components(normalized))
+    if return_attribution:
+        return indices, attribution_table(normalized)
+    return indices
+
+# ============================================================================
+# WEIGHT SWEEP
+# The LCI is linear in the component weights: with Z the normalized
+# components (zeroed where missing or where their pillar is incomplete),
+# LCI = Z @ w, where w = pillar weight x sub-component weight.
+# ============================================================================
+
+def design_matrix(normalized):
+    """
+    Builds the component matrix Z such that LCI = Z @ component_weights().
+    A pillar that is incomplete on a date contributes 0 on that date,
+    as in combine_components() + finalize_index().
+    """
+    design = normalized.copy()
+    for pillar in normalized.columns.get_level_values(0).unique():
+        block = normalized[pillar]
+        incomplete = block.isna().any(axis=1)
+        design.loc[incomplete, pillar] = 0.0
+    return design.fillna(0.0)
+
+def component_weights(columns, weights=None, sub_weights=None):
+    """
+    Effective weight of each (pillar, component) column in the LCI.
+    `weights` overrides WEIGHTS; `sub_weights` maps pillar -> overrides.
+    """
+    weights = {**WEIGHTS, **(weights or {})}
+    sub_weights = sub_weights or {}
+    values = []
+    for pillar, component in columns:
+        _, weight_key, defaults = PILLARS[pillar]
+        subs = {**defaults, **sub_weights.get(pillar, {})}
+        values.append(weights[weight_key] * subs[component])
+    return pd.Series(values, index=columns)
+
+def random_weight_candidates(columns, n_candidates, seed=None, concentration=5.0):
+    """
+    Samples candidate weight vectors around the current weights.
+
+    Pillar and sub-component weights are drawn from Dirichlet distributions
+    centered on the configured weights (higher concentration = closer).
+    Returns a DataFrame (components x candidates); column 0 holds the
+    current weights.
+    """
+    rng = np.random.default_rng(seed)
+    columns = pd.MultiIndex.from_tuples(list(columns), names=['pillar', 'component'])
+    base = component_weights(columns)
+    candidates = np.empty((len(columns), n_candidates))
+    candidates[:, 0] = base.to_numpy()
+
+    pillar_keys = [PILLARS[p][1] for p in PILLARS]
+    pillar_alpha = np.array([WEIGHTS[k] for k in pillar_keys]) * concentration * len(pillar_keys)
+    pillar_draws = rng.dirichlet(pillar_alpha, size=n_candidates - 1) if n_candidates > 1 else None
+
+    for p_idx, pillar in enumerate(PILLARS):
+        rows = [i for i, (p, _) in enumerate(columns) if p == pillar]
+        if not rows or n_candidates < 2:
+            continue
+        subs = PILLARS[pillar][2]
+        present = np.array([subs[columns[i][1]] for i in rows])
+        total = present.sum()
+        alpha = present / total * concentration * len(present)
+        # Keep the configured sub-weight total of the present components
+        sub_draws = rng.dirichlet(alpha, size=n_candidates - 1) * total
+        candidates[rows, 1:] = (sub_draws * pillar_draws[:, [p_idx]]).T
+
+    return pd.DataFrame(candidates, index=columns)
+
+def sweep_weights(data, candidates=None, n_candidates=1000, method=None,
+                  horizon=5, seed=None, normalized=None):
+    """
+    Evaluates many LCI weightings at once.
+
+    The normalized component matrix is built once; every candidate LCI is
+    one column of Z @ W, with W the (components x candidates) weights.
+
+    Returns a dict with:
+    - 'weights': components x candidates
+    - 'lci': dates x candidates
+    - 'stats': per candidate regime shares, hit rate (non-neutral regimes
+      whose sign matches the forward SOFR-IORB spread move, easy = spread
+      narrowing), correlation with the forward spread change and number of
+      regime changes
+    """
+    if normalized is None:
+        normalized = normalize_components(build_component_inputs(data), method=method)
+    design = design_matrix(normalized)
+    if candidates is None:
+        candidates = random_weight_candidates(design.columns, n_candidates, seed=seed)
+    candidates = candidates.reindex(design.columns).fillna(0.0)
+
+    lci = design.to_numpy() @ candidates.to_numpy()
+    lci_panel = pd.DataFrame(lci, index=design.index, columns=candidates.columns)
+
+    # Regime shares
+    regimes = np.digitize(lci, REGIME_BINS[1:-1], right=True)
+    stats = pd.DataFrame(index=candidates.columns)
+    for code, label in enumerate(REGIME_LABELS):
+        stats[f'share_{label}'] = (regimes == code).mean(axis=0)
+    stats['regime_changes'] = (np.diff(regimes, axis=0) != 0).sum(axis=0)
+
+    # Forward change of the SOFR-IORB spread (negative = easing)
+    df_fed = _dedupe_dates(data['fed']) if not data['fed'].empty else data['fed']
+    if 'Spread_SOFR_IORB' in df_fed.columns:
+        spread = df_fed['Spread_SOFR_IORB'].reindex(design.index).ffill()
+        forward = (spread.shift(-horizon) - spread).to_numpy()
+        valid = np.isfinite(forward)
+        target = forward[valid]
+        x = lci[valid]
+
+        # Hit rate: Easy regimes followed by narrowing, Tight by widening
+        neutral_code = REGIME_LABELS.index('Neutral')
+        signal = np.sign(regimes[valid] - neutral_code)
+        outcome = -np.sign(target)[:, None]
+        active = signal != 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['hit_rate'] = ((signal == outcome) & active).sum(axis=0) / active.sum(axis=0)
+
+            xc = x - x.mean(axis=0)
+            tc = target - target.mean()
+            denom = np.sqrt((xc ** 2).sum(axis=0) * (tc ** 2).sum())
+            stats['corr_fwd_spread'] = (xc.T @ tc) / denom
+    else:
+        stats['hit_rate'] = np.nan
+        stats['corr_fwd_spread'] = np.nan
+
+    return {'weights': candidates, 'lci': lci_panel, 'stats': stats}
+
+# ============================================================================
+# ATTRIBUTION
+# ============================================================================
+
+ATTRIBUTION_TABLE = "lci_attribution"
+
+def attribution_table(normalized):
+    """
+    Long-format attribution of the LCI to its sub-components.
+
+    One row per (date, pillar, sub-component) with the normalized value,
+    the effective weight (pillar x sub-component) and the contribution
+    (weight x value, 0 where the pillar is incomplete). The contributions
+    of a date sum to its LCI.
+    """
+    design = design_matrix(normalized).to_numpy(dtype=float)
+    weights = component_weights(normalized.columns).to_numpy()
+    n_dates, n_cols = normalized.shape
+    return pd.DataFrame({
+        'record_date': np.repeat(normalized.index.to_numpy(), n_cols),
+        'component': np.tile(normalized.columns.get_level_values(0).to_numpy(dtype=object), n_dates),
+        'subcomponent': np.tile(normalized.columns.get_level_values(1).to_numpy(dtype=object), n_dates),
+        'normalized_value': normalized.to_numpy(dtype=float, na_value=np.nan).ravel(),
+        'weight': np.tile(weights, n_dates),
+        'contribution': (design * weights).ravel(),
+    })
+
+def lci_drivers(attribution, date=None, lookback=1):
+    """
+    Change in each sub-component's contribution between `date` (default:
+    last date) and `lookback` dates earlier, largest absolute moves first.
+    The 'change' column sums to the change in the LCI.
+    """
+    contributions = attribution.pivot_table(
+        index='record_date', columns=['component', 'subcomponent'],
+        values='contribution', sort=False
+    ).sort_index()
+    if date is None:
+        end = len(contributions) - 1
+    else:
+        end = contributions.index.get_indexer([pd.Timestamp(date)], method='pad')[0]
+    start = end - lookback
+    if end < 0 or start < 0:
+        return pd.DataFrame(columns=['component', 'subcomponent', 'contribution', 'change'])
+
+    drivers = pd.DataFrame({
+        'contribution': contributions.iloc[end],
+        'change': contributions.iloc[end] - contributions.iloc[start],
+    }).reset_index()
+    return drivers.reindex(drivers['change'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+# ============================================================================
+# BOOTSTRAP BANDS
+# Full-sample z-scores depend on the history used for mean/std. Each
+# replicate resamples the component history in blocks, recomputes the
+# normalization statistics and re-aggregates the observed inputs.
+# The LCI is linear in 1/std and mean/std, so every replicate is two
+# matrix products instead of a pass over the pipeline.
+# ============================================================================
+
+def _bootstrap_kernel(arrays, positions, params):
+    """
+    LCI of a chunk of bootstrap replicates (replicates x dates).
+    """
+    starts = arrays['starts'][positions]                     # replicates x blocks
+    block = params['block']
+    membership = params['membership']                        # components x pillars
+
+    # Sums over the resampled rows from prefix sums: one gather per block
+    count = (arrays['prefix_n'][starts + block] - arrays['prefix_n'][starts]).sum(axis=1)
+    total = (arrays['prefix_s'][starts + block] - arrays['prefix_s'][starts]).sum(axis=1)
+    total_sq = (arrays['prefix_ss'][starts + block] - arrays['prefix_ss'][starts]).sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = (total_sq - count * mean ** 2) / (count - 1)
+        scale = np.where(var <= 1e-12 * total_sq / count, 1.0, np.sqrt(np.maximum(var, 0.0)))
+    # A component without a std in the replicate is NaN everywhere,
+    # which zeroes its pillar on every date
+    valid = (count >= 2) & np.isfinite(scale)
+    scale = np.where(valid, scale, 1.0)
+    mean = np.where(valid, mean, 0.0)
+    pillar_ok = (~valid).astype(float) @ membership == 0      # replicates x pillars
+
+    lci = np.zeros((len(positions), arrays['weighted'].shape[0]))
+    for p in range(membership.shape[1]):
+        cols = membership[:, p] > 0
+        if not cols.any():
+            continue
+        part = arrays['weighted'][:, cols] @ (1.0 / scale[:, cols]).T \
+            - arrays['weights'][:, cols] @ (mean[:, cols] / scale[:, cols]).T
+        lci += part.T * pillar_ok[:, [p]]
+    return lci
+
+def bootstrap_composite_index(data, n_replicates=None, block=None, percentiles=None,
+                              seed=None, max_workers=None, normalized=None):
+    """
+    Moving-block bootstrap of the full-sample ('zscore') LCI.
+
+    Returns a DataFrame indexed by date with the point LCI, percentile
+    bands (LCI_P05, ...) and the probability of each regime
+    (P_Very_Tight, ...), i.e. the share of replicates in each bin.
+    Replicates run in chunks on a process pool (see run_walk_forward).
+    """
+    n_replicates = n_replicates or BOOTSTRAP['replicates']
+    block = block or BOOTSTRAP['block']
+    percentiles = percentiles or BOOTSTRAP['percentiles']
+
+    inputs = build_component_inputs(data)
+    values = inputs.to_numpy(dtype=float, na_value=np.nan)
+    n, k = values.shape
+    valid = np.isfinite(values)
+    # Shift each column by its mean: z-scores are shift invariant
+    values = values - np.where(valid, values, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    filled = np.where(valid, values, 0.0)
+    block = max(1, min(block, n))
+
+    pillars = list(PILLARS)
+    membership = np.zeros((k, len(pillars)))
+    for c, (pillar, _) in enumerate(inputs.columns):
+        membership[c, pillars.index(pillar)] = 1.0
+
+    # Dates where the pillar is complete (as in design_matrix)
+    complete = np.ones((n, k), dtype=bool)
+    for p in range(len(pillars)):
+        cols = membership[:, p] > 0
+        complete[:, cols] = valid[:, cols].all(axis=1, keepdims=True)
+    weights = component_weights(inputs.columns).to_numpy()[None, :] * complete
+
+    def _prefix(x):
+        return np.vstack([np.zeros((1, k)), np.cumsum(x, axis=0)])
+
+    rng = np.random.default_rng(seed)
+    n_blocks = int(np.ceil(n / block))
+    starts = rng.integers(0, n - block + 1, size=(n_replicates, n_blocks))
+
+    print(f"\nBootstrapping LCI: {n_replicates} replicates, {block}-day blocks...")
+    lci = run_walk_forward(
+        _bootstrap_kernel,
+        {
+            'starts': starts,
+            'prefix_n': _prefix(valid.astype(float)),
+            'prefix_s': _prefix(filled),
+            'prefix_ss': _prefix(filled ** 2),
+            'weighted': weights * filled,
+            'weights': weights,
+        },
+        np.arange(n_replicates),
+        params={'block': block, 'membership': membership},
+        max_workers=max_workers,
+    )
+
+    if normalized is None:
+        normalized = normalize_components(inputs, method='zscore')
+    point = finalize_index(combine_components(normalized))['LCI']
+
+    bands = pd.DataFrame({'LCI': point}, index=inputs.index)
+    for q, band in zip(percentiles, np.percentile(lci, percentiles, axis=0)):
+        bands[f"LCI_P{q:02d}"] = band
+    # pd.cut bins are right-closed: (-inf, -1], (-1, -0.5], ...
+    regimes = np.searchsorted(np.array(REGIME_BINS[1:-1]), lci, side='left')
+    for r, label in enumerate(REGIME_LABELS):
+        bands[f"P_{label.replace(' ', '_')}"] = (regimes == r).mean(axis=0)
+
+    print(f"✓ Bootstrap bands for {len(bands)} dates")
+    return bands
+
+# ============================================================================
+# DUCKDB BACKEND
+# Same pipeline as calculate_composite_index() expressed as one SQL query
+# over the stored tables: per-source dedupe, signed inputs, outer date join,
+# window normalization, weighting, MA5/MA20 and regime binning.
+# ============================================================================
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _first_column(columns, candidates):
+    return next((col for col in candidates if col in columns), None)
+
+def component_sql(source_columns):
+    """
+    SQL expressions of the signed component inputs, mirroring
+    fiscal_inputs(), monetary_inputs() and plumbing_inputs().
+
+    `source_columns` maps source name -> available columns.
+    Returns a list of (pillar, component, source, expression, raw column).
+    """
+    fiscal = source_columns.get('fiscal', [])
+    fed = source_columns.get('fed', [])
+    components = []
+
+    col = _first_column(fiscal, ['MA20_Net_Impulse', 'MA20_Impulse'])
+    if col:
+        components.append(('fiscal', 'impulse', 'fiscal', _quote(col), col))
+    if 'TGA_Balance' in fiscal:
+        tga = _quote('TGA_Balance')
+        components.append(('fiscal', 'tga', 'fiscal', f"-({tga} - LAG({tga}) OVER (ORDER BY record_date))", 'TGA_Balance'))
+    col = _first_column(fiscal, ['Withheld_Tax', 'Total_Taxes'])
+    if col:
+        components.append(('fiscal', 'taxes', 'fiscal', f"-{_quote(col)}", col))
+
+    if 'Net_Liquidity' in fed:
+        components.append(('monetary', 'net_liquidity', 'fed', _quote('Net_Liquidity'), 'Net_Liquidity'))
+    col = _first_column(fed, ['Net_Balance_Sheet_Flow', 'Flow_Nominal_Assets', 'QT_Pace_Assets_Weekly'])
+    if col:
+        components.append(('monetary', 'net_balance_sheet_flow', 'fed', _quote(col), col))
+    col = _first_column(fed, ['Qualitative_Easing_Support', 'QE_Effective'])
+    if col:
+        components.append(('monetary', 'qualitative_easing_support', 'fed', _quote(col), col))
+    if 'RRP_Change' in fed:
+        components.append(('monetary', 'rrp_change', 'fed', f"-{_quote('RRP_Change')}", 'RRP_Change'))
+    if 'Repo_Ops_Balance_M' not in fed and 'Repo_Ops_Balance' in fed:
+        components.append(('monetary', 'repo_operations', 'fed', f"{_quote('Repo_Ops_Balance')} * 1000", 'Repo_Ops_Balance'))
+    if 'Spread_SOFR_IORB' in fed:
+        components.append(('monetary', 'sofr_stress', 'fed', f"-{_quote('Spread_SOFR_IORB')}", 'Spread_SOFR_IORB'))
+
+    if 'submission_ratio' in source_columns.get('repo', []):
+        components.append(('plumbing', 'repo_stress', 'repo', f"-{_quote('submission_ratio')}", 'submission_ratio'))
+    if 'totalFails' in source_columns.get('fails', []):
+        components.append(('plumbing', 'fails_stress', 'fails', f"-{_quote('totalFails')}", 'totalFails'))
+    if 'Repo_Stress_Index' in source_columns.get('ofr', []):
+        components.append(('plumbing', 'ofr_stress', 'ofr', f"-{_quote('Repo_Stress_Index')}", 'Repo_Stress_Index'))
+
+    return components
+
+def composite_index_sql(relations, source_columns, method=None, window=None, min_periods=None,
+                        weights=None, sub_weights=None, key_col='record_date', alignment=None):
+    """
+    Builds the SQL query computing the LCI.
+
+    `relations` maps source name -> table, view or registered DataFrame
+    (keyed by `key_col`); `source_columns` maps source name -> its columns.
+    `weights` / `sub_weights` override the pillar and sub-component
+    weights as in component_weights(). Components listed in `alignment`
+    (default PLUMBING_ALIGNMENT) are as-of joined like align_asof().
+    The result has one row per date
+    with the columns of calculate_composite_index() plus record_date.
+    """
+    if method is None:
+        method = NORMALIZATION['method']
+    if window is None:
+        window = NORMALIZATION['window']
+    if min_periods is None:
+        min_periods = NORMALIZATION['min_periods']
+    if alignment is None:
+        alignment = PLUMBING_ALIGNMENT
+    min_periods = max(min_periods, 2)
+    weights = {**WEIGHTS, **(weights or {})}
+    sub_weights = sub_weights or {}
+
+    frames = {
+        'zscore': "OVER ()",
+        'minmax': "OVER ()",
+        'expanding': "OVER (ORDER BY record_date ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)",
+        'rolling': f"OVER (ORDER BY record_date ROWS BETWEEN {int(window) - 1} PRECEDING AND CURRENT ROW)",
+    }
+    if method not in frames:
+        raise ValueError(f"Unknown normalization method '{method}'")
+    frame = frames[method]
+
+    sources = [name for name in relations if source_columns.get(name)]
+    components = [c for c in component_sql(source_columns) if c[2] in sources]
+    ctes = []
+
+    # 1. Deduplicated sources with their signed inputs
+    for name in sources:
+        used = sorted({raw for _, _, source, _, raw in components if source == name})
+        averaged = "".join(f", AVG({_quote(col)}) AS {_quote(col)}" for col in used)
+        exprs = [f"{expr} AS {_quote(pillar + '__' + comp)}"
+                 for pillar, comp, source, expr, _ in components if source == name]
+        ctes.append(
+            f"src_{name} AS (SELECT CAST({_quote(key_col)} AS TIMESTAMP) AS record_date{averaged} "
+            f"FROM {relations[name]} GROUP BY 1)"
+        )
+        ctes.append(
+            f"in_{name} AS (SELECT record_date{''.join(', ' + e for e in exprs)} FROM src_{name})"
+        )
+
+    # 2. Outer date join
+    if not sources:
+        raise ValueError("No LCI source available")
+    dates = " UNION ".join(f"SELECT record_date FROM src_{name}" for name in sources)
+    joins = [f"LEFT JOIN in_{name} USING (record_date)" for name in sources]
+    selected = []
+    for pillar, comp, source, _, _ in components:
+        column = _quote(pillar + '__' + comp)
+        rule = alignment.get(comp)
+        if rule is None:
+            selected.append(column)
+            continue
+        # Latest published observation, dropped once older than the tolerance
+        alias = f"a_{pillar}__{comp}"
+        ctes.append(
+            f"obs_{pillar}__{comp} AS (SELECT record_date AS observed, "
+            f"record_date + INTERVAL {int(rule.get('lag_days') or 0)} DAY AS available, {column} AS value "
+            f"FROM in_{source} WHERE {column} IS NOT NULL)"
+        )
+        joins.append(f"ASOF LEFT JOIN obs_{pillar}__{comp} {alias} ON dates.record_date >= {alias}.available")
+        if rule.get('tolerance_days') is None:
+            selected.append(f"{alias}.value AS {column}")
+        else:
+            waited = f"(epoch(dates.record_date) - epoch({alias}.available)) / 86400.0"
+            selected.append(f"CASE WHEN {waited} <= {rule['tolerance_days']} THEN {alias}.value END AS {column}")
+    ctes.append(f"dates AS ({dates})")
+    ctes.append(
+        f"inputs AS (SELECT dates.record_date{''.join(', ' + col for col in selected)} "
+        f"FROM dates {' '.join(joins)})"
+    )
+
+    # 3. Normalization of every component over its valid observations
+    for pillar, comp, _, _, _ in components:
+        x = _quote(pillar + '__' + comp)
+        if method == 'minmax':
+            score = (f"CASE WHEN MAX({x}) {frame} = MIN({x}) {frame} THEN 0.0 "
+                     f"ELSE ({x} - MIN({x}) {frame}) / (MAX({x}) {frame} - MIN({x}) {frame}) END")
+        else:
+            centered = f"({x} - AVG({x}) {frame})"
+            std = f"STDDEV_SAMP({x}) {frame}"
+            score = f"CASE WHEN {std} > 0 THEN {centered} / {std} WHEN {std} = 0 THEN {centered} END"
+            if method in ('expanding', 'rolling'):
+                score = f"CASE WHEN COUNT({x}) {frame} >= {min_periods} THEN {score} END"
+        ctes.append(
+            f"z_{pillar}__{comp} AS (SELECT record_date, {score} AS z "
+            f"FROM inputs WHERE {x} IS NOT NULL)"
+        )
+
+    # 4. Pillars (NULL if any component is missing), LCI, MAs, regime
+    pillar_exprs = []
+    for pillar, (index_col, weight_key, defaults) in PILLARS.items():
+        subs = {**defaults, **sub_weights.get(pillar, {})}
+        terms = [f"{subs[comp]!r} * z_{p}__{comp}.z" for p, comp, _, _, _ in components if p == pillar]
+        expr = f"COALESCE({' + '.join(terms)}, 0.0)" if terms else "0.0"
+        pillar_exprs.append((index_col, weight_key, expr))
+    z_joins = " ".join(f"LEFT JOIN z_{p}__{c} z_{p}__{c} USING (record_date)" for p, c, _, _, _ in components)
+    ctes.append(
+        "pillars AS (SELECT record_date, "
+        + ", ".join(f"{expr} AS {index_col}" for index_col, _, expr in pillar_exprs)
+        + f" FROM inputs {z_joins})"
+    )
+    lci = " + ".join(f"{weights[weight_key]!r} * {index_col}" for index_col, weight_key, _ in pillar_exprs)
+    ctes.append(f"lci AS (SELECT *, {lci} AS LCI FROM pillars)")
+
+    ma = ("CASE WHEN COUNT(*) OVER (ORDER BY record_date ROWS BETWEEN {n} PRECEDING AND CURRENT ROW) >= {m} "
+          "THEN AVG(LCI) OVER (ORDER BY record_date ROWS BETWEEN {n} PRECEDING AND CURRENT ROW) END")
+    regime = "CASE " + " ".join(
+        f"WHEN LCI <= {upper} THEN '{label}'"
+        for upper, label in zip(REGIME_BINS[1:-1], REGIME_LABELS[:-1])
+    ) + f" WHEN LCI IS NOT NULL THEN '{REGIME_LABELS[-1]}' END"
+
+    return (
+        "WITH " + ",\n".join(ctes) + "\n"
+        f"SELECT record_date, {', '.join(col for col, _, _ in pillar_exprs)}, LCI, "
+        f"{ma.format(n=19, m=14)} AS LCI_MA20, {ma.format(n=4, m=3)} AS LCI_MA5, "
+        f"{regime} AS LCI_Regime\nFROM lci ORDER BY record_date"
+    )
+
+def materialize_composite_index(conn, name='liquidity_composite_index_sql', materialize='view',
+                                method=None, weights=None, sub_weights=None, relations=None):
+    """
+    Materializes the LCI inside DuckDB as a view (recomputed on read), a
+    temporary view (this connection only, nothing is written) or a table
+    (snapshot) named `name`.
+
+    `relations` maps source name -> relation (default: the SOURCES
+    tables); sources missing from the database are skipped.
+    Returns the number of rows.
+    """
+    if relations is None:
+        relations = {source: spec['table'] for source, spec in SOURCES.items()}
+
+    source_columns = {}
+    for source, relation in relations.items():
+        rows = conn.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = ? ORDER BY ordinal_position", [relation]
+        ).fetchall()
+        source_columns[source] = [row[0] for row in rows]
+    relations = {source: _quote(rel) for source, rel in relations.items() if source_columns[source]}
+
+    sql = composite_index_sql(relations, source_columns, method=method,
+                              weights=weights, sub_weights=sub_weights)
+    if materialize == 'view':
+        conn.execute(f"CREATE OR REPLACE VIEW {_quote(name)} AS {sql}")
+    elif materialize == 'temp':
+        conn.execute(f"CREATE OR REPLACE TEMP VIEW {_quote(name)} AS {sql}")
+    elif materialize == 'table':
+        conn.execute(f"CREATE OR REPLACE TABLE {_quote(name)} AS {sql}")
+    else:
+        raise ValueError(f"materialize must be 'view', 'temp' or 'table', got '{materialize}'")
+    return conn.execute(f"SELECT COUNT(*) FROM {_quote(name)}").fetchone()[0]
+
+def calculate_composite_index_duckdb(db_path=DB_PATH, method=None, name='liquidity_composite_index_sql',
+                                     materialize='temp'):
+    """
+    Computes the LCI inside DuckDB from the stored source tables and
+    returns it in the layout of calculate_composite_index().
+
+    The index is computed on the reader snapshot through a temporary view,
+    so a running writer does not block the call. With materialize='table'
+    the result is also stored as table `name` through the single writer
+    (open_writer), like the other pipeline outputs.
+    """
+    print("\nCalculating Liquidity Composite Index (DuckDB)...")
+    if materialize not in ('temp', 'table'):
+        raise ValueError(f"materialize must be 'temp' or 'table', got '{materialize}'")
+    db = open_snapshot(db_path)
+    try:
+        rows = materialize_composite_index(db.conn, name, 'temp', method=method)
+        indices = db.conn.execute(f"SELECT * FROM {_quote(name)}").df()
+    finally:
+        db.close()
+    if materialize == 'table':
+        writer = open_writer(db_path)
+        try:
+            writer.upsert_data(indices, name, key_col='record_date')
+        finally:
+            writer.close()
+    print(f"✓ {'Table' if materialize == 'table' else 'Temporary view'} '{name}': {rows} rows")
+
+    indices = indices.set_index(pd.to_datetime(indices.pop('record_date'))).rename_axis(None)
+    indices['LCI_Regime'] = pd.Categorical(indices['LCI_Regime'], categories=REGIME_LABELS, ordered=True)
+    return indices
+
+# ============================================================================
+# WALK-FORWARD BACKTEST
+# Real-time LCI: each as-of date sees only rows up to that date, so the
+# full-sample z-score uses the mean/std known at the time and the moving
+# averages use the history as it was normalized on that date.
+# ============================================================================
+
+STRESS_SPREAD_BPS = 5  # SOFR-IORB spread marking funding stress (Stress_Flag)
+
+def _lci_asof_kernel(arrays, positions, params):
+    """
+    Real-time pillars, LCI and moving averages for a chunk of as-of rows.
+    Columns: one per pillar (PILLARS order), LCI, LCI_MA20, LCI_MA5.
+    """
+    X = arrays['values']
+    count, total, total_sq = arrays['count'], arrays['sum'], arrays['sum_sq']
+    first_valid = arrays['first_valid']
+    sub_w = params['sub_weights']
+    pillar_w = params['pillar_weights']
+    membership = params['membership']  # components x pillars
+
+    out = np.full((len(positions), len(pillar_w) + 3), np.nan)
+    for i, t in enumerate(positions):
+        n = count[t]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total[t] / n
+            var = (total_sq[t] - n * mean ** 2) / (n - 1)
+            scale = np.sqrt(np.maximum(var, 0.0))
+            # Zero variance: components are only centered (see normalize_series)
+            scale = np.where(var <= 1e-12 * total_sq[t] / n, 1.0, scale)
+            scale = np.where(n >= 2, scale, np.nan)
+
+            rows = X[max(0, t - 19):t + 1]
+            z = (rows - mean) / scale
+
+        exists = first_valid <= t
+        missing = np.isnan(z) & exists
+        weighted = np.where(exists & ~np.isnan(z), z * sub_w, 0.0)
+        pillars = weighted @ membership
+        pillars[(missing.astype(float) @ membership) > 0] = 0.0
+
+        lci = pillars @ pillar_w
+        out[i, :len(pillar_w)] = pillars[-1]
+        out[i, -3] = lci[-1]
+        out[i, -2] = lci.mean() if len(lci) >= 14 else np.nan
+        out[i, -1] = lci[-5:].mean() if len(lci[-5:]) >= 3 else np.nan
+    return out
+
+def regime_transitions(regimes):
+    """
+    Lists the dates where the regime changes.
+    Returns a DataFrame with date, from_regime and to_regime.
+    """
+    regimes = regimes.astype(str)
+    changed = regimes != regimes.shift()
+    changed.iloc[0] = False
+    return pd.DataFrame({
+        'date': regimes.index[changed],
+        'from_regime': regimes.shift()[changed].to_numpy(),
+        'to_regime': regimes[changed].to_numpy(),
+    })
+
+def backtest_composite_index(data, start=None, end=None, method=None,
+                             max_workers=None, lead_window=63):
+    """
+    Walk-forward backtest of the LCI and its regimes.
+
+    For every as-of date in [start, end] the LCI is recomputed using only
+    rows dated up to that day. As-of dates are processed in chunks across a
+    process pool sharing the input matrix through shared memory.
+    Point-in-time methods ('expanding', 'rolling') never revise history,
+    so their real-time series is the batch series.
+
+    Returns a dict with:
+    - 'realtime': per as-of date pillars, LCI, MAs and regime
+    - 'final': the same dates as computed with the full sample
+    - 'transitions': real-time regime changes with 'lead_days' (days
+      before the full-sample series enters the same regime, within
+      lead_window rows) and 'days_to_stress' (to the next SOFR-IORB
+      spread above STRESS_SPREAD_BPS, for transitions into tight regimes)
+    - 'summary': agreement, revision and lead-time statistics
+    """
+    if method is None:
+        method = NORMALIZATION['method']
+    inputs = build_component_inputs(data)
+    final = finalize_index(combine_components(normalize_components(inputs, method=method)))
+
+    dates = inputs.index
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates <= pd.Timestamp(end)
+    positions = np.flatnonzero(mask)
+
+    print(f"\nWalk-forward LCI backtest: {len(positions)} as-of dates ({method})")
+
+    if method in ('expanding', 'rolling'):
+        realtime = final.iloc[positions].copy()
+    elif method == 'zscore':
+        values = inputs.to_numpy(dtype=float, na_value=np.nan)
+        # Shift each column by its overall mean: z-scores are shift invariant
+        # and the running sums stay well conditioned
+        valid = np.isfinite(values)
+        shift = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+        values = values - shift
+        filled = np.where(valid, values, 0.0)
+        first_valid = np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+
+        pillars = list(PILLARS)
+        membership = np.zeros((inputs.shape[1], len(pillars)))
+        sub_weights = np.zeros(inputs.shape[1])
+        for c, (pillar, component) in enumerate(inputs.columns):
+            membership[c, pillars.index(pillar)] = 1.0
+            sub_weights[c] = PILLARS[pillar][2][component]
+
+        results = run_walk_forward(
+            _lci_asof_kernel,
+            {
+                'values': values,
+                'count': np.cumsum(valid, axis=0).astype(float),
+                'sum': np.cumsum(filled, axis=0),
+                'sum_sq': np.cumsum(filled ** 2, axis=0),
+                'first_valid': first_valid,
+            },
+            positions,
+            params={
+                'sub_weights': sub_weights,
+                'pillar_weights': np.array([WEIGHTS[PILLARS[p][1]] for p in pillars]),
+                'membership': membership,
+            },
+            max_workers=max_workers,
+        )
+        columns = [PILLARS[p][0] for p in pillars] + ['LCI', 'LCI_MA20', 'LCI_MA5']
+        realtime = pd.DataFrame(results, index=dates[positions], columns=columns)
+        realtime['LCI_Regime'] = pd.cut(realtime['LCI'], bins=REGIME_BINS, labels=REGIME_LABELS)
+    else:
+        raise ValueError(f"Backtest supports 'zscore', 'expanding' or 'rolling', got '{method}'")
+
+    final = final.iloc[positions]
+
+    # Regime transitions and lead times
+    transitions = regime_transitions(realtime['LCI_Regime'])
+    final_transitions = regime_transitions(final['LCI_Regime'])
+    row_of = pd.Series(np.arange(len(realtime)), index=realtime.index)
+
+    lead_days = []
+    for _, tr in transitions.iterrows():
+        candidates = final_transitions[final_transitions['to_regime'] == tr['to_regime']]
+        gaps = row_of[candidates['date']].to_numpy() - row_of[tr['date']]
+        near = np.abs(gaps) <= lead_window
+        if near.any():
+            nearest = candidates['date'].to_numpy()[near][np.argmin(np.abs(gaps[near]))]
+            lead_days.append((pd.Timestamp(nearest) - tr['date']).days)
+        else:
+            lead_days.append(np.nan)
+    transitions['lead_days'] = lead_days
+
+    df_fed = _dedupe_dates(data['fed']) if not data['fed'].empty else data['fed']
+    if 'Spread_SOFR_IORB' in df_fed.columns:
+        stress = df_fed['Spread_SOFR_IORB'] > STRESS_SPREAD_BPS
+        stress_dates = stress.index[stress & ~stress.shift(fill_value=False)]
+        days_to_stress = []
+        for _, tr in transitions.iterrows():
+            upcoming = stress_dates[stress_dates >= tr['date']]
+            tight = tr['to_regime'] in ('Tight', 'Very Tight')
+            days_to_stress.append((upcoming[0] - tr['date']).days if tight and len(upcoming) else np.nan)
+        transitions['days_to_stress'] = days_to_stress
+
+    summary = {
+        'as_of_dates': len(realtime),
+        'transitions_realtime': len(transitions),
+        'transitions_final': len(final_transitions),
+        'regime_agreement': float((realtime['LCI_Regime'].astype(str) == final['LCI_Regime'].astype(str)).mean())
+        if len(realtime) else np.nan,
+        'mean_abs_revision': float((realtime['LCI'] - final['LCI']).abs().mean()) if len(realtime) else np.nan,
+        'median_lead_days': float(np.nanmedian(lead_days)) if np.isfinite(lead_days).any() else np.nan,
+    }
+
+    return {'realtime': realtime, 'final': final, 'transitions': transitions, 'summary': summary}
+
+# ============================================================================
+# SCENARIO SCORING
+# Scores hypothetical component values with the normalization statistics
+# of the observed history (see liquidity_scenarios.py).
+# ============================================================================
+
+def component_statistics(inputs, method=None, window=None):
+    """
+    Mean and std of every component used to score new values: all
+    observations ('zscore', 'expanding') or the last `window` valid
+    observations ('rolling'). Returns a DataFrame (mean, std) x columns.
+    """
+    if method is None:
+        method = NORMALIZATION['method']
+    if method not in ('zscore', 'expanding', 'rolling'):
+        raise ValueError(f"Scenario scoring requires a z-score method, got '{method}'")
+    if window is None:
+        window = NORMALIZATION['window']
+
+    stats = {}
+    for col in inputs.columns:
+        series = inputs[col].dropna()
+        if method == 'rolling':
+            series = series.tail(window)
+        stats[col] = {'mean': series.mean(), 'std': series.std()}
+    return pd.DataFrame(stats)
+
+def score_component_paths(paths, statistics):
+    """
+    LCI pillars, LCI and regime from component paths.
+
+    `paths` maps (pillar, component) -> array of any common shape (e.g.
+    scenarios x dates); `statistics` comes from component_statistics().
+    Follows combine_components() + finalize_index(): a pillar with a
+    missing component is 0. Returns a dict of arrays.
+    """
+    shape = np.shape(next(iter(paths.values())))
+    result = {}
+    for pillar, (index_col, weight_key, sub_weights) in PILLARS.items():
+        total = np.zeros(shape)
+        for (p, component), values in paths.items():
+            if p != pillar:
+                continue
+            mean = statistics[(p, component)]['mean']
+            std = statistics[(p, component)]['std']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                z = (np.asarray(values, dtype=float) - mean) / (std if std != 0 else 1.0)
+            total = total + sub_weights[component] * z
+        result[index_col] = np.nan_to_num(total, nan=0.0)
+
+    result['LCI'] = sum(result[index_col] * WEIGHTS[weight_key] for index_col, weight_key, _ in PILLARS.values())
+    return result
+
+def regime_labels(values):
+    """Regime label of every LCI value (array of any shape), as in pd.cut."""
+    codes = np.searchsorted(np.array(REGIME_BINS[1:-1]), values, side='left')
+    labels = np.array(REGIME_LABELS, dtype=object)[codes]
+    return np.where(np.isnan(values), None, labels)
+
+def _state_config(inputs, method):
+    """Settings that invalidate the persisted normalization state."""
+    return {
+        'method': method,
+        'window': NORMALIZATION['window'] if method == 'rolling' else None,
+        'min_periods': NORMALIZATION['min_periods'],
+        'columns': ['.'.join(col) for col in inputs.columns],
+        'plumbing_alignment': PLUMBING_ALIGNMENT,
+        'weights': {
+            'pillars': WEIGHTS,
+            'fiscal': FISCAL_WEIGHTS,
+            'monetary': MONETARY_WEIGHTS,
+            'plumbing': PLUMBING_WEIGHTS,
+        },
+    }
+
+def update_composite_index(data, method=None, state_path=None, return_attribution=False, return_state=False):
+    """
+    Incrementally extends a point-in-time LCI ('expanding' or 'rolling').
+
+    Normalization statistics live in a persisted Welford state, so only
+    dates after the last processed one are computed and earlier LCI values
+    never change. Observations that arrive late for already published
+    dates still update the statistics. A full recomputation happens only
+    when the method, window, components or weights change.
+
+    Returns: (new_rows, full_recompute) where new_rows is the LCI for the
+    newly processed dates, plus their attribution table when
+    return_attribution=True. With return_state=True the advanced state is
+    returned last instead of being saved: the caller saves it (save_state)
+    once new_rows are stored, so a failed write is retried on the next run.
+    """
+    if method is None:
+        method = NORMALIZATION['method']
+    if state_path is None:
+        state_path = NORMALIZATION['state_path']
+    if method not in ('expanding', 'rolling'):
+        raise ValueError(f"Incremental LCI requires 'expanding' or 'rolling' normalization, got '{method}'")
+
+    print("\nUpdating Liquidity Composite Index (point-in-time)...")
+    inputs = build_component_inputs(data)
+    config = _state_config(inputs, method)
+
+    state = load_state(state_path)
+    full_recompute = state is None or state.get('config') != config
+    if full_recompute:
+        if state is not None:
+            print("⚠️  Normalization settings changed - recomputing full LCI history")
+        accumulator = WelfordAccumulator(config['columns'], config['window'], config['min_periods'])
+        published = None
+        lci_tail = None
+    else:
+        accumulator = WelfordAccumulator.from_dict(state['accumulator'])
+        published = pd.Timestamp(state['last_date']) if state['last_date'] else None
+        lci_tail = pd.Series(state['lci_tail']['values'], index=pd.to_datetime(state['lci_tail']['dates']))
+
+    # Rows holding observations not yet seen by the accumulator
+    last_seen = accumulator.last_dates
+    values = inputs.to_numpy(dtype=float, na_value=np.nan)
+    dates = inputs.index.to_numpy(dtype='datetime64[ns]')
+    unseen = np.isnat(last_seen)[None, :] | (dates[:, None] > last_seen[None, :])
+    values = np.where(unseen, values, np.nan)
+    pending = unseen.any(axis=1) & np.isfinite(values).any(axis=1)
+    if published is not None:
+        emit = dates > np.datetime64(published, 'ns')
+        pending |= emit
+    else:
+        emit = np.ones(len(dates), dtype=bool)
+
+    z_rows = np.full(values.shape, np.nan)
+    for i in np.flatnonzero(pending):
+        z_rows[i] = accumulator.update(values[i], inputs.index[i])
+
+    normalized = pd.DataFrame(z_rows[emit], index=inputs.index[emit], columns=inputs.columns)
+    new_rows = finalize_index(combine_components(normalized), history=lci_tail)
+
+    if not new_rows.empty:
+        tail = pd.concat([lci_tail, new_rows['LCI']]) if lci_tail is not None else new_rows['LCI']
+        tail = tail.tail(20)
+        last_date = new_rows.index[-1]
+    else:
+        tail = lci_tail if lci_tail is not None else pd.Series(dtype=float)
+        last_date = published
+
+    new_state = {
+        'config': config,
+        'last_date': last_date.isoformat() if last_date is not None else None,
+        'lci_tail': {
+            'dates': [d.isoformat() for d in tail.index],
+            'values': tail.tolist(),
+        },
+        'accumulator': accumulator.to_dict(),
+    }
+    if not return_state:
+        save_state(new_state, state_path)
+
+    print(f"✓ LCI {'recomputed' if full_recompute else 'extended'}: {len(new_rows)} new dates ({method})")
+    result = (new_rows, full_recompute)
+    if return_attribution:
+        result += (attribution_table(normalized),)
+    if return_state:
+        result += (new_state,)
+    return result
+
+def generate_report(indices, save_rows=None, attribution=None, bands=None, staleness=None):
     """
     Generates a report on the Liquidity Composite Index.
+    Only `save_rows` (default: all rows) are written to the database,
+    together with the attribution table when given. `bands` (see
+    bootstrap_composite_index) adds the uncertainty of the last value;
+    `staleness` (see plumbing_inputs) the age of the plumbing signals.
+    Returns True if the rows were written to the database.
     """
     if indices.empty:
         print("No data available for report")
-        return
+        return False
 
     recent = indices.tail(30)  # Get more days to account for weekends
     last_row = indices.iloc[-1]
@@ -441,11 +1435,33 @@ def generate_report(indices):
     print(f"LCI MA5:               {last_row['LCI_MA5']:.2f}")
     print(f"Regime:                {last_row['LCI_Regime']}")
 
+    if bands is not None and not bands.empty:
+        last_band = bands.iloc[-1]
+        percentiles = sorted(int(col[len('LCI_P'):]) for col in bands.columns if col.startswith('LCI_P'))
+        lower, upper = percentiles[0], percentiles[-1]
+        print(f"LCI Band (P{lower:02d}-P{upper:02d}):    [{last_band[f'LCI_P{lower:02d}']:.2f}, {last_band[f'LCI_P{upper:02d}']:.2f}]")
+        probabilities = {label: last_band["P_" + label.replace(" ", "_")] for label in REGIME_LABELS}
+        probabilities = ", ".join(f"{label} {p:.0%}" for label, p in probabilities.items() if p > 0)
+        print(f"Regime Probability:    {probabilities}")
+
     print("\n--- SUB-COMPONENTS ---")
     print(f"Fiscal Liquidity:      {last_row['Fiscal_Index']:.2f} (Weight: {WEIGHTS['fiscal_liquidity']:.0%})")
     print(f"Monetary Liquidity:    {last_row['Monetary_Index']:.2f} (Weight: {WEIGHTS['monetary_liquidity']:.0%})")
     print(f"Market Plumbing:       {last_row['Plumbing_Index']:.2f} (Weight: {WEIGHTS['market_plumbing']:.0%})")
 
+    if staleness is not None and not staleness.empty:
+        ages = staleness.iloc[-1]
+        print("\n--- PLUMBING DATA AGE ---")
+        for col, age in ages.items():
+            print(f"{col:<22} {'no value' if pd.isna(age) else f'{age:.0f} days'}")
+
+    if attribution is not None and not attribution.empty:
+        drivers = lci_drivers(attribution)
+        if not drivers.empty:
+            print("\n--- TOP DRIVERS (Change vs Previous Date) ---")
+            for _, row in drivers.head(5).iterrows():
+                print(f"{row['component'] + '.' + row['subcomponent']:<38} {row['change']:+.2f} (now {row['contribution']:+.2f})")
+
     print("\n--- INTERPRETATION ---")
     lci_val = last_row['LCI']
     if lci_val > 1:
@@ -469,25 +1485,40 @@ def generate_report(indices):
     # Export to Database
     print("\n💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
-        # Reset index to make date a column
-        df_save = indices.reset_index()
-        if 'index' in df_save.columns:
-            df_save = df_save.rename(columns={'index': 'record_date'})
-        elif 'date' in df_save.columns:
-            df_save = df_save.rename(columns={'date': 'record_date'})
-            
-        # Convert categorical to string
-        for col in df_save.columns:
-            if pd.api.types.is_categorical_dtype(df_save[col]):
-                df_save[col] = df_save[col].astype(str)
-                
-        db.upsert_data(df_save, "liquidity_composite_index", key_col="record_date")
-        print("✅ LCI data saved to 'liquidity_composite_index'")
+        # Date index stored as record_date; LCI_Regime (categorical) as text
+        df_save = to_arrow_table(indices if save_rows is None else save_rows, index_col="record_date")
+        # Index and attribution are written in one transaction
+        with db.transaction():
+            db.upsert_data(df_save, "liquidity_composite_index", key_col="record_date")
+            print("✅ LCI data saved to 'liquidity_composite_index'")
+
+            if attribution is not None and not attribution.empty:
+                db.upsert_data(attribution, ATTRIBUTION_TABLE, key_col="record_date",
+                               primary_key=["record_date", "component", "subcomponent"])
+                print(f"✅ LCI attribution saved to '{ATTRIBUTION_TABLE}'")
         db.close()
     except Exception as e:
         print(f"❌ Database save failed: {e}")
+        return False
+    return True
+
+def load_lci_history(columns=None, start=None, end=None, dtype_backend='pyarrow'):
+    """
+    Loads the stored LCI history from the reader snapshot (empty DataFrame
+    if missing). Only the requested columns and date range are read.
+    """
+    try:
+        db = open_snapshot(DB_PATH)
+        try:
+            history = db.read("liquidity_composite_index", columns, start, end, dtype_backend=dtype_backend)
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"⚠️  Could not load LCI history: {e}")
+        return pd.DataFrame()
+    return history.rename_axis(None)
 
 def main():
     print("="*60)
@@ -498,15 +1529,52 @@ def main():
     print(f"  Fiscal:    {WEIGHTS['fiscal_liquidity']:.0%}")
     print(f"  Monetary:  {WEIGHTS['monetary_liquidity']:.0%}")
     print(f"  Plumbing:  {WEIGHTS['market_plumbing']:.0%}")
+    print(f"\nNormalization: {NORMALIZATION['method']}")
+
+    method = NORMALIZATION['method']
+    if ENGINE == 'duckdb' and method not in ('expanding', 'rolling'):
+        # Computed inside DuckDB from the stored source tables
+        try:
+            indices = calculate_composite_index_duckdb(DB_PATH, method)
+            generate_report(indices)
+            print("\nLiquidity Composite Index calculation complete.")
+            return
+        except ValueError as e:
+            print(f"⚠️  DuckDB engine unavailable ({e}) - falling back to pandas")
 
     # Load all data
     data = load_data()
+    _, staleness = build_component_inputs(data, return_staleness=True)
+
+    if method in ('expanding', 'rolling'):
+        # Point-in-time: extend the stored LCI with the new dates only
+        new_rows, full_recompute, attribution, state = update_composite_index(
+            data, method, return_attribution=True, return_state=True
+        )
+        first_new = new_rows.index.min() if not new_rows.empty else None
+        history = None if full_recompute else load_lci_history(end=first_new, dtype_backend='numpy')
+        if history is not None and not history.empty:
+            history = history[history.index < first_new] if first_new is not None else history
+            indices = pd.concat([history, new_rows])
+        else:
+            indices = new_rows
+        # The state only advances past the new dates once they are stored
+        if generate_report(indices, save_rows=new_rows, attribution=attribution, staleness=staleness) \
+                or new_rows.empty:
+            save_state(state, NORMALIZATION['state_path'])
+        else:
+            print("⚠️  LCI state not saved: the new dates will be recomputed on the next run")
+    else:
+        # Calculate composite index
+        indices, attribution = calculate_composite_index(data, method, return_attribution=True)
 
-    # Calculate composite index
-    indices = calculate_composite_index(data)
+        # Uncertainty of the full-sample normalization
+        bands = None
+        if method == 'zscore' and BOOTSTRAP['replicates'] > 0:
+            bands = bootstrap_composite_index(data)
 
-    # Generate report
-    generate_report(indices)
+        # Generate report
+        generate_report(indices, attribution=attribution, bands=bands, staleness=staleness)
 
     print("\nLiquidity Composite Index calculation complete.")
 
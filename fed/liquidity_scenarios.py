@@ -0,0 +1,254 @@
+"""
+Liquidity Scenario Engine
+=========================
+Propagates shock paths on TGA, RRP, Fed assets and the SOFR-IORB spread
+through Net Liquidity, the stress index and the Liquidity Composite Index.
+
+All scenarios are evaluated at once as (scenario x date) arrays: the
+observed history is shared, future rows hold the last values flat
+(baseline) plus each scenario's shocks. Scenarios are defined in
+config.SCENARIOS (see utils.scenarios for the format).
+"""
+
+import pandas as pd
+import numpy as np
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SCENARIOS, SCENARIO_HORIZON_DAYS
+from storage import open_writer
+from utils.data_loader import find_file, load_columns
+from utils.scenarios import scenario_paths, rolling_mean, rolling_std, diff, tidy
+from fed_liquidity import stress_index_values
+import liquidity_composite_index as lci
+
+BASELINE = {"name": "baseline", "description": "No shocks (last values held flat)", "shocks": []}
+
+# Fed columns used by the engine (raw inputs plus fallbacks)
+SCENARIO_FED_COLUMNS = [
+    "TGA_Balance", "RRP_Balance", "Fed_Total_Assets",
+    "SOFR_Rate", "IORB_Rate", "Spread_SOFR_IORB", "Spread_EFFR_IORB",
+    "Repo_Ops_Balance_M", "Repo_Ops_Balance",
+]
+
+# Metrics summarized per scenario
+SUMMARY_METRICS = [
+    "TGA_Balance", "RRP_Balance", "Fed_Total_Assets", "Spread_SOFR_IORB",
+    "Net_Liquidity", "Stress_Index", "LCI", "LCI_MA20",
+]
+
+def _column(df, name):
+    if name in df.columns:
+        return pd.to_numeric(df[name], errors='coerce')
+    return pd.Series(np.nan, index=df.index)
+
+def project_fed_metrics(df, scenarios, horizon):
+    """
+    Fed input paths and derived metrics for every scenario.
+
+    Derived metrics follow fed_liquidity.calculate_metrics():
+    Net_Liquidity = Fed assets - RRP - TGA, RRP_Change (1 day),
+    Net_Balance_Sheet_Flow (5 days), SOFR_Vol_5D, MA20_RRP, Stress_Index.
+
+    Returns: (dates, metrics) where metrics maps name -> array
+    (scenarios x dates) covering history and horizon.
+    """
+    history = pd.DataFrame({
+        'TGA_Balance': _column(df, 'TGA_Balance').ffill(),
+        'RRP_Balance': _column(df, 'RRP_Balance').ffill(),
+        'Fed_Total_Assets': _column(df, 'Fed_Total_Assets'),
+        'IORB_Rate': _column(df, 'IORB_Rate'),
+        'Spread_SOFR_IORB': (_column(df, 'SOFR_Rate') - _column(df, 'IORB_Rate')) * 100
+        if 'SOFR_Rate' in df.columns else _column(df, 'Spread_SOFR_IORB'),
+        'Spread_EFFR_IORB': _column(df, 'Spread_EFFR_IORB'),
+        'Repo_Ops_Balance_M': _column(df, 'Repo_Ops_Balance_M')
+        if 'Repo_Ops_Balance_M' in df.columns else _column(df, 'Repo_Ops_Balance') * 1000,
+    }, index=df.index)
+
+    dates, paths = scenario_paths(history, scenarios, horizon)
+
+    metrics = {col: paths[col] for col in ['TGA_Balance', 'RRP_Balance', 'Fed_Total_Assets', 'Spread_SOFR_IORB']}
+    # SOFR follows the (possibly shocked) spread over IORB past the history
+    sofr = paths['IORB_Rate'] + paths['Spread_SOFR_IORB'] / 100
+    if 'SOFR_Rate' in df.columns:
+        sofr[:, :len(history)] = _column(df, 'SOFR_Rate').to_numpy(dtype=float, na_value=np.nan)
+    metrics['Net_Liquidity'] = paths['Fed_Total_Assets'] - paths['RRP_Balance'] * 1000 - paths['TGA_Balance']
+    metrics['RRP_Change'] = diff(paths['RRP_Balance'], 1)
+    metrics['Net_Balance_Sheet_Flow'] = diff(paths['Fed_Total_Assets'], 5)
+    metrics['SOFR_Vol_5D'] = rolling_std(sofr, 5, 2)
+    metrics['MA20_RRP'] = rolling_mean(paths['RRP_Balance'], 20, 10)
+    metrics['Stress_Index'] = stress_index_values({
+        'Spread_SOFR_IORB': paths['Spread_SOFR_IORB'],
+        'Spread_EFFR_IORB': paths['Spread_EFFR_IORB'],
+        'SOFR_Vol_5D': metrics['SOFR_Vol_5D'],
+        'RRP_Balance': paths['RRP_Balance'],
+        'MA20_RRP': metrics['MA20_RRP'],
+        'Repo_Ops_Balance_M': paths['Repo_Ops_Balance_M'],
+    })
+    return dates, metrics
+
+def project_lci(lci_data, fed_metrics, horizon, method=None, history=None):
+    """
+    LCI pillars, LCI and moving averages over the horizon for every scenario.
+
+    Components driven by the shocked series (net liquidity, balance sheet
+    flow, RRP change, SOFR stress, TGA drawdown) follow the scenario paths;
+    the others hold their last observed value. Values are scored with the
+    normalization statistics of the observed history. `history` holds the
+    observed LCI used to seed the moving averages (computed if None).
+
+    Returns: dict name -> array (scenarios x horizon)
+    """
+    inputs = lci.build_component_inputs(lci_data)
+    statistics = lci.component_statistics(inputs, method)
+
+    driven = {
+        ('monetary', 'net_liquidity'): fed_metrics['Net_Liquidity'],
+        ('monetary', 'net_balance_sheet_flow'): fed_metrics['Net_Balance_Sheet_Flow'],
+        ('monetary', 'rrp_change'): -fed_metrics['RRP_Change'],
+        ('monetary', 'sofr_stress'): -fed_metrics['Spread_SOFR_IORB'],
+        ('fiscal', 'tga'): -diff(fed_metrics['TGA_Balance'], 1),
+    }
+    n_scen = fed_metrics['Net_Liquidity'].shape[0]
+
+    paths = {}
+    for col in inputs.columns:
+        if col in driven:
+            paths[col] = driven[col][:, -horizon:]
+        else:
+            valid = inputs[col].dropna()
+            paths[col] = np.full((n_scen, horizon), valid.iloc[-1] if not valid.empty else np.nan)
+
+    result = lci.score_component_paths(paths, statistics)
+
+    # Moving averages continue the observed LCI
+    if history is None:
+        history = lci.finalize_index(lci.combine_components(lci.normalize_components(inputs, method=method)))['LCI']
+    tail = history.tail(19).to_numpy()
+    full = np.hstack([np.broadcast_to(tail, (n_scen, len(tail))), result['LCI']])
+    result['LCI_MA20'] = rolling_mean(full, 20, 14)[:, -horizon:]
+    result['LCI_MA5'] = rolling_mean(full, 5, 3)[:, -horizon:]
+    return result
+
+def run_scenarios(fed_df, lci_data=None, scenarios=None, horizon=None, method=None):
+    """
+    Evaluates all scenarios (plus the baseline) in one pass.
+
+    Returns a dict with:
+    - 'paths': tidy table (scenario, date, metric, value) over the horizon
+    - 'summary': tidy table per (scenario, metric) with start, end, min,
+      max, change and end difference vs the baseline ('vs_baseline');
+      LCI rows also carry the end regime
+    """
+    scenarios = [BASELINE] + list(SCENARIOS if scenarios is None else scenarios)
+    horizon = horizon or SCENARIO_HORIZON_DAYS
+    names = [s['name'] for s in scenarios]
+
+    print(f"\nRunning {len(scenarios)} scenarios over {horizon} days...")
+    dates, metrics = project_fed_metrics(fed_df, scenarios, horizon)
+    n_history = len(dates) - horizon
+    start_values = {name: values[0, n_history - 1] for name, values in metrics.items()}
+
+    future = {name: values[:, n_history:] for name, values in metrics.items()}
+    if lci_data is not None:
+        observed = lci.calculate_composite_index(lci_data, method)
+        future.update(project_lci(lci_data, metrics, horizon, method, history=observed['LCI']))
+        start_values['LCI'] = observed['LCI'].iloc[-1]
+        start_values['LCI_MA20'] = observed['LCI_MA20'].iloc[-1]
+
+    future_dates = dates[n_history:]
+    paths = tidy(future, names, future_dates)
+
+    rows = []
+    for metric in SUMMARY_METRICS:
+        if metric not in future:
+            continue
+        values = future[metric]
+        for s, name in enumerate(names):
+            rows.append({
+                'scenario': name,
+                'metric': metric,
+                'start': start_values.get(metric, np.nan),
+                'end': values[s, -1],
+                'min': np.nanmin(values[s]) if np.isfinite(values[s]).any() else np.nan,
+                'max': np.nanmax(values[s]) if np.isfinite(values[s]).any() else np.nan,
+                'change': values[s, -1] - start_values.get(metric, np.nan),
+                'vs_baseline': values[s, -1] - values[0, -1],
+                'end_regime': lci.regime_labels(values[s, -1:])[0] if metric == 'LCI' else None,
+            })
+    summary = pd.DataFrame(rows)
+    descriptions = {s['name']: s.get('description', '') for s in scenarios}
+    summary.insert(1, 'description', summary['scenario'].map(descriptions))
+
+    print(f"✓ {len(names)} scenarios x {horizon} days evaluated")
+    return {'paths': paths, 'summary': summary}
+
+def format_summary(summary, metrics=None):
+    """
+    Scenario x metric table of end-of-horizon changes vs the baseline.
+    """
+    metrics = metrics or ['Net_Liquidity', 'Stress_Index', 'LCI']
+    table = summary[summary['metric'].isin(metrics)].pivot(
+        index='scenario', columns='metric', values='vs_baseline'
+    )
+    table = table.reindex(index=summary['scenario'].unique(), columns=[m for m in metrics if m in table.columns])
+    if 'LCI' in table.columns:
+        regimes = summary[summary['metric'] == 'LCI'].set_index('scenario')['end_regime']
+        table['LCI_Regime'] = regimes.reindex(table.index)
+    return table
+
+def load_fed_history():
+    """
+    Loads the Fed liquidity panel written by fed_liquidity.py.
+    """
+    fed_path = find_file("fed_liquidity_full.csv", lci.FED_SEARCH_PATHS)
+    if fed_path is None:
+        print("Fed liquidity data file not found")
+        return pd.DataFrame()
+    return load_columns(fed_path, SCENARIO_FED_COLUMNS)
+
+def main():
+    print("="*60)
+    print("LIQUIDITY SCENARIO ENGINE")
+    print("="*60)
+
+    fed_df = load_fed_history()
+    if fed_df.empty:
+        print("No Fed data available - run fed_liquidity.py first")
+        return None
+
+    lci_data = lci.load_data()
+    results = run_scenarios(fed_df, lci_data)
+    summary = results['summary']
+
+    print("\n--- SCENARIOS ---")
+    for _, row in summary.drop_duplicates('scenario').iterrows():
+        print(f"{row['scenario']:<24} {row['description']}")
+
+    print(f"\n--- END OF HORIZON vs BASELINE ({SCENARIO_HORIZON_DAYS} days) ---")
+    table = format_summary(summary)
+    print(table.to_string(float_format="{:,.2f}".format))
+
+    print("\n💾 Saving to DuckDB...")
+    try:
+        db = open_writer("database/treasury_data.duckdb")
+        run_date = pd.Timestamp(datetime.now().date())
+        with db.transaction():
+            db.upsert_data(results['paths'].assign(run_date=run_date), "liquidity_scenario_paths", key_col="run_date",
+                           primary_key=["run_date", "scenario", "date", "metric"])
+            db.upsert_data(summary.assign(run_date=run_date), "liquidity_scenario_summary", key_col="run_date",
+                           primary_key=["run_date", "scenario", "metric"])
+        print("✅ Scenarios saved to 'liquidity_scenario_paths' / 'liquidity_scenario_summary'")
+        db.close()
+    except Exception as e:
+        print(f"❌ Database save failed: {e}")
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,14 @@ import os
 
 # Add fed directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import DEFAULT_START_DATE
 from utils.api_client import NYFedClient
 from utils.data_loader import get_output_path
 from utils.report_generator import ReportGenerator, format_currency, format_bps
-from utils.db_manager import TimeSeriesDB
+from storage import open_writer
 
 
 def extract_collateral_breakdown(details: list) -> dict:
@@ -344,69 +346,71 @@ def generate_report(df_repo: pd.DataFrame, df_rrp: pd.DataFrame) -> None:
     print("\n" + "="*60)
     print("💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
-        if not df_repo.empty:
-            # Reset index to make date a column
-            df_repo_save = df_repo.reset_index()
-            if 'index' in df_repo_save.columns:
-                df_repo_save = df_repo_save.rename(columns={'index': 'record_date'})
-            elif 'date' in df_repo_save.columns: # Sometimes index name is date
-                df_repo_save = df_repo_save.rename(columns={'date': 'record_date'})
-
-            # DIAGNOSTIC: Print DataFrame info before upsert
-            print("\n🔍 === DIAGNOSTIC INFO ===")
-            print("DataFrame dtypes:")
-            print(df_repo_save.dtypes)
-            print("\nNull values count:")
-            print(df_repo_save.isna().sum())
-            print("\nSample data (first 2 rows):")
-            print(df_repo_save.head(2))
-
-            # FIXED: Convert ALL columns to appropriate types before upsert
-            # Handle object columns - convert nested structures to JSON strings
-            object_cols = df_repo_save.select_dtypes(include=['object']).columns.tolist()
-            for col in object_cols:
-                # Convert nested structures (lists, dicts) to JSON strings
-                if col in ['details', 'propositions']:
-                    df_repo_save[col] = df_repo_save[col].apply(
-                        lambda x: json.dumps(x) if isinstance(x, (list, dict)) else str(x) if pd.notna(x) else None
-                    )
-                else:
-                    df_repo_save[col] = df_repo_save[col].astype(str)
-
-            # Handle numeric columns that might have been converted to float due to NaN
-            # Convert them back to proper numeric types or replace NaN with appropriate defaults
-            numeric_cols = df_repo_save.select_dtypes(include=['float64', 'int64']).columns.tolist()
-            for col in numeric_cols:
-                if df_repo_save[col].isna().any():
-                    print(f"⚠️  Column '{col}' contains NaN values, filling with 0")
-                    df_repo_save[col] = df_repo_save[col].fillna(0)
-
-            db.upsert_data(df_repo_save, "nyfed_repo_ops", key_col="record_date")
-            print("✅ Repo operations saved to 'nyfed_repo_ops'")
+        # Repo and RRP operations are written in one transaction
+        with db.transaction():
+            if not df_repo.empty:
+                # Reset index to make date a column
+                df_repo_save = df_repo.reset_index()
+                if 'index' in df_repo_save.columns:
+                    df_repo_save = df_repo_save.rename(columns={'index': 'record_date'})
+                elif 'date' in df_repo_save.columns: # Sometimes index name is date
+                    df_repo_save = df_repo_save.rename(columns={'date': 'record_date'})
+
+                # DIAGNOSTIC: Print DataFrame info before upsert
+                print("\n🔍 === DIAGNOSTIC INFO ===")
+                print("DataFrame dtypes:")
+                print(df_repo_save.dtypes)
+                print("\nNull values count:")
+                print(df_repo_save.isna().sum())
+                print("\nSample data (first 2 rows):")
+                print(df_repo_save.head(2))
+
+                # FIXED: Convert ALL columns to appropriate types before upsert
+                # Handle object columns - convert nested structures to JSON strings
+                object_cols = df_repo_save.select_dtypes(include=['object']).columns.tolist()
+                for col in object_cols:
+                    # Convert nested structures (lists, dicts) to JSON strings
+                    if col in ['details', 'propositions']:
+                        df_repo_save[col] = df_repo_save[col].apply(
+                            lambda x: json.dumps(x) if isinstance(x, (list, dict)) else str(x) if pd.notna(x) else None
+                        )
+                    else:
+                        df_repo_save[col] = df_repo_save[col].astype(str)
+
+                # Handle numeric columns that might have been converted to float due to NaN
+                # Convert them back to proper numeric types or replace NaN with appropriate defaults
+                numeric_cols = df_repo_save.select_dtypes(include=['float64', 'int64']).columns.tolist()
+                for col in numeric_cols:
+                    if df_repo_save[col].isna().any():
+                        print(f"⚠️  Column '{col}' contains NaN values, filling with 0")
+                        df_repo_save[col] = df_repo_save[col].fillna(0)
+
+                db.upsert_data(df_repo_save, "nyfed_repo_ops", key_col="record_date")
+                print("✅ Repo operations saved to 'nyfed_repo_ops'")
         
-        if not df_rrp.empty:
-            # Reset index to make date a column
-            df_rrp_save = df_rrp.reset_index()
-            if 'index' in df_rrp_save.columns:
-                df_rrp_save = df_rrp_save.rename(columns={'index': 'record_date'})
-            elif 'date' in df_rrp_save.columns:
-                df_rrp_save = df_rrp_save.rename(columns={'date': 'record_date'})
-
-            # FIXED: Convert ALL object columns to appropriate types before upsert
-            object_cols = df_rrp_save.select_dtypes(include=['object']).columns.tolist()
-            for col in object_cols:
-                # Convert nested structures (lists, dicts) to JSON strings
-                if col in ['details', 'propositions']:
-                    df_rrp_save[col] = df_rrp_save[col].apply(
-                        lambda x: json.dumps(x) if isinstance(x, (list, dict)) else str(x) if pd.notna(x) else None
-                    )
-                else:
-                    df_rrp_save[col] = df_rrp_save[col].astype(str)
-
-            db.upsert_data(df_rrp_save, "nyfed_rrp_ops", key_col="record_date")
-            print("✅ RRP operations saved to 'nyfed_rrp_ops'")
+            if not df_rrp.empty:
+                # Reset index to make date a column
+                df_rrp_save = df_rrp.reset_index()
+                if 'index' in df_rrp_save.columns:
+                    df_rrp_save = df_rrp_save.rename(columns={'index': 'record_date'})
+                elif 'date' in df_rrp_save.columns:
+                    df_rrp_save = df_rrp_save.rename(columns={'date': 'record_date'})
+
+                # FIXED: Convert ALL object columns to appropriate types before upsert
+                object_cols = df_rrp_save.select_dtypes(include=['object']).columns.tolist()
+                for col in object_cols:
+                    # Convert nested structures (lists, dicts) to JSON strings
+                    if col in ['details', 'propositions']:
+                        df_rrp_save[col] = df_rrp_save[col].apply(
+                            lambda x: json.dumps(x) if isinstance(x, (list, dict)) else str(x) if pd.notna(x) else None
+                        )
+                    else:
+                        df_rrp_save[col] = df_rrp_save[col].astype(str)
+
+                db.upsert_data(df_rrp_save, "nyfed_rrp_ops", key_col="record_date")
+                print("✅ RRP operations saved to 'nyfed_rrp_ops'")
             
         db.close()
     except Exception as e:
@@ -11,11 +11,13 @@ import os
 
 # Add fed directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import NYFED_RATE_TYPES
 from utils.api_client import NYFedClient
 from utils.data_loader import get_output_path
-from utils.db_manager import TimeSeriesDB
+from storage import open_writer
 
 
 def fetch_all_reference_rates(num_records: int = 1000) -> dict:
@@ -106,7 +108,7 @@ def generate_report(merged_df: pd.DataFrame) -> None:
     # Export to Database
     print("\n💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
         # Reset index to make date a column
         df_save = merged_df.reset_index()
@@ -16,12 +16,14 @@ import os
 
 # Add fed directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import DEFAULT_START_DATE
 from utils.api_client import NYFedClient
 from utils.data_loader import get_output_path
 from utils.report_generator import ReportGenerator
-from utils.db_manager import TimeSeriesDB
+from storage import open_writer
 
 
 def aggregate_fails(df: pd.DataFrame) -> pd.DataFrame:
@@ -127,7 +129,7 @@ def generate_report(df: pd.DataFrame) -> None:
     print("\n" + "="*60)
     print("💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
         # Reset index to make date a column
         df_save = df.reset_index()
@@ -12,11 +12,13 @@ from datetime import datetime, timedelta
 
 # Add current directory to path for fed imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.ofr_client import OFRClient
 from utils.data_loader import get_output_path
 import config
-from utils.db_manager import TimeSeriesDB
+from storage import open_writer
 
 def calculate_repo_stress_index(df):
     """
@@ -152,7 +154,7 @@ def main():
     # Export to Database
     print("\n💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
         # Reset index to make date a column
         df_save = output_df.reset_index()
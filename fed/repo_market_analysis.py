@@ -11,10 +11,12 @@ from datetime import datetime, timedelta
 
 # Add fed directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Project root for the storage package (after fed, so utils stays fed/utils)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.ofr_client import OFRClient
 from config import DEFAULT_START_DATE, OUTPUT_DIR_FED
-from utils.db_manager import TimeSeriesDB
+from storage import open_writer
 
 def analyze_repo_collateral_stress(df):
     """
@@ -167,7 +169,7 @@ def main():
     # Export to Database
     print("\n💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
+        db = open_writer("database/treasury_data.duckdb")
         
         # Reset index to make date a column
         df_save = df_analysis.reset_index()
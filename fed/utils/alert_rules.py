@@ -0,0 +1,230 @@
+"""
+Alert Rule Utilities
+Declarative alert rules compiled to boolean masks over a full panel.
+
+A rule is a dict:
+    {
+        'name': 'stress_high',          # Unique rule name
+        'type': 'STRESS',               # Alert family (one alert per type)
+        'column': 'Stress_Index',       # Panel column tested
+        'op': '>=',                     # See OPERATORS
+        'threshold': 75,
+        'persistence': 1,               # Consecutive rows required to fire
+        'severity': 'CRITICAL',         # CRITICAL / WARNING / INFO
+        'message': 'Stress Index at {value:.0f}/100',
+    }
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    'abs>': lambda values, threshold: np.abs(values) > threshold,
+    'abs<': lambda values, threshold: np.abs(values) < threshold,
+}
+
+SEVERITY_RANK = {'CRITICAL': 3, 'WARNING': 2, 'ELEVATED': 1, 'INFO': 0}
+
+
+def _persist(condition: np.ndarray, persistence: np.ndarray) -> np.ndarray:
+    """
+    Keep only rows where the condition held for `persistence` consecutive rows.
+
+    Args:
+        condition: 2D boolean array (dates x rules)
+        persistence: Required run length per column
+
+    Returns:
+        Boolean array of the same shape
+    """
+    persistence = np.maximum(np.asarray(persistence, dtype=int), 1)
+    if (persistence == 1).all():
+        return condition
+    counts = np.vstack([
+        np.zeros((1, condition.shape[1])),
+        np.cumsum(condition, axis=0)
+    ])
+    upper = np.arange(1, condition.shape[0] + 1)[:, None]
+    lower = np.maximum(upper - persistence[None, :], 0)
+    run = counts[1:] - np.take_along_axis(counts, lower, axis=0)
+    return run >= persistence[None, :]
+
+
+def compile_rules(panel: pd.DataFrame, rules: Sequence[Dict]) -> pd.DataFrame:
+    """
+    Evaluate every rule on every row of the panel.
+
+    Rules whose column is missing from the panel never fire. NaN values
+    never satisfy a condition.
+
+    Args:
+        panel: DataFrame indexed by date
+        rules: Rule dicts (see module docstring)
+
+    Returns:
+        Boolean DataFrame (dates x rule names)
+    """
+    names = [rule['name'] for rule in rules]
+    condition = np.zeros((len(panel), len(rules)), dtype=bool)
+
+    for i, rule in enumerate(rules):
+        column = rule['column']
+        if column not in panel.columns:
+            continue
+        values = panel[column].to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            condition[:, i] = OPERATORS[rule['op']](values, rule['threshold']) & np.isfinite(values)
+
+    persistence = [rule.get('persistence', 1) for rule in rules]
+    masks = _persist(condition, persistence)
+    return pd.DataFrame(masks, index=panel.index, columns=names)
+
+
+def threshold_sweep(
+    series: pd.Series,
+    op: str,
+    thresholds: Sequence[float],
+    persistence: int = 1
+) -> pd.DataFrame:
+    """
+    Evaluate one rule for many candidate thresholds at once.
+
+    Args:
+        series: Values tested by the rule
+        op: Operator key (see OPERATORS)
+        thresholds: Candidate thresholds
+        persistence: Consecutive rows required to fire
+
+    Returns:
+        Boolean DataFrame (dates x thresholds)
+    """
+    values = series.to_numpy(dtype=float, na_value=np.nan)[:, None]
+    grid = np.asarray(thresholds, dtype=float)[None, :]
+    with np.errstate(invalid='ignore'):
+        condition = OPERATORS[op](values, grid) & np.isfinite(values)
+    masks = _persist(condition, np.full(grid.shape[1], persistence))
+    return pd.DataFrame(masks, index=series.index, columns=list(thresholds))
+
+
+def _next_true_position(masks: np.ndarray) -> np.ndarray:
+    """Row position of the next True at or after each row (len(masks) if none)."""
+    n = masks.shape[0]
+    positions = np.where(masks, np.arange(n)[:, None], n)
+    return np.minimum.accumulate(positions[::-1], axis=0)[::-1]
+
+
+def alert_statistics(
+    masks: pd.DataFrame,
+    target: Optional[pd.Series] = None,
+    horizon: int = 10
+) -> pd.DataFrame:
+    """
+    Summarize the alert history of every rule.
+
+    Args:
+        masks: Output of compile_rules (or threshold_sweep)
+        target: Optional boolean Series of events the alerts should catch
+        horizon: Rows after a target onset within which an alert counts
+
+    Returns:
+        DataFrame indexed by rule with:
+        'alert_rate' (share of rows firing), 'episodes' (alert onsets),
+        'last_alert', 'active' and, with a target, 'hit_rate' (share of
+        target episodes caught within the horizon), 'latency_median'
+        (rows from target onset to the first alert) and 'precision'
+        (share of alert onsets within the horizon of a target onset)
+    """
+    values = masks.to_numpy(dtype=bool)
+    n = values.shape[0]
+    onsets = values & ~np.vstack([np.zeros((1, values.shape[1]), dtype=bool), values[:-1]])
+
+    last_pos = np.where(values.any(axis=0), n - 1 - np.argmax(values[::-1], axis=0), -1)
+    stats = pd.DataFrame({
+        'alert_rate': values.mean(axis=0) if n else np.zeros(values.shape[1]),
+        'episodes': onsets.sum(axis=0),
+        'last_alert': [masks.index[p] if p >= 0 else pd.NaT for p in last_pos],
+        'active': values[-1] if n else np.zeros(values.shape[1], dtype=bool),
+    }, index=masks.columns)
+
+    if target is None:
+        return stats
+
+    events = target.reindex(masks.index).fillna(False).to_numpy(dtype=bool)
+    event_onsets = np.flatnonzero(events & ~np.concatenate([[False], events[:-1]]))
+
+    # Latency: rows from each target onset to the first alert at or after it
+    next_alert = _next_true_position(values)
+    if len(event_onsets):
+        latency = (next_alert[event_onsets] - event_onsets[:, None]).astype(float)
+        latency[(latency > horizon) | (next_alert[event_onsets] >= n)] = np.nan
+        caught = np.isfinite(latency)
+        stats['hit_rate'] = caught.mean(axis=0)
+        with np.errstate(invalid='ignore'):
+            stats['latency_median'] = [
+                np.median(col[np.isfinite(col)]) if np.isfinite(col).any() else np.nan
+                for col in latency.T
+            ]
+    else:
+        stats['hit_rate'] = np.nan
+        stats['latency_median'] = np.nan
+
+    # Precision: alert onsets with a target onset within +/- horizon rows
+    near_event = np.zeros(n, dtype=bool)
+    for offset in range(-horizon, horizon + 1):
+        shifted = event_onsets + offset
+        near_event[shifted[(shifted >= 0) & (shifted < n)]] = True
+    alert_onsets = onsets.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats['precision'] = np.where(
+            alert_onsets > 0,
+            (onsets & near_event[:, None]).sum(axis=0) / alert_onsets,
+            np.nan
+        )
+    return stats
+
+
+def latest_alerts(
+    panel: pd.DataFrame,
+    masks: pd.DataFrame,
+    rules: Sequence[Dict]
+) -> List[Dict]:
+    """
+    Alerts firing on the last row, keeping the most severe rule per type.
+
+    Args:
+        panel: Panel the masks were compiled from
+        masks: Output of compile_rules
+        rules: Rules used to build the masks
+
+    Returns:
+        List of {'severity', 'type', 'message'} dicts
+    """
+    if masks.empty:
+        return []
+
+    last = masks.iloc[-1]
+    selected: Dict[str, Dict] = {}
+    for rule in rules:
+        if not last.get(rule['name'], False):
+            continue
+        current = selected.get(rule['type'])
+        if current is None or SEVERITY_RANK.get(rule['severity'], 0) > SEVERITY_RANK.get(current['severity'], 0):
+            selected[rule['type']] = rule
+
+    alerts = []
+    for rule in selected.values():
+        value = panel[rule['column']].iloc[-1]
+        alerts.append({
+            'severity': rule['severity'],
+            'type': rule['type'],
+            'message': rule['message'].format(value=value)
+        })
+    return alerts
@@ -0,0 +1,122 @@
+"""
+As-of Alignment Utilities
+Align mixed-frequency series onto a common date index with explicit
+staleness tolerances and publication lags.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional, Tuple
+
+
+def build_alignment_rules(
+    columns: Iterable[str],
+    frequencies: Dict[str, str],
+    tolerance_days: Dict[str, Optional[int]],
+    lag_days: Dict[str, int],
+    overrides: Optional[Dict[str, Dict]] = None,
+    default_frequency: str = "daily"
+) -> Dict[str, Dict]:
+    """
+    Resolve the alignment rule of each column.
+
+    Args:
+        columns: Column names to align
+        frequencies: Column name -> frequency ("daily", "weekly", "policy", ...)
+        tolerance_days: Frequency -> max days a value is carried after it
+            becomes available (None = until the next observation)
+        lag_days: Frequency -> days between observation date and availability
+        overrides: Column name -> partial rule overriding the frequency defaults
+        default_frequency: Frequency for columns missing from `frequencies`
+
+    Returns:
+        Dict mapping column -> {'frequency', 'tolerance_days', 'lag_days'}
+    """
+    overrides = overrides or {}
+    rules = {}
+    for col in columns:
+        frequency = overrides.get(col, {}).get(
+            "frequency", frequencies.get(col, default_frequency)
+        )
+        rule = {
+            "frequency": frequency,
+            "tolerance_days": tolerance_days.get(frequency, 0),
+            "lag_days": lag_days.get(frequency, 0),
+        }
+        rule.update(overrides.get(col, {}))
+        rules[col] = rule
+    return rules
+
+
+def align_asof(
+    observations: Dict[str, pd.Series],
+    index: pd.DatetimeIndex,
+    rules: Dict[str, Dict]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    As-of join every series onto `index` in a single `merge_asof` pass.
+
+    Each row takes, per column, the latest observation already published
+    (observation date + lag <= row date), provided it became available no
+    more than `tolerance_days` before the row date.
+
+    Args:
+        observations: Column name -> Series of observed values indexed by date
+        index: Target dates of the aligned panel
+        rules: Column name -> {'tolerance_days', 'lag_days'}
+            (see build_alignment_rules)
+
+    Returns:
+        Tuple of (aligned panel, staleness matrix). The staleness matrix has
+        the same shape as the panel and holds the age in days of each value
+        (row date - observation date); 0 means observed on that date and
+        NaN means no value.
+    """
+    index = pd.DatetimeIndex(index).sort_values()
+    columns = list(observations.keys())
+    if not columns or len(index) == 0:
+        empty = pd.DataFrame(index=index, columns=columns, dtype=float)
+        return empty, empty.copy()
+
+    # Long table of observations: (series, observed, available, value)
+    pieces = []
+    for col in columns:
+        obs = pd.to_numeric(observations[col], errors="coerce").dropna()
+        obs = obs[~obs.index.duplicated(keep="last")]
+        lag = pd.Timedelta(days=rules.get(col, {}).get("lag_days", 0) or 0)
+        observed = pd.DatetimeIndex(obs.index)
+        pieces.append(pd.DataFrame({
+            "series": col,
+            "observed": observed,
+            "available": observed + lag,
+            "value": obs.to_numpy(dtype=float),
+        }))
+    right = pd.concat(pieces, ignore_index=True).sort_values("available", kind="stable")
+
+    # Long table of targets: every (date, series) cell of the panel
+    left = pd.DataFrame({
+        "date": np.repeat(index.to_numpy(), len(columns)),
+        "series": np.tile(np.array(columns, dtype=object), len(index)),
+    })
+
+    merged = pd.merge_asof(
+        left, right,
+        left_on="date", right_on="available",
+        by="series", direction="backward"
+    )
+
+    # Per-series staleness tolerance, measured from availability
+    tolerance = merged["series"].map(
+        {col: rules.get(col, {}).get("tolerance_days", 0) for col in columns}
+    ).astype(float).fillna(np.inf).to_numpy()
+    waited = ((merged["date"] - merged["available"]) / pd.Timedelta(days=1)).to_numpy()
+    keep = waited <= tolerance
+
+    shape = (len(index), len(columns))
+    values = np.where(keep, merged["value"].to_numpy(dtype=float), np.nan).reshape(shape)
+    age = ((merged["date"] - merged["observed"]) / pd.Timedelta(days=1)).to_numpy()
+    age = np.where(keep, age, np.nan).reshape(shape)
+
+    panel = pd.DataFrame(values, index=index, columns=columns)
+    staleness = pd.DataFrame(age, index=index, columns=columns)
+    return panel, staleness
@@ -1,11 +1,21 @@
 """
 Data Loading Utilities
-Helper functions for loading CSV files with fallback paths.
+Helper functions for loading CSV files with fallback paths, plus a
+memoized column loader shared by CSV, Parquet and DuckDB sources.
 """
 
 import os
+import threading
 import pandas as pd
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Per-process column cache: source key -> {'stamp', 'header', 'index', 'columns'}
+_COLUMN_CACHE: Dict[str, Dict] = {}
+# One lock per source so different sources can load in parallel
+_COLUMN_CACHE_LOCKS: Dict[str, threading.Lock] = {}
+_COLUMN_CACHE_LOCK = threading.Lock()
 
 
 def find_file(filename: str, search_paths: List[str]) -> Optional[str]:
@@ -59,6 +69,262 @@ def load_csv_with_fallback(
         return pd.DataFrame()
 
 
+def _file_stamp(path: str) -> Tuple:
+    """Version stamp of a file (plus its DuckDB write-ahead log, if any)."""
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    wal = f"{path}.wal"
+    if os.path.exists(wal):
+        wal_stat = os.stat(wal)
+        stamp += (wal_stat.st_mtime_ns, wal_stat.st_size)
+    return stamp
+
+
+def _load_cached(
+    key: str,
+    stamp: Tuple,
+    read_header: Callable[[], List[str]],
+    read_columns: Callable[[List[str], List[str]], pd.DataFrame],
+    columns: Optional[List[str]]
+) -> pd.DataFrame:
+    """
+    Shared column cache used by every backend.
+
+    Args:
+        key: Cache key of the source
+        stamp: Current version of the source (a change drops the entry)
+        read_header: Returns the source columns, date index first
+            (empty if the source does not exist)
+        read_columns: Reads (header, columns) into a frame indexed by date
+        columns: Columns to load (None = all). Missing columns are skipped.
+
+    Returns:
+        DataFrame indexed by date with the available requested columns
+    """
+    with _COLUMN_CACHE_LOCK:
+        lock = _COLUMN_CACHE_LOCKS.setdefault(key, threading.Lock())
+
+    with lock:
+        entry = _COLUMN_CACHE.get(key)
+        if entry is None or entry['stamp'] != stamp:
+            entry = {'stamp': stamp, 'header': read_header(), 'index': None, 'columns': {}}
+            _COLUMN_CACHE[key] = entry
+
+        header = entry['header']
+        if not header:
+            return pd.DataFrame()
+        wanted = header[1:] if columns is None else [c for c in columns if c in header[1:]]
+        missing = [c for c in wanted if c not in entry['columns']]
+
+        if missing or entry['index'] is None:
+            df = read_columns(header, missing)
+            try:
+                df.index = pd.to_datetime(df.index)
+            except (ValueError, TypeError):
+                pass
+            entry['index'] = df.index
+            for col in missing:
+                entry['columns'][col] = df[col]
+
+        return pd.DataFrame(
+            {col: entry['columns'][col] for col in wanted},
+            index=entry['index']
+        )
+
+
+def load_columns(
+    csv_path: str,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Load selected columns of a date-indexed CSV, memoized per file version.
+
+    Only the requested columns (plus the index in the first column) are
+    parsed. Parsed columns are cached per process and reused until the
+    file's mtime or size changes, so later calls only read the columns
+    not seen yet.
+
+    Args:
+        csv_path: Path to a CSV whose first column is the date index
+        columns: Columns to load (None = all). Missing columns are skipped.
+
+    Returns:
+        DataFrame indexed by date with the available requested columns
+    """
+    key = os.path.abspath(csv_path)
+
+    def read_header():
+        return list(pd.read_csv(key, nrows=0).columns)
+
+    def read_columns(header, missing):
+        positions = [0] + [header.index(c) for c in missing]
+        return pd.read_csv(key, usecols=positions, index_col=0)
+
+    return _load_cached(key, _file_stamp(key), read_header, read_columns, columns)
+
+
+def load_parquet_columns(
+    parquet_path: str,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Load selected columns of a date-indexed Parquet file (requires pyarrow).
+
+    The date index is the index stored by pandas, or the first column
+    for files written without one. Cached like load_columns.
+
+    Args:
+        parquet_path: Path to the Parquet file
+        columns: Columns to load (None = all). Missing columns are skipped.
+
+    Returns:
+        DataFrame indexed by date with the available requested columns
+    """
+    import pyarrow.parquet as pq
+
+    key = os.path.abspath(parquet_path)
+
+    def read_header():
+        schema = pq.read_schema(key)
+        names = list(schema.names)
+        metadata = schema.pandas_metadata or {}
+        index_cols = [c for c in metadata.get('index_columns', []) if isinstance(c, str)]
+        if index_cols:
+            return [index_cols[0]] + [c for c in names if c not in index_cols]
+        return names
+
+    def read_columns(header, missing):
+        table = pq.read_table(key, columns=[header[0]] + missing, use_pandas_metadata=False)
+        return table.to_pandas(ignore_metadata=True).set_index(header[0])
+
+    return _load_cached(key, _file_stamp(key), read_header, read_columns, columns)
+
+
+def load_duckdb_columns(
+    db_path: str,
+    table: str,
+    columns: Optional[List[str]] = None,
+    key_col: str = 'record_date'
+) -> pd.DataFrame:
+    """
+    Load selected columns of a DuckDB table keyed by date.
+
+    Reads the published reader snapshot (open_snapshot, the database
+    itself if none exists) and loads only the missing columns through
+    TimeSeriesDB.read. Cached like load_columns, keyed on the file read
+    (and its write-ahead log). A missing table yields an empty DataFrame.
+
+    Args:
+        db_path: Path to the DuckDB database
+        table: Table name
+        columns: Columns to load (None = all). Missing columns are skipped.
+        key_col: Date column used as index
+
+    Returns:
+        DataFrame indexed by date with the available requested columns
+    """
+    from storage import open_snapshot, snapshot_path
+
+    snapshot = snapshot_path(db_path)
+    path = os.path.abspath(snapshot if os.path.exists(snapshot) else db_path)
+
+    def read_header():
+        db = open_snapshot(db_path)
+        try:
+            names = db.get_columns(table)
+        finally:
+            db.close()
+        if not names:
+            return []
+        if key_col not in names:
+            raise ValueError(f"Key column '{key_col}' not found in table '{table}'")
+        return [key_col] + [c for c in names if c != key_col]
+
+    def read_columns(header, missing):
+        db = open_snapshot(db_path)
+        try:
+            return db.read(table, missing, key_col=key_col, dtype_backend='numpy')
+        finally:
+            db.close()
+
+    return _load_cached(f"{path}::{table}", _file_stamp(path), read_header, read_columns, columns)
+
+
+def load_source(source: Dict, backends: Sequence[str] = ('csv',)) -> pd.DataFrame:
+    """
+    Load one registered source from the first backend that has it.
+
+    A source is a dict:
+        {
+            'columns': [...],           # Columns to load
+            'paths': [...],             # CSV search paths ('csv')
+            'table': 'fed_liquidity_daily',  # DuckDB table ('duckdb')
+            'db_path': 'database/treasury_data.duckdb',
+            'key_col': 'record_date',
+        }
+    The 'parquet' backend looks for the CSV search paths with a .parquet
+    extension.
+
+    Args:
+        source: Source definition
+        backends: Backends tried in order ('csv', 'parquet', 'duckdb')
+
+    Returns:
+        DataFrame indexed by date (empty if no backend has the source)
+    """
+    columns = source.get('columns')
+    for backend in backends:
+        if backend == 'csv':
+            path = find_file('', source.get('paths', []))
+            if path:
+                return load_columns(path, columns)
+        elif backend == 'parquet':
+            paths = [os.path.splitext(p)[0] + '.parquet' for p in source.get('paths', [])]
+            path = find_file('', paths)
+            if path:
+                return load_parquet_columns(path, columns)
+        elif backend == 'duckdb':
+            db_path = source.get('db_path')
+            if source.get('table') and db_path and os.path.exists(db_path):
+                df = load_duckdb_columns(db_path, source['table'], columns, source.get('key_col', 'record_date'))
+                if not df.empty:
+                    return df
+        else:
+            raise ValueError(f"Unknown backend '{backend}'")
+    return pd.DataFrame()
+
+
+def load_sources(
+    sources: Dict[str, Dict],
+    backends: Sequence[str] = ('csv',),
+    max_workers: Optional[int] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Load several independent sources in parallel on a thread pool.
+
+    A source that is missing or fails to load yields an empty DataFrame.
+
+    Args:
+        sources: Source name -> definition (see load_source)
+        backends: Backends tried in order
+        max_workers: Thread pool size (defaults to the number of sources)
+
+    Returns:
+        Dict mapping source name -> DataFrame
+    """
+    def _load(name):
+        try:
+            return load_source(sources[name], backends)
+        except Exception as e:
+            print(f"Could not load {name} data: {e}")
+            return pd.DataFrame()
+
+    names = list(sources)
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(names), 1)) as pool:
+        frames = list(pool.map(_load, names))
+    return dict(zip(names, frames))
+
+
 def load_tga_data(csv_path: Optional[str] = None) -> pd.Series:
     """
     Load TGA balance data from fiscal analysis CSV.
@@ -86,7 +352,7 @@ def load_tga_data(csv_path: Optional[str] = None) -> pd.Series:
     
     try:
         print(f"Loading TGA data from {csv_path}...")
-        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        df = load_columns(csv_path, ["TGA_Balance"])
         
         if "TGA_Balance" not in df.columns:
             print("TGA_Balance column not found in fiscal data")
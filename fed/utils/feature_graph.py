@@ -0,0 +1,228 @@
+"""
+Feature Graph Utilities
+Declarative registry of derived columns with dependency-aware evaluation.
+"""
+
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+class Feature:
+    """
+    A derived-column definition: a function of named input columns.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, pd.Series], pd.Index], Dict[str, pd.Series]],
+        outputs: List[str],
+        inputs: Optional[List[str]] = None,
+        optional: Optional[List[str]] = None
+    ):
+        """
+        Initialize a feature.
+
+        Args:
+            name: Unique feature name
+            func: Callable taking (inputs dict, index) and returning {column: Series}
+            outputs: Columns the feature may produce (it can return a subset)
+            inputs: Columns that must be present for the feature to run
+            optional: Columns used when present
+        """
+        self.name = name
+        self.func = func
+        self.outputs = list(outputs)
+        self.inputs = list(inputs or [])
+        self.optional = list(optional or [])
+
+    def __repr__(self) -> str:
+        return f"Feature({self.name!r})"
+
+
+class FeatureRegistry:
+    """
+    Registry of features with a planner that evaluates only what is needed.
+
+    A feature may list one of its own outputs as an input (e.g. a forward
+    fill of `RRP_Balance`); that input always refers to the raw column.
+    Output names starting with an underscore are shared intermediates and
+    are never returned to the caller.
+    """
+
+    def __init__(self):
+        self._features: Dict[str, Feature] = {}
+        self._producers: Dict[str, Feature] = {}
+
+    def feature(
+        self,
+        outputs: List[str],
+        inputs: Optional[List[str]] = None,
+        optional: Optional[List[str]] = None,
+        name: Optional[str] = None
+    ) -> Callable:
+        """
+        Decorator registering a feature function.
+
+        Args:
+            outputs: Columns produced by the function
+            inputs: Required input columns
+            optional: Optional input columns
+
+        Returns:
+            The decorator
+        """
+        def decorator(func):
+            self.register(Feature(name or func.__name__, func, outputs, inputs, optional))
+            return func
+        return decorator
+
+    def register(self, feature: Feature) -> None:
+        """
+        Add a feature to the registry.
+
+        Args:
+            feature: Feature to register
+        """
+        if feature.name in self._features:
+            raise ValueError(f"Feature '{feature.name}' already registered")
+        for col in feature.outputs:
+            if col in self._producers:
+                raise ValueError(f"Column '{col}' already produced by {self._producers[col]}")
+            self._producers[col] = feature
+        self._features[feature.name] = feature
+
+    @property
+    def outputs(self) -> List[str]:
+        """All public columns the registry can produce, in registration order."""
+        return [
+            col for f in self._features.values()
+            for col in f.outputs if not col.startswith('_')
+        ]
+
+    def _dependencies(self, feature: Feature, names: Iterable[str]) -> List[Feature]:
+        """Producers of the given input names, excluding raw self-references."""
+        deps = []
+        for col in names:
+            producer = self._producers.get(col)
+            if producer is not None and producer is not feature:
+                deps.append(producer)
+        return deps
+
+    def _resolvable(self, available: Set[str]) -> Set[str]:
+        """
+        Names of features whose required inputs can be satisfied.
+        """
+        ready: Set[str] = set()
+        columns = set(available)
+        changed = True
+        while changed:
+            changed = False
+            for f in self._features.values():
+                if f.name in ready:
+                    continue
+                if all(col in columns for col in f.inputs):
+                    # Optional-only features need at least one input present
+                    if f.inputs or not f.optional or any(col in columns for col in f.optional):
+                        ready.add(f.name)
+                        columns.update(f.outputs)
+                        changed = True
+        return ready
+
+    def plan(self, available: Iterable[str], requested: Optional[Iterable[str]] = None) -> List[List[Feature]]:
+        """
+        Compute the evaluation plan for the requested outputs.
+
+        Args:
+            available: Raw columns present in the input frame
+            requested: Columns wanted (defaults to everything resolvable)
+
+        Returns:
+            List of levels; features within a level are independent
+        """
+        available = set(available)
+        ready = self._resolvable(available)
+
+        if requested is None:
+            needed = set(ready)
+        else:
+            needed = set()
+            stack = [
+                self._producers[col] for col in requested
+                if col in self._producers and self._producers[col].name in ready
+            ]
+            while stack:
+                f = stack.pop()
+                if f.name in needed:
+                    continue
+                needed.add(f.name)
+                for dep in self._dependencies(f, f.inputs + f.optional):
+                    if dep.name in ready:
+                        stack.append(dep)
+
+        # Topological levels (registration order inside each level)
+        depth: Dict[str, int] = {}
+
+        def _depth(f: Feature) -> int:
+            if f.name not in depth:
+                deps = [d for d in self._dependencies(f, f.inputs + f.optional) if d.name in needed]
+                depth[f.name] = 1 + max((_depth(d) for d in deps), default=-1)
+            return depth[f.name]
+
+        levels: Dict[int, List[Feature]] = {}
+        for f in self._features.values():
+            if f.name in needed:
+                levels.setdefault(_depth(f), []).append(f)
+        return [levels[k] for k in sorted(levels)]
+
+    def compute(
+        self,
+        df: pd.DataFrame,
+        requested: Optional[List[str]] = None,
+        max_workers: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Evaluate the features needed for `requested` on a raw frame.
+
+        The input frame is not modified. Independent features of the same
+        level run on a thread pool.
+
+        Args:
+            df: Raw input DataFrame
+            requested: Columns wanted; None returns the raw frame plus all
+                derived columns (replaced raw columns take their new values)
+            max_workers: Thread pool size (defaults to min(4, CPU count))
+
+        Returns:
+            DataFrame indexed like `df`
+        """
+        values: Dict[str, pd.Series] = {col: df[col] for col in df.columns}
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+
+        def _run(f: Feature) -> Dict[str, pd.Series]:
+            if not all(col in values for col in f.inputs):
+                return {}
+            args = {col: values[col] for col in f.inputs + f.optional if col in values}
+            return f.func(args, df.index) or {}
+
+        plan = self.plan(df.columns, requested)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for level in plan:
+                if len(level) == 1 or max_workers <= 1:
+                    results = [_run(f) for f in level]
+                else:
+                    results = list(pool.map(_run, level))
+                for produced in results:
+                    values.update(produced)
+
+        if requested is None:
+            columns = list(df.columns) + [
+                col for col in self.outputs if col in values and col not in df.columns
+            ]
+        else:
+            columns = [col for col in requested if col in values]
+
+        return pd.DataFrame({col: values[col] for col in columns}, index=df.index)
@@ -0,0 +1,227 @@
+"""
+Online Statistics Utilities
+Welford mean/variance accumulators for point-in-time normalization.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+class WelfordAccumulator:
+    """
+    Running mean/variance for several series at once (Welford's algorithm).
+
+    With `window=None` the statistics are expanding; with an integer window
+    they cover the last `window` valid observations of each series (the
+    oldest value is removed as a new one arrives). NaN values are skipped.
+    Each update is O(1) per series and the state can be saved and restored.
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        window: Optional[int] = None,
+        min_periods: int = 2
+    ):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            columns: Names of the tracked series
+            window: Number of valid observations kept (None = expanding)
+            min_periods: Observations required before a z-score is returned
+        """
+        self.columns = list(columns)
+        self.window = window
+        self.min_periods = max(min_periods, 2)
+        # Date of the last observation added to each series
+        self.last_dates = np.full(len(self.columns), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+        k = len(self.columns)
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        # Ring buffer of the last `window` observations (rolling mode only)
+        self.buffer = np.full((window, k), np.nan) if window else None
+        self.position = np.zeros(k, dtype=int)
+
+    def update(self, values: np.ndarray, date: Optional[pd.Timestamp] = None) -> np.ndarray:
+        """
+        Add one observation per series and return its z-score.
+
+        Args:
+            values: Array of length len(columns) (NaN = no observation)
+            date: Optional date of the observation (tracked per series)
+
+        Returns:
+            Z-scores against the statistics including this observation
+            (NaN where the value is missing or history is too short)
+        """
+        x = np.asarray(values, dtype=float)
+        valid = np.isfinite(x)
+        cols = np.arange(len(self.columns))
+
+        if self.buffer is not None:
+            # Remove the oldest observation from full windows
+            full = valid & (self.count >= self.window)
+            if full.any():
+                old = self.buffer[self.position[full], cols[full]]
+                n = self.count[full]
+                mean_new = (n * self.mean[full] - old) / (n - 1)
+                self.m2[full] -= (old - self.mean[full]) * (old - mean_new)
+                self.mean[full] = mean_new
+                self.count[full] = n - 1
+            self.buffer[self.position[valid], cols[valid]] = x[valid]
+            self.position[valid] = (self.position[valid] + 1) % self.window
+
+        self.count[valid] += 1
+        delta = x[valid] - self.mean[valid]
+        self.mean[valid] += delta / self.count[valid]
+        self.m2[valid] += delta * (x[valid] - self.mean[valid])
+        self.m2 = np.maximum(self.m2, 0.0)
+
+        if date is not None:
+            self.last_dates[valid] = np.datetime64(pd.Timestamp(date), 'ns')
+        return self.zscore(x)
+
+    def zscore(self, values: np.ndarray) -> np.ndarray:
+        """
+        Z-score values against the current statistics.
+
+        Series with zero variance are only centered (as in a full-sample
+        z-score with std == 0).
+
+        Args:
+            values: Array of length len(columns)
+
+        Returns:
+            Array of z-scores (NaN where history is too short)
+        """
+        x = np.asarray(values, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(self.m2 / (self.count - 1))
+            centered = x - self.mean
+            z = np.where(std > 0, centered / std, centered)
+        return np.where(self.count >= self.min_periods, z, np.nan)
+
+    def to_dict(self) -> Dict:
+        """Serializable snapshot of the accumulator."""
+        return {
+            'columns': self.columns,
+            'window': self.window,
+            'min_periods': self.min_periods,
+            'last_dates': [
+                pd.Timestamp(d).isoformat() if not np.isnat(d) else None
+                for d in self.last_dates
+            ],
+            'count': self.count.tolist(),
+            'mean': self.mean.tolist(),
+            'm2': self.m2.tolist(),
+            'buffer': np.where(np.isnan(self.buffer), None, self.buffer).tolist()
+            if self.buffer is not None else None,
+            'position': self.position.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'WelfordAccumulator':
+        """Restore an accumulator from to_dict() output."""
+        acc = cls(state['columns'], state['window'], state['min_periods'])
+        acc.last_dates = np.array(
+            [np.datetime64(pd.Timestamp(d), 'ns') if d else np.datetime64('NaT') for d in state['last_dates']],
+            dtype='datetime64[ns]'
+        )
+        acc.count = np.array(state['count'], dtype=float)
+        acc.mean = np.array(state['mean'], dtype=float)
+        acc.m2 = np.array(state['m2'], dtype=float)
+        if state['buffer'] is not None:
+            acc.buffer = np.array(state['buffer'], dtype=float)
+        acc.position = np.array(state['position'], dtype=int)
+        return acc
+
+
+def save_state(state: Dict, path: str) -> None:
+    """
+    Atomically write a JSON state file.
+
+    Args:
+        state: JSON-serializable dict
+        path: Destination file
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_state(path: str) -> Optional[Dict]:
+    """
+    Read a JSON state file.
+
+    Args:
+        path: State file
+
+    Returns:
+        The stored dict, or None if the file is missing or unreadable
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read state file {path}: {e}")
+        return None
+
+
+def expanding_zscore(frame: pd.DataFrame, min_periods: int = 2) -> pd.DataFrame:
+    """
+    Batch equivalent of WelfordAccumulator(window=None) over a whole frame.
+
+    Args:
+        frame: DataFrame of series (NaN = no observation)
+        min_periods: Observations required before a z-score is returned
+
+    Returns:
+        DataFrame of point-in-time z-scores
+    """
+    return rolling_zscore(frame, None, min_periods)
+
+
+def rolling_zscore(
+    frame: pd.DataFrame,
+    window: Optional[int],
+    min_periods: int = 2
+) -> pd.DataFrame:
+    """
+    Batch equivalent of WelfordAccumulator(window) over a whole frame.
+
+    Windows count valid observations of each series, not calendar rows.
+
+    Args:
+        frame: DataFrame of series (NaN = no observation)
+        window: Valid observations per window (None = expanding)
+        min_periods: Observations required before a z-score is returned
+
+    Returns:
+        DataFrame of point-in-time z-scores
+    """
+    min_periods = max(min_periods, 2)
+    result = {}
+    for col in frame.columns:
+        series = frame[col].dropna()
+        if window:
+            stats = series.rolling(window, min_periods=min_periods)
+        else:
+            stats = series.expanding(min_periods=min_periods)
+        mean = stats.mean()
+        std = stats.std()
+        centered = series - mean
+        z = centered.where(~(std > 0), centered / std)
+        result[col] = z.reindex(frame.index)
+    return pd.DataFrame(result, index=frame.index, columns=frame.columns)
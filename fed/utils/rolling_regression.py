@@ -0,0 +1,113 @@
+"""
+Rolling Regression Utilities
+Closed-form rolling OLS trend fits for many series at once.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Union
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing window sum along axis 0 using cumulative sums.
+
+    Args:
+        values: 2D array (dates x columns)
+        window: Number of rows in the window
+
+    Returns:
+        Array of the same shape with the sum of the last `window` rows
+    """
+    cumulative = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    upper = np.arange(1, values.shape[0] + 1)
+    lower = np.maximum(upper - window, 0)
+    return cumulative[upper] - cumulative[lower]
+
+
+def rolling_ols(
+    data: Union[pd.DataFrame, pd.Series],
+    window: int = 20,
+    min_periods: Optional[int] = None,
+    horizon: int = 5
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fit a linear trend over a trailing window for every date and every column.
+
+    Each window is regressed on the position of its valid observations
+    (NaNs are skipped, as with `dropna()` before `np.polyfit`), so the
+    last row reproduces a fit on `series.tail(window).dropna()`. All
+    windows are solved together from cumulative sums in O(n) per column.
+
+    Args:
+        data: DataFrame (or Series) of time series indexed by date
+        window: Number of rows in each trailing window
+        min_periods: Minimum valid observations required (defaults to window)
+        horizon: Steps ahead for the forecast, counted from the last valid point
+
+    Returns:
+        Dict of DataFrames aligned with `data`:
+        'slope', 'intercept' (fitted value at the first point of the window),
+        'r_squared', 'forecast' (fitted value `horizon` steps ahead) and 'n_obs'
+    """
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    if min_periods is None:
+        min_periods = window
+
+    y = frame.to_numpy(dtype=float, na_value=np.nan)
+    valid = np.isfinite(y)
+    mask = valid.astype(float)
+
+    # Compressed positions: the k-th valid observation of a column sits at x = k
+    x = np.cumsum(mask, axis=0)
+
+    # Center y per column to keep the cumulative sums well conditioned
+    counts = mask.sum(axis=0)
+    center = np.where(valid, y, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    yc = np.where(valid, y - center, 0.0)
+    xm = x * mask
+
+    n = _window_sum(mask, window)
+    sx = _window_sum(xm, window)
+    sy = _window_sum(yc, window)
+    sxx = _window_sum(xm * x, window)
+    sxy = _window_sum(xm * yc, window)
+    syy = _window_sum(yc * yc, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = sxx - sx * sx / n
+        cov_xy = sxy - sx * sy / n
+        var_y = syy - sy * sy / n
+
+        slope = cov_xy / var_x
+
+        # Windows with no variation in y (up to cancellation noise) are flat
+        flat = var_y <= 1e-10 * syy
+        slope = np.where(flat, 0.0, slope)
+        mean_x = sx / n
+        mean_y = sy / n + center
+
+        # Shift the origin to the first valid point of each window
+        first_x = x - n + 1
+        last_x = x
+        intercept = mean_y + slope * (first_x - mean_x)
+        forecast = mean_y + slope * (last_x + horizon - mean_x)
+
+        r_squared = np.where(flat, 0.0, (cov_xy * cov_xy) / (var_x * var_y))
+
+    usable = (n >= max(min_periods, 2)) & (var_x > 0)
+    slope = np.where(usable, slope, np.nan)
+    intercept = np.where(usable, intercept, np.nan)
+    forecast = np.where(usable, forecast, np.nan)
+    r_squared = np.where(usable, np.clip(r_squared, 0.0, 1.0), np.nan)
+
+    def _frame(values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=frame.index, columns=frame.columns)
+
+    return {
+        'slope': _frame(slope),
+        'intercept': _frame(intercept),
+        'r_squared': _frame(r_squared),
+        'forecast': _frame(forecast),
+        'n_obs': _frame(n)
+    }
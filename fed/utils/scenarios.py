@@ -0,0 +1,171 @@
+"""
+Scenario Utilities
+Shock paths on input series evaluated for many scenarios at once as
+(scenario x date) arrays.
+
+A scenario is a dict:
+    {
+        'name': 'tga_rebuild_rrp_drain',
+        'description': 'TGA +$300B over 6 weeks, RRP drains to zero',
+        'shocks': [
+            # Cumulative change reached after `days` rows (linear ramp)
+            {'series': 'TGA_Balance', 'change': 300000, 'days': 42},
+            # Level reached after `days` rows
+            {'series': 'RRP_Balance', 'target': 0, 'days': 42},
+            # Optional: 'start' (rows before the shock begins, default 0)
+            # and 'shape' ('linear' or 'step')
+        ],
+    }
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def shock_profile(horizon: int, days: int, start: int = 0, shape: str = 'linear') -> np.ndarray:
+    """
+    Share of a shock applied on each future row (0 -> 1).
+
+    Args:
+        horizon: Number of future rows
+        days: Rows over which the shock builds up
+        start: Rows before the shock begins
+        shape: 'linear' (ramp) or 'step' (full shock from `start`)
+
+    Returns:
+        Array of length horizon
+    """
+    steps = np.arange(1, horizon + 1) - start
+    if shape == 'step':
+        return (steps > 0).astype(float)
+    if shape != 'linear':
+        raise ValueError(f"Unknown shock shape '{shape}'")
+    return np.clip(steps / max(days, 1), 0.0, 1.0)
+
+
+def scenario_paths(
+    history: pd.DataFrame,
+    scenarios: Sequence[Dict],
+    horizon: int,
+    freq: str = 'D'
+) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray]]:
+    """
+    Build (scenario x date) paths: history followed by `horizon` future rows.
+
+    Future rows start from the last valid value of each series (held flat
+    in the baseline) and add the scenario shocks. History rows are shared
+    by all scenarios.
+
+    Args:
+        history: Input series indexed by date
+        scenarios: Scenario dicts (see module docstring)
+        horizon: Number of future rows
+        freq: Frequency of the future dates
+
+    Returns:
+        Tuple of (dates, column -> array of shape (scenarios, dates))
+    """
+    future = pd.date_range(history.index[-1], periods=horizon + 1, freq=freq)[1:]
+    dates = history.index.append(future)
+    n_scen = len(scenarios)
+
+    paths = {}
+    for col in history.columns:
+        values = history[col].to_numpy(dtype=float, na_value=np.nan)
+        valid = np.flatnonzero(np.isfinite(values))
+        last = values[valid[-1]] if len(valid) else np.nan
+        path = np.empty((n_scen, len(dates)))
+        path[:, :len(values)] = values
+        path[:, len(values):] = last
+        paths[col] = path
+
+    for s, scenario in enumerate(scenarios):
+        for shock in scenario.get('shocks', []):
+            col = shock['series']
+            if col not in paths:
+                raise ValueError(f"Scenario '{scenario['name']}' shocks unknown series '{col}'")
+            profile = shock_profile(horizon, shock.get('days', horizon), shock.get('start', 0),
+                                    shock.get('shape', 'linear'))
+            base = paths[col][s, len(history):]
+            if 'target' in shock:
+                paths[col][s, len(history):] = base + (shock['target'] - base) * profile
+            else:
+                paths[col][s, len(history):] = base + shock['change'] * profile
+
+    return dates, paths
+
+
+def _rolling_sums(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Windowed count, sum and sum of squares along the last axis (NaN skipped)."""
+    valid = np.isfinite(values)
+    filled = np.where(valid, values, 0.0)
+    pad = np.zeros(values.shape[:-1] + (1,))
+    sums = []
+    for x in (valid.astype(float), filled, filled ** 2):
+        c = np.concatenate([pad, np.cumsum(x, axis=-1)], axis=-1)
+        lagged = np.concatenate([np.repeat(pad, window, axis=-1), c], axis=-1)[..., :c.shape[-1]]
+        sums.append((c - lagged)[..., 1:])
+    return tuple(sums)
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """Rolling mean along the last axis, like pandas rolling().mean()."""
+    count, total, _ = _rolling_sums(values, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= min_periods, total / count, np.nan)
+
+
+def rolling_std(values: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """Rolling sample std along the last axis, like pandas rolling().std()."""
+    pad = np.full(values.shape[:-1] + (window - 1,), np.nan)
+    windows = sliding_window_view(np.concatenate([pad, values], axis=-1), window, axis=-1)
+    count = np.isfinite(windows).sum(axis=-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        std = np.nanstd(windows, axis=-1, ddof=1)
+    return np.where(count >= max(min_periods, 2), std, np.nan)
+
+
+def diff(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Difference along the last axis, like pandas diff()."""
+    result = np.full(values.shape, np.nan)
+    result[..., periods:] = values[..., periods:] - values[..., :-periods]
+    return result
+
+
+def tidy(
+    arrays: Dict[str, np.ndarray],
+    scenario_names: Sequence[str],
+    dates: pd.DatetimeIndex,
+    start: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Long table of (scenario x date) arrays.
+
+    Args:
+        arrays: Metric -> array of shape (scenarios, dates)
+        scenario_names: Scenario names (rows of the arrays)
+        dates: Dates (columns of the arrays)
+        start: First date position kept (None = all)
+
+    Returns:
+        DataFrame with columns scenario, date, metric, value
+    """
+    start = start or 0
+    names = np.asarray(scenario_names, dtype=object)
+    kept = dates[start:]
+    pieces = []
+    for metric, values in arrays.items():
+        values = np.asarray(values, dtype=float)[:, start:]
+        pieces.append(pd.DataFrame({
+            'scenario': np.repeat(names, len(kept)),
+            'date': np.tile(kept.to_numpy(), len(names)),
+            'metric': metric,
+            'value': values.ravel(),
+        }))
+    if not pieces:
+        return pd.DataFrame(columns=['scenario', 'date', 'metric', 'value'])
+    return pd.concat(pieces, ignore_index=True)
@@ -0,0 +1,99 @@
+"""
+Walk-Forward Utilities
+Fan out as-of dates across a process pool that shares read-only input
+arrays through shared memory.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[List[shared_memory.SharedMemory], Dict[str, Tuple]]:
+    """
+    Copy arrays into shared memory blocks.
+
+    Args:
+        arrays: Name -> array
+
+    Returns:
+        Tuple of (blocks to release, name -> (block name, shape, dtype))
+    """
+    blocks = []
+    handles = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        handles[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, handles
+
+
+def _run_chunk(args: Tuple) -> np.ndarray:
+    """Worker entry point: attach the shared arrays and run the kernel."""
+    kernel, handles, positions, params = args
+    blocks = []
+    arrays = {}
+    try:
+        for name, (block_name, shape, dtype) in handles.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        return kernel(arrays, positions, params)
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def run_walk_forward(
+    kernel: Callable[[Dict[str, np.ndarray], np.ndarray, Dict[str, Any]], np.ndarray],
+    arrays: Dict[str, np.ndarray],
+    positions: np.ndarray,
+    params: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> np.ndarray:
+    """
+    Evaluate `kernel` for every as-of position, in chunks across processes.
+
+    The kernel must be a module-level function taking
+    (arrays, positions, params) and returning one result row per position.
+    Arrays are placed in shared memory once and attached read-only by each
+    worker, so only positions and results cross process boundaries.
+
+    Args:
+        kernel: Function computing results for a chunk of positions
+        arrays: Read-only input arrays shared with the workers
+        positions: Row positions of the as-of dates
+        params: Small picklable parameters passed to the kernel
+        max_workers: Process count (defaults to min(4, CPU count); 1 = inline)
+        chunk_size: Positions per task (defaults to an even split per worker)
+
+    Returns:
+        Results of all chunks stacked in position order
+    """
+    params = params or {}
+    positions = np.asarray(positions)
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+
+    if max_workers <= 1 or len(positions) < 2:
+        return kernel(arrays, positions, params)
+
+    if chunk_size is None:
+        chunk_size = max(1, int(np.ceil(len(positions) / (max_workers * 4))))
+    chunks = [positions[i:i + chunk_size] for i in range(0, len(positions), chunk_size)]
+
+    blocks, handles = _share_arrays(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_run_chunk, [(kernel, handles, chunk, params) for chunk in chunks]))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return np.concatenate(results, axis=0)
@@ -14,9 +14,9 @@ import matplotlib.pyplot as plt
 # Constants
 API_BASE_URL = "https://api.fiscaldata.treasury.gov/services/api/fiscal_service"
 
-# Add project root to path for utils import
+# Add project root to path for storage import
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils.db_manager import TimeSeriesDB
+from storage import open_snapshot, open_writer, period_value, read_rollup, to_arrow_table
 
 # Endpoints
 DTS_WITHDRAWALS_ENDPOINT = "/v1/accounting/dts/deposits_withdrawals_operating_cash"
@@ -45,6 +45,15 @@ FISCAL_CALENDAR = {
     'quarterly_tax_months': [1, 4, 6, 9],  # Jan, Apr, Jun, Sep
 }
 
+# Monte Carlo TGA simulation (see simulate_tga_paths)
+TGA_SIMULATION = {
+    'days_forward': 40,                          # Business days simulated (30-60)
+    'n_paths': 5000,
+    'quantiles': [0.05, 0.25, 0.50, 0.75, 0.95],  # Fan chart bands
+    'min_samples': 10,                           # Historical days required per calendar bucket
+    'lookback_days': 756,                        # ~3 years of DTS days
+}
+
 # =============================================================================
 # DTS CATEGORY MAPPING - DETAILED SEGMENTATION
 # =============================================================================
@@ -584,6 +593,46 @@ def calculate_qtd_metrics(df):
     return df[['Fiscal_Quarter', 'QTD_Spending', 'QTD_Taxes', 'QTD_Net_Injection']]
 
 
+def load_period_metrics(db_path="database/treasury_data.duckdb", asof=None):
+    """
+    Week-, quarter- and fiscal-year-to-date sums read from the stored
+    rollups of 'fiscal_daily_metrics' (fiscal week Wed-Tue, FY from Oct 1)
+    instead of re-aggregating the daily history.
+    The sums are to-date values when `asof` is the latest stored date
+    (the periods containing an earlier date are complete periods).
+    Returns: dict with '<period>_start', '<period>_end' (last stored date)
+    and '<period>_spending' / '_taxes' / '_impulse' per period in wtd,
+    mtd, qtd, fytd; empty dict if no rollup is stored.
+    """
+    try:
+        db = open_snapshot(db_path)
+    except Exception as e:
+        print(f"⚠️ Could not open {db_path}: {e}")
+        return {}
+    try:
+        rows = {
+            prefix: read_rollup(db, 'fiscal_daily_metrics', period, asof=asof)
+            for prefix, period in (('wtd', 'week'), ('mtd', 'month'), ('qtd', 'quarter'), ('fytd', 'fiscal_year'))
+        }
+    except Exception as e:
+        print(f"⚠️ Could not read fiscal rollups: {e}")
+        return {}
+    finally:
+        db.close()
+
+    metrics = {}
+    for prefix, rollup in rows.items():
+        if rollup.empty:
+            continue
+        row = rollup.iloc[-1]
+        metrics[f'{prefix}_start'] = rollup.index[-1].strftime('%Y-%m-%d')
+        metrics[f'{prefix}_end'] = row['period_end'].strftime('%Y-%m-%d')
+        metrics[f'{prefix}_spending'] = period_value(row, 'Total_Spending_sum')
+        metrics[f'{prefix}_taxes'] = period_value(row, 'Total_Taxes_sum')
+        metrics[f'{prefix}_impulse'] = period_value(row, 'Net_Impulse_sum')
+    return metrics
+
+
 def calculate_3month_moving_sum(df):
     """
     Calculate 3-month (63 business days) moving sum of fiscal impulse.
@@ -655,6 +704,96 @@ def calculate_tga_forecast(df, days_forward=5):
     return forecast
 
 
+def get_calendar_features(dates):
+    """
+    Fiscal calendar features used to condition simulated TGA flows.
+    Day-of-month is bucketed by week (0-3), day-of-FY by fiscal month (1-12).
+    """
+    dates = pd.DatetimeIndex(dates)
+    return pd.DataFrame({
+        'Is_Tax_Deadline': [is_tax_deadline(d) for d in dates],
+        'Is_SS_Payment_Day': [is_ss_payment_day(d) for d in dates],
+        'Is_Medicare_Day': [is_medicare_day(d) for d in dates],
+        'DOM_Bucket': np.minimum((dates.day - 1) // 7, 3),
+        'FY_Month': (dates.month - 10) % 12 + 1,
+    }, index=dates)
+
+
+def simulate_tga_paths(df, days_forward=None, n_paths=None, quantiles=None, seed=None, return_paths=False):
+    """
+    Monte Carlo TGA paths over the next business days.
+
+    Each simulated day draws a historical daily TGA change from days with
+    the same fiscal calendar state: tax deadline, SS payment day, Medicare
+    day, week of month and fiscal month. Buckets with fewer than
+    TGA_SIMULATION['min_samples'] days fall back to coarser states
+    (dropping fiscal month, then week of month, then all flags).
+
+    Returns a fan chart DataFrame indexed by future business day with one
+    column per quantile (P5, P25, ...), 'Mean' and 'Samples' (size of the
+    historical pool used). With return_paths=True also returns the
+    simulated paths (n_paths x days_forward array).
+    """
+    from pandas.tseries.holiday import USFederalHolidayCalendar
+    from pandas.tseries.offsets import CustomBusinessDay
+
+    days_forward = days_forward or TGA_SIMULATION['days_forward']
+    n_paths = n_paths or TGA_SIMULATION['n_paths']
+    quantiles = quantiles or TGA_SIMULATION['quantiles']
+
+    # Daily TGA changes on days with a reported balance
+    tga = df['TGA_Balance'].where(df['TGA_Balance'] > 0).dropna()
+    tga = tga.tail(TGA_SIMULATION['lookback_days'] + 1)
+    flows = tga.diff().dropna()
+    if len(flows) < TGA_SIMULATION['min_samples']:
+        return (pd.DataFrame(), None) if return_paths else pd.DataFrame()
+
+    history = get_calendar_features(flows.index)
+    future_dates = pd.date_range(
+        tga.index[-1], periods=days_forward + 1,
+        freq=CustomBusinessDay(calendar=USFederalHolidayCalendar())
+    )[1:]
+    future = get_calendar_features(future_dates)
+
+    # Conditioning levels, finest first
+    levels = [
+        ['Is_Tax_Deadline', 'Is_SS_Payment_Day', 'Is_Medicare_Day', 'DOM_Bucket', 'FY_Month'],
+        ['Is_Tax_Deadline', 'Is_SS_Payment_Day', 'Is_Medicare_Day', 'DOM_Bucket'],
+        ['Is_Tax_Deadline', 'Is_SS_Payment_Day', 'Is_Medicare_Day'],
+        [],
+    ]
+    hist_values = history.to_numpy()
+    pools = []
+    for _, day in future.iterrows():
+        for level in levels:
+            cols = [history.columns.get_loc(c) for c in level]
+            match = (hist_values[:, cols] == day[level].to_numpy()).all(axis=1)
+            if match.sum() >= TGA_SIMULATION['min_samples'] or not level:
+                pools.append(np.flatnonzero(match))
+                break
+
+    # Vectorized draws: one flat pool array with per-day offsets
+    sizes = np.array([len(pool) for pool in pools])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    flat = np.concatenate(pools)
+    rng = np.random.default_rng(seed)
+    draws = (rng.random((n_paths, days_forward)) * sizes).astype(int) + offsets
+    paths = tga.iloc[-1] + np.cumsum(flows.to_numpy()[flat[draws]], axis=1)
+
+    fan = pd.DataFrame(
+        np.quantile(paths, quantiles, axis=0).T,
+        index=future_dates,
+        columns=[f"P{q * 100:g}" for q in quantiles]
+    )
+    fan['Mean'] = paths.mean(axis=0)
+    fan['Samples'] = sizes
+    fan.index.name = 'record_date'
+
+    if return_paths:
+        return fan, paths
+    return fan
+
+
 def calculate_implied_liquidity_effect(df):
     """
     Calculate implied liquidity effect for next week.
@@ -1365,6 +1504,22 @@ def generate_report(df, weekly_df, gdp_info):
     print(f"\n  6-Week Forward Impulse:  ${latest['Forward_6W_Impulse_Est']:>15,.0f} M" if pd.notna(latest['Forward_6W_Impulse_Est']) else "\n  6-Week Forward Impulse:  N/A (insufficient history)")
     print(f"  TGA 5-Day Forecast:      ${latest['TGA_5D_Forecast']:>15,.0f} M" if pd.notna(latest['TGA_5D_Forecast']) else "  TGA 5-Day Forecast:      N/A")
     print(f"  Implied Weekly Liquidity: ${latest['Implied_Weekly_Liquidity']:>15,.0f} M" if pd.notna(latest['Implied_Weekly_Liquidity']) else "  Implied Weekly Liquidity: N/A")
+
+    # Monte Carlo TGA fan chart (fiscal calendar conditioned)
+    tga_fan = simulate_tga_paths(df)
+    if not tga_fan.empty:
+        bands = [c for c in tga_fan.columns if c.startswith('P')]
+        low, mid, high = bands[0], bands[len(bands) // 2], bands[-1]
+        print(f"\n  TGA Path Simulation ({TGA_SIMULATION['n_paths']:,} paths, calendar-conditioned):")
+        print(f"    {'Horizon':<10} {'Date':<12} {low:>12} {mid:>12} {high:>12}")
+        for h in sorted({5, 10, 20, len(tga_fan)}):
+            if h > len(tga_fan):
+                continue
+            row = tga_fan.iloc[h - 1]
+            print(f"    {f'+{h}d':<10} {row.name.strftime('%Y-%m-%d'):<12} "
+                  f"{row[low]:>12,.0f} {row[mid]:>12,.0f} {row[high]:>12,.0f}")
+    else:
+        print("\n  TGA Path Simulation:     N/A (insufficient history)")
     
     # ==========================================================================
     # SECTION 9: RECENT TREND TABLE
@@ -1392,40 +1547,31 @@ def generate_report(df, weekly_df, gdp_info):
     # --- DATABASE STORAGE ---
     print("\n💾 Saving to DuckDB...")
     try:
-        db = TimeSeriesDB("database/treasury_data.duckdb")
-        
-        # Save Daily Data
-        # Ensure index is a column for storage
-        df_save = df.reset_index()
+        db = open_writer("database/treasury_data.duckdb")
         
-        # Convert Period objects to string for DuckDB compatibility
-        for col in df_save.columns:
-            if isinstance(df_save[col].dtype, pd.PeriodDtype):
-                df_save[col] = df_save[col].astype(str)
-                
-        db.upsert_data(df_save, "fiscal_daily_metrics", key_col="record_date")
+        # Daily, weekly and fan chart tables are written in one transaction
+        with db.transaction():
+            # Save Daily Data (one Arrow conversion; date index stored as record_date)
+            df_save = to_arrow_table(df, index_col="record_date")
+            db.upsert_data(df_save, "fiscal_daily_metrics", key_col="record_date")
+            db.write_series(df_save, "fiscal_daily_metrics")
         
-        # Save Weekly Data
-        if not weekly_df.empty:
-            weekly_save = weekly_df.reset_index()
-            
-            # Handle index renaming
-            if 'Week_ID' in weekly_save.columns:
-                weekly_save = weekly_save.rename(columns={'Week_ID': 'week_start_date'})
-            elif 'index' in weekly_save.columns:
-                weekly_save = weekly_save.rename(columns={'index': 'week_start_date'})
-                
-            # Ensure we have a string week_id
-            if 'week_start_date' in weekly_save.columns:
-                weekly_save['week_id'] = weekly_save['week_start_date'].astype(str)
-            
-            # Convert Period objects to string for DuckDB compatibility
-            for col in weekly_save.columns:
-                if isinstance(weekly_save[col].dtype, pd.PeriodDtype):
-                    weekly_save[col] = weekly_save[col].astype(str)
-            
-            db.upsert_data(weekly_save, "fiscal_weekly_metrics", key_col="week_start_date")
+            # Save Weekly Data
+            if not weekly_df.empty:
+                # Week start index stored as week_start_date, plus a string week_id
+                weekly_save = to_arrow_table(
+                    weekly_df.assign(week_id=weekly_df.index.strftime('%Y-%m-%d')), index_col="week_start_date"
+                )
+                db.upsert_data(weekly_save, "fiscal_weekly_metrics", key_col="week_start_date")
+                db.write_series(weekly_save, "fiscal_weekly_metrics", date_col="week_start_date")
             
+            # Save TGA fan chart (one set of quantiles per as-of date)
+            if not tga_fan.empty:
+                fan_save = tga_fan.reset_index()
+                fan_save.insert(0, 'as_of_date', latest.name)
+                db.upsert_data(fan_save, "fiscal_tga_fan_chart", key_col="as_of_date",
+                               primary_key=["as_of_date", "record_date"])
+
         print("✅ Data successfully saved to database/treasury_data.duckdb")
         db.close()
     except Exception as e:
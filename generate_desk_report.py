@@ -25,13 +25,15 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'fed'))
 from fiscal.fiscal_analysis import (
     fetch_dts_data,
     fetch_current_gdp,
-    process_fiscal_analysis
+    process_fiscal_analysis,
+    load_period_metrics as load_fiscal_period_metrics
 )
 from fed.fed_liquidity import (
     fetch_all_data as fetch_fed_data,
     calculate_metrics as calculate_fed_metrics,
     calculate_mtd_metrics,
     calculate_qtd_metrics,
+    load_period_metrics,
     calculate_rolling_3m_metrics,
     detect_spread_spikes,
     calculate_stress_index,
@@ -39,10 +41,14 @@ from fed.fed_liquidity import (
     calculate_correlations,
     forecast_simple_trend
 )
+from fed.liquidity_scenarios import run_scenarios, format_summary
+from fed.liquidity_composite_index import load_data as load_lci_data, load_lci_history
 
 # Constants
 REPORT_VERSION = "1.0.0"
 FISCAL_IMPULSE_TARGET_PCT = 0.64  # Target weekly impulse as % of GDP
+LCI_REPORT_COLUMNS = ['LCI', 'LCI_MA20', 'LCI_Regime', 'Fiscal_Index', 'Monetary_Index', 'Plumbing_Index']
+LCI_REPORT_LOOKBACK_DAYS = 30  # Stored LCI history read for section 6.3
 
 
 def load_all_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, Dict]:
@@ -310,6 +316,18 @@ def extract_key_metrics(
             'vs_3y_baseline': (fiscal_last.get('MA20_Net_Impulse', 0) - fiscal_last.get('3Y_Avg_Net_Impulse', 0)),
         }
 
+        # Week/month/FY to date: stored fiscal rollups when they cover the
+        # latest date, otherwise aggregated from the loaded history
+        periods = load_fiscal_period_metrics(asof=fiscal_date)
+        if periods.get('fytd_end') == fiscal_date.strftime('%Y-%m-%d'):
+            metrics['fiscal']['wtd_impulse'] = periods['wtd_impulse']
+            metrics['fiscal']['mtd_impulse'] = periods['mtd_impulse']
+            metrics['fiscal']['fytd_impulse'] = periods['fytd_impulse']
+        elif 'Net_Impulse' in fiscal_df.columns:
+            # Fiscal week runs Wednesday to Tuesday
+            week_start = fiscal_date.normalize() - pd.Timedelta(days=(fiscal_date.weekday() - 2) % 7)
+            metrics['fiscal']['wtd_impulse'] = fiscal_df.loc[week_start:fiscal_date, 'Net_Impulse'].sum()
+
     if not fed_df.empty:
         # Use last valid values for key metrics (handles missing data for latest date)
         def get_last_valid(col_name):
@@ -324,9 +342,12 @@ def extract_key_metrics(
         fed_last = fed_df.iloc[-1]  # For columns that are complete
         fed_date = fed_df.index[-1]
 
-        # Calculate temporal metrics
-        mtd_metrics = calculate_mtd_metrics(fed_df)
-        qtd_metrics = calculate_qtd_metrics(fed_df)
+        # Temporal metrics: stored month/quarter rollups when they cover the
+        # latest date, otherwise aggregated from the loaded history
+        mtd_metrics, qtd_metrics = load_period_metrics(asof=fed_date)
+        if mtd_metrics.get('month_end') != fed_date.strftime('%Y-%m-%d'):
+            mtd_metrics = calculate_mtd_metrics(fed_df)
+            qtd_metrics = calculate_qtd_metrics(fed_df)
         rolling_3m = calculate_rolling_3m_metrics(fed_df)
 
         # Spike analysis
@@ -430,7 +451,7 @@ def build_final_report(
     metadata: Dict
 ) -> str:
     """
-    Build the final 8-section desk report from extracted metrics.
+    Build the final desk report from extracted metrics.
 
     Args:
         metrics: Dict with all extracted metrics
@@ -568,6 +589,8 @@ def build_final_report(
                            f"{fiscal.get('impulse_pct_gdp', 0) - FISCAL_IMPULSE_TARGET_PCT:+.2f}%")
         report_lines.append(f"MA20 Daily Impulse        ${fiscal.get('ma20_impulse', 0):,.0f}M      —             —")
         report_lines.append(f"Daily Impulse (latest)    ${fiscal.get('total_impulse', 0):,.0f}M      —             —")
+        if 'wtd_impulse' in fiscal:
+            report_lines.append(f"Fiscal Week to Date       ${fiscal['wtd_impulse']:,.0f}M      —             —")
         report_lines.append("")
 
         # Interpretation
@@ -867,6 +890,23 @@ def build_final_report(
             report_lines.append(f"Net Liq vs SOFR Spread:   {corr['net_liq_vs_spread']:+.2f} (stress indicator)")
         report_lines.append("")
 
+    lci_recent = metrics.get('lci')
+    if lci_recent is not None and 'LCI' in lci_recent.columns and lci_recent['LCI'].notna().any():
+        recent = lci_recent.dropna(subset=['LCI'])
+        latest = recent.iloc[-1]
+
+        report_lines.append(f"6.3 Liquidity Composite Index (as of {recent.index[-1]:%Y-%m-%d})")
+        report_lines.append("")
+        for label, col in [("LCI", 'LCI'), ("LCI MA20", 'LCI_MA20'), ("Fiscal Pillar", 'Fiscal_Index'),
+                           ("Monetary Pillar", 'Monetary_Index'), ("Plumbing Pillar", 'Plumbing_Index')]:
+            if col in recent.columns and pd.notna(latest[col]):
+                report_lines.append(f"{label + ':':<26}{latest[col]:+.2f}")
+        if len(recent) > 5:
+            report_lines.append(f"{'5-Day Change:':<26}{latest['LCI'] - recent['LCI'].iloc[-6]:+.2f}")
+        if 'LCI_Regime' in recent.columns and pd.notna(latest['LCI_Regime']):
+            report_lines.append(f"{'Regime:':<26}{latest['LCI_Regime']}")
+        report_lines.append("")
+
     # ================================================================
     # SECTION 7: RISK ASSESSMENT & OUTLOOK
     # ================================================================
@@ -1000,6 +1040,31 @@ def build_final_report(
         report_lines.append(f"• GDP Impact: Fiscal impulse at {impulse_pct:.2f}% GDP annualized")
     report_lines.append("")
 
+    # ================================================================
+    # SECTION 9: SCENARIO ANALYSIS
+    # ================================================================
+    if 'scenarios' in metrics:
+        summary = metrics['scenarios']['summary']
+        horizon = metrics['scenarios']['paths']['date'].nunique()
+        report_lines.append("━" * 70)
+        report_lines.append("SECTION 9: SCENARIO ANALYSIS")
+        report_lines.append("━" * 70)
+        report_lines.append("")
+        report_lines.append(f"End-of-horizon impact vs baseline ({horizon} days):")
+        report_lines.append("")
+        table = format_summary(summary)
+        report_lines.append(f"{'Scenario':<24} {'Net Liq ($B)':>13} {'Stress':>8} {'LCI':>7}  LCI Regime")
+        for name, row in table.iterrows():
+            net_liq = row.get('Net_Liquidity', np.nan) / 1000
+            stress = row.get('Stress_Index', np.nan)
+            lci_change = row.get('LCI', np.nan)
+            regime = row.get('LCI_Regime') or 'N/A'
+            report_lines.append(f"{name:<24} {net_liq:>+13.1f} {stress:>+8.1f} {lci_change:>+7.2f}  {regime}")
+        report_lines.append("")
+        for _, row in summary.drop_duplicates('scenario').iterrows():
+            report_lines.append(f"• {row['scenario']}: {row['description']}")
+        report_lines.append("")
+
     # ================================================================
     # FOOTER
     # ================================================================
@@ -1026,6 +1091,20 @@ def main():
         # Step 3: Extract key metrics
         metrics = extract_key_metrics(fiscal_df, fed_df, flows_df)
 
+        # Step 3b: Scenario analysis (shocked TGA/RRP/assets/spread paths)
+        if not fed_df.empty:
+            try:
+                lci_data = {**load_lci_data(), 'fed': fed_df}
+                if not fiscal_df.empty:
+                    lci_data['fiscal'] = fiscal_df
+                metrics['scenarios'] = run_scenarios(fed_df, lci_data)
+            except Exception as e:
+                print(f"⚠️  Scenario analysis failed: {e}")
+
+        # Step 3c: Stored LCI (recent slice read from DuckDB)
+        lci_start = pd.Timestamp(metadata['report_date']) - timedelta(days=LCI_REPORT_LOOKBACK_DAYS)
+        metrics['lci'] = load_lci_history(columns=LCI_REPORT_COLUMNS, start=lci_start)
+
         # Step 4: Build final report
         report = build_final_report(metrics, metadata)
 
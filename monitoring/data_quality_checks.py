@@ -13,12 +13,16 @@ Run: python monitoring/data_quality_checks.py
 Output: JSON report + console alerts
 """
 
-import duckdb
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import open_snapshot, read_rollup
 
 # Thresholds
 THRESHOLDS = {
@@ -33,7 +37,9 @@ THRESHOLDS = {
 class DataQualityMonitor:
     def __init__(self, db_path='database/treasury_data.duckdb'):
         self.db_path = db_path
-        self.conn = duckdb.connect(db_path, read_only=True)
+        # Last published snapshot (does not wait for a running writer)
+        self.db = open_snapshot(db_path)
+        self.conn = self.db.conn
         self.issues = []
         self.warnings = []
         self.info = []
@@ -44,7 +50,7 @@ class DataQualityMonitor:
         print("DATA QUALITY MONITORING - Treasury API Interface")
         print("="*80)
         print(f"\nTimestamp: {datetime.now().isoformat()}")
-        print(f"Database: {self.db_path}\n")
+        print(f"Database: {self.db.db_path}\n")
 
         # Run checks
         self.check_fiscal_coverage()
@@ -113,22 +119,14 @@ class DataQualityMonitor:
         print("\n[2] Fed Liquidity Coverage Check...")
 
         # Check last 30 days
-        query = """
-        SELECT
-            COUNT(*) as total_days,
-            SUM(CASE WHEN Net_Liquidity IS NULL THEN 1 ELSE 0 END) as null_days,
-            SUM(CASE WHEN Net_Liq_Imputed = TRUE THEN 1 ELSE 0 END) as imputed_days
-        FROM (
-            SELECT * FROM fed_liquidity_daily
-            WHERE record_date >= CURRENT_DATE - INTERVAL '30 days'
-            ORDER BY record_date DESC
+        recent = self.db.read(
+            'fed_liquidity_daily', ['Net_Liquidity', 'Net_Liq_Imputed'],
+            start=datetime.now().date() - timedelta(days=30)
         )
-        """
-        result = self.conn.execute(query).fetchdf()
 
-        total = result.iloc[0]['total_days']
-        null_days = result.iloc[0]['null_days']
-        imputed = result.iloc[0]['imputed_days']
+        total = len(recent)
+        null_days = int(recent['Net_Liquidity'].isna().sum())
+        imputed = int(recent['Net_Liq_Imputed'].fillna(False).sum())
 
         null_pct = (null_days / total * 100) if total > 0 else 0
         imputed_pct = (imputed / total * 100) if total > 0 else 0
@@ -201,19 +199,18 @@ class DataQualityMonitor:
         """Monitor imputation rate trends"""
         print("\n[4] Imputation Rate Trend Check...")
 
-        query = """
-        SELECT
-            DATE_TRUNC('week', record_date) as week,
-            COUNT(*) as total_days,
-            SUM(CASE WHEN RRP_Imputed = TRUE THEN 1 ELSE 0 END) as imputed_days,
-            SUM(CASE WHEN RRP_Imputed = TRUE THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as imputed_pct
-        FROM fed_liquidity_daily
-        WHERE record_date >= CURRENT_DATE - INTERVAL '8 weeks'
-        GROUP BY week
-        ORDER BY week DESC
-        LIMIT 4
-        """
-        result = self.conn.execute(query).fetchdf()
+        # Pre-aggregated fiscal weeks (Wed-Tue) of fed_liquidity_daily
+        weeks = read_rollup(
+            self.db, 'fed_liquidity_daily', 'week', ['days', 'RRP_Imputed_true'],
+            start=datetime.now().date() - timedelta(weeks=8)
+        ).tail(4).iloc[::-1]
+        if weeks.empty:
+            print("    ⚠️ No weekly rollup of fed_liquidity_daily in the last 8 weeks")
+            return
+        result = pd.DataFrame({
+            'week': weeks.index,
+            'imputed_pct': (weeks['RRP_Imputed_true'].fillna(0) * 100.0 / weeks['days']).to_numpy(),
+        })
 
         print(f"    Last 4 weeks imputation rates:")
         for idx, row in result.iterrows():
@@ -268,26 +265,18 @@ class DataQualityMonitor:
         """Verify key calculations are accurate"""
         print("\n[6] Calculation Accuracy Check...")
 
+        start = datetime.now().date() - timedelta(days=7)
+
         # Test Net Liquidity formula
-        query = """
-        SELECT
-            record_date,
-            Fed_Total_Assets,
-            RRP_Balance_M,
-            TGA_Balance,
-            Net_Liquidity,
-            (Fed_Total_Assets - RRP_Balance_M - TGA_Balance) as calc_net_liq,
-            ABS(Net_Liquidity - (Fed_Total_Assets - RRP_Balance_M - TGA_Balance)) as diff
-        FROM fed_liquidity_daily
-        WHERE Net_Liquidity IS NOT NULL
-          AND RRP_Balance_M IS NOT NULL
-          AND record_date >= CURRENT_DATE - INTERVAL '7 days'
-        ORDER BY diff DESC
-        LIMIT 5
-        """
-        result = self.conn.execute(query).fetchdf()
+        fed = self.db.read(
+            'fed_liquidity_daily', ['Fed_Total_Assets', 'RRP_Balance_M', 'TGA_Balance', 'Net_Liquidity'],
+            start=start
+        ).dropna(subset=['Net_Liquidity', 'RRP_Balance_M'])
+        fed['calc_net_liq'] = fed['Fed_Total_Assets'] - fed['RRP_Balance_M'] - fed['TGA_Balance']
+        fed['diff'] = (fed['Net_Liquidity'] - fed['calc_net_liq']).abs()
+        result = fed.sort_values('diff', ascending=False).head(5).reset_index()
 
-        max_diff = result['diff'].max() if len(result) > 0 else 0
+        max_diff = result['diff'].max() if result['diff'].notna().any() else 0
 
         print(f"    Net Liquidity verification (last 7 days):")
         print(f"    Max difference: ${max_diff:,.0f}M")
@@ -309,23 +298,16 @@ class DataQualityMonitor:
             print(f"    ✅ Net Liquidity calculation accurate (diff < $100M)")
 
         # Test Household Share calculation
-        query_hs = """
-        SELECT
-            record_date,
-            Household_Spending,
-            Total_Spending,
-            Household_Share_Pct,
-            (Household_Spending / NULLIF(Total_Spending, 0) * 100) as calc_share,
-            ABS(Household_Share_Pct - (Household_Spending / NULLIF(Total_Spending, 0) * 100)) as diff
-        FROM fiscal_daily_metrics
-        WHERE Household_Share_Pct IS NOT NULL
-          AND record_date >= CURRENT_DATE - INTERVAL '7 days'
-        ORDER BY diff DESC
-        LIMIT 5
-        """
-        result_hs = self.conn.execute(query_hs).fetchdf()
+        fiscal = self.db.read(
+            'fiscal_daily_metrics', ['Household_Spending', 'Total_Spending', 'Household_Share_Pct'],
+            start=start
+        ).dropna(subset=['Household_Share_Pct'])
+        total_spending = fiscal['Total_Spending'].where(fiscal['Total_Spending'] != 0)
+        fiscal['calc_share'] = fiscal['Household_Spending'] / total_spending * 100
+        fiscal['diff'] = (fiscal['Household_Share_Pct'] - fiscal['calc_share']).abs()
+        result_hs = fiscal.sort_values('diff', ascending=False).head(5).reset_index()
 
-        max_diff_hs = result_hs['diff'].max() if len(result_hs) > 0 else 0
+        max_diff_hs = result_hs['diff'].max() if result_hs['diff'].notna().any() else 0
 
         print(f"    Household Share verification (last 7 days):")
         print(f"    Max difference: {max_diff_hs:.4f}%")
@@ -344,8 +326,7 @@ class DataQualityMonitor:
         print("\n[7] Schema Integrity Check...")
 
         # Check fiscal table
-        fiscal_cols = self.conn.execute("DESCRIBE fiscal_daily_metrics").fetchdf()
-        fiscal_col_names = set(fiscal_cols['column_name'].str.lower())
+        fiscal_col_names = {col.lower() for col in self.db.get_columns('fiscal_daily_metrics')}
 
         required_fiscal = {'record_date', 'gdp_used', 'household_share_pct', 'net_impulse', 'ma20_net_impulse'}
         missing_fiscal = required_fiscal - fiscal_col_names
@@ -362,8 +343,7 @@ class DataQualityMonitor:
             print(f"    ✅ All required fiscal columns present")
 
         # Check fed liquidity table
-        fed_cols = self.conn.execute("DESCRIBE fed_liquidity_daily").fetchdf()
-        fed_col_names = set(fed_cols['column_name'].str.lower())
+        fed_col_names = {col.lower() for col in self.db.get_columns('fed_liquidity_daily')}
 
         required_fed = {'record_date', 'rrp_imputed', 'tga_imputed', 'net_liq_imputed', 'net_liquidity'}
         missing_fed = required_fed - fed_col_names
@@ -442,7 +422,7 @@ class DataQualityMonitor:
 
     def close(self):
         """Close database connection"""
-        self.conn.close()
+        self.db.close()
 
 def main():
     """Main entry point"""
@@ -0,0 +1,31 @@
+"""
+Storage layer of the pipeline (DuckDB database, rollups, Parquet archive
+and single-writer queue).
+
+    from storage import open_writer
+
+    db = open_writer()
+    with db.transaction():
+        db.upsert_data(daily, "fiscal_daily_metrics")
+        db.write_series(daily, "fiscal_daily_metrics")
+    db.close()
+"""
+
+from .engine import METRICS_TABLE, TimeSeriesDB, to_arrow_table
+from .rollups import period_value, read_rollup
+from .writer import DB_PATH, DirectWriter, QueuedWriter, WriteQueue, open_snapshot, open_writer, snapshot_path
+
+__all__ = [
+    "DB_PATH",
+    "DirectWriter",
+    "METRICS_TABLE",
+    "QueuedWriter",
+    "TimeSeriesDB",
+    "WriteQueue",
+    "open_snapshot",
+    "open_writer",
+    "period_value",
+    "read_rollup",
+    "snapshot_path",
+    "to_arrow_table",
+]
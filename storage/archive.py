@@ -0,0 +1,267 @@
+"""
+Partitioned Parquet archive of the tables written through TimeSeriesDB.
+
+Layout (next to the database file):
+
+    archive/<dataset>/year=YYYY/month=M/<time_ns>-<pid>-<id>.parquet
+    archive/<dataset>/_dataset.json      key column and primary key
+
+Each upsert appends the rows it added or changed as new files in the
+months they fall in; files are written to a hidden temporary name and
+renamed, so readers never see partial files. Readers see the latest
+version of each key (newest file wins). compact() merges the files of a
+month into one file, so the archive grows by a few immutable files per
+run and backups can copy new files only.
+
+Scanning the archive (no access to the live database):
+
+    con = ParquetArchive(archive_path()).connect()
+    con.sql("SELECT * FROM fed_liquidity_daily WHERE year = 2025 AND month >= 6")
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DB_PATH = "database/treasury_data.duckdb"
+ARCHIVE_DIR = "archive"  # Next to the database file
+ARCHIVE_ENABLED = os.getenv("TREASURY_ARCHIVE", "1") != "0"
+DATASET_META = "_dataset.json"
+
+
+def archive_path(db_path=DB_PATH):
+    """Archive directory of a database."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_DIR)
+
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _file_name():
+    """Archive file name; names sort in write order."""
+    return f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_atomic(table, path):
+    """Write a Parquet file under a hidden temporary name, then rename it."""
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+class ParquetArchive:
+    """
+    Hive-partitioned (year, month) Parquet datasets under one root directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def datasets(self):
+        """Names of the archived datasets."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, DATASET_META))
+        )
+
+    def metadata(self, dataset):
+        """Key column and primary key of a dataset."""
+        with open(os.path.join(self.root, dataset, DATASET_META)) as f:
+            return json.load(f)
+
+    def files(self, dataset):
+        """Parquet files of a dataset grouped by partition directory."""
+        partitions = {}
+        base = os.path.join(self.root, dataset)
+        if not os.path.isdir(base):
+            return partitions
+        for directory, _, names in os.walk(base):
+            parquet = sorted(name for name in names if name.endswith('.parquet') and not name.startswith('.'))
+            if parquet:
+                partitions[directory] = [os.path.join(directory, name) for name in parquet]
+        return dict(sorted(partitions.items()))
+
+    def write(self, dataset, table, key_col='record_date', primary_key=None):
+        """
+        Append rows to a dataset, one new file per (year, month) of key_col.
+
+        Args:
+            dataset: Dataset name (usually the table name)
+            table: pyarrow.Table with a timestamp key column
+            key_col: Date column used for the partitions
+            primary_key: Columns identifying a row (defaults to key_col)
+
+        Returns:
+            List of written files
+        """
+        if table.num_rows == 0:
+            return []
+        base = os.path.join(self.root, dataset)
+        os.makedirs(base, exist_ok=True)
+        meta = {'key_col': key_col, 'primary_key': list(primary_key or [key_col])}
+        meta_path = os.path.join(base, DATASET_META)
+        if not os.path.exists(meta_path) or self.metadata(dataset) != meta:
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+
+        dates = table[key_col]
+        if not pa.types.is_timestamp(dates.type):
+            dates = pc.cast(dates, pa.timestamp('us'))
+        years, months = pc.year(dates), pc.month(dates)
+        written = []
+        partitions = pa.table({'year': years, 'month': months}).group_by(['year', 'month']).aggregate([])
+        for year, month in zip(partitions['year'].to_pylist(), partitions['month'].to_pylist()):
+            mask = pc.and_(pc.equal(years, year), pc.equal(months, month))
+            directory = os.path.join(base, f"year={year}", f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, _file_name())
+            _write_atomic(table.filter(mask), path)
+            written.append(path)
+        return written
+
+    def _keys_sql(self, dataset):
+        return ", ".join(f'"{col}"' for col in self.metadata(dataset)['primary_key'])
+
+    def _scan_sql(self, dataset, files=None):
+        """Latest version of every row of a dataset (or of the given files)."""
+        keys = self._keys_sql(dataset)
+        if files is None:
+            source = _sql_string(os.path.join(self.root, dataset, "*", "*", "*.parquet"))
+        else:
+            source = "[" + ", ".join(_sql_string(path) for path in files) + "]"
+        return f"""
+        SELECT * EXCLUDE (filename)
+        FROM read_parquet({source}, hive_partitioning = true, union_by_name = true, filename = true)
+        QUALIFY row_number() OVER (PARTITION BY year, month, {keys} ORDER BY filename DESC) = 1
+        """
+
+    def create_views(self, conn, datasets=None):
+        """
+        Create one read_parquet view per dataset on a DuckDB connection.
+
+        Views expose the year/month partition columns; filters on them (and
+        on the primary key) are pushed down to the Parquet scan.
+
+        Returns:
+            List of created views
+        """
+        created = []
+        for dataset in datasets or self.datasets():
+            if not self.files(dataset):
+                continue
+            conn.execute(f"CREATE OR REPLACE VIEW {dataset} AS {self._scan_sql(dataset)}")
+            created.append(dataset)
+        return created
+
+    def connect(self):
+        """In-memory DuckDB connection with views over every dataset."""
+        conn = duckdb.connect()
+        self.create_views(conn)
+        return conn
+
+    def compact(self, dataset=None, min_files=2):
+        """
+        Merge the files of each month into one file (latest row per key).
+
+        The merged file is named after the newest file it replaces, so files
+        written meanwhile still take precedence; the merged files are removed
+        once it is in place.
+
+        Args:
+            dataset: Dataset to compact (None = all)
+            min_files: Only months with at least this many files
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        conn = duckdb.connect()
+        try:
+            for name in [dataset] if dataset else self.datasets():
+                for directory, paths in self.files(name).items():
+                    if len(paths) < min_files:
+                        continue
+                    table = conn.execute(
+                        f"SELECT * EXCLUDE (year, month) FROM ({self._scan_sql(name, paths)}) "
+                        f"ORDER BY {self._keys_sql(name)}"
+                    ).to_arrow_table()
+                    newest = os.path.splitext(os.path.basename(paths[-1]))[0]
+                    merged = os.path.join(directory, f"{newest}-c.parquet")
+                    _write_atomic(table, merged)
+                    for path in paths:
+                        if path != merged:
+                            os.remove(path)
+                            removed += 1
+                    print(f"🧹 Compacted {len(paths)} files into {os.path.relpath(directory, self.root)}")
+        finally:
+            conn.close()
+        return removed
+
+
+def export_table(db, table_name, key_col='record_date', primary_key=None, archive=None):
+    """
+    Archive the full content of a live table (initial backfill).
+
+    Args:
+        db: TimeSeriesDB
+        table_name: Table to export
+        key_col: Date column used for the partitions
+        primary_key: Columns identifying a row (defaults to the table's key)
+        archive: ParquetArchive (defaults to the archive of the database)
+
+    Returns:
+        Number of exported rows
+    """
+    archive = archive or ParquetArchive(archive_path(db.db_path))
+    primary_key = primary_key or db._primary_key(table_name) or [key_col]
+    table = db.conn.execute(f'SELECT * FROM {table_name} ORDER BY "{key_col}"').to_arrow_table()
+    archive.write(table_name, table, key_col, primary_key)
+    print(f"🗄️  Archived {table.num_rows} rows of '{table_name}'")
+    return table.num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet archive of the DuckDB tables")
+    parser.add_argument("--db", default=DB_PATH, help="Database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="Merge the files of each month")
+    compact.add_argument("--dataset", default=None)
+    export = commands.add_parser("export", help="Archive the full content of tables")
+    export.add_argument("tables", nargs="+")
+    export.add_argument("--key-col", default="record_date")
+    commands.add_parser("list", help="List datasets and file counts")
+    args = parser.parse_args()
+
+    archive = ParquetArchive(archive_path(args.db))
+    if args.command == "compact":
+        removed = archive.compact(args.dataset)
+        print(f"✅ Compaction removed {removed} files")
+    elif args.command == "export":
+        from .engine import TimeSeriesDB
+        db = TimeSeriesDB(args.db, read_only=True)
+        try:
+            for table in args.tables:
+                export_table(db, table, args.key_col, archive=archive)
+        finally:
+            db.close()
+    else:
+        for dataset in archive.datasets():
+            partitions = archive.files(dataset)
+            files = sum(len(paths) for paths in partitions.values())
+            print(f"{dataset:<32} {len(partitions):>4} months {files:>6} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,896 @@
+"""
+Storage engine of the pipeline: TimeSeriesDB over DuckDB.
+
+- One DuckDB connection per database file and process (pooled);
+  every TimeSeriesDB handle works on its own cursor of it.
+- One upsert strategy: INSERT OR REPLACE BY NAME on a table with a
+  declared primary key, with additive schema evolution.
+- transaction() groups writes to several tables into one transaction.
+- Each operation's rows, bytes and duration are recorded in the
+  storage_metrics table.
+- Set TREASURY_DB_VERBOSE=1 to print every operation (warnings and
+  errors are always printed).
+"""
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import os
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .archive import ARCHIVE_ENABLED, ParquetArchive, archive_path
+from .rollups import ROLLUPS, refresh_rollups, rollups_missing
+
+VERBOSE = os.getenv("TREASURY_DB_VERBOSE", "0") == "1"
+
+# Per-operation timings (rows, bytes, ms)
+METRICS_TABLE = "storage_metrics"
+METRICS_DDL = f"""
+CREATE TABLE IF NOT EXISTS {METRICS_TABLE} (
+    recorded_at TIMESTAMP, operation VARCHAR, table_name VARCHAR,
+    rows BIGINT, bytes BIGINT, ms DOUBLE
+)
+"""
+
+# Schema history of every table written through TimeSeriesDB
+SCHEMA_VERSIONS_TABLE = "schema_versions"
+
+# Long-format series store: one row per (series, date), sorted by series_id, date.
+# series_id is "<source>.<column>" (e.g. "fed_liquidity_daily.Net_Liquidity").
+SERIES_TABLE = "series_values"
+SERIES_CATALOG_TABLE = "series_catalog"
+SERIES_TABLE_DDL = """
+CREATE TABLE {name} (
+    series_id VARCHAR, date TIMESTAMP, value DOUBLE,
+    vintage TIMESTAMP, source VARCHAR,
+    PRIMARY KEY (series_id, date)
+)
+"""
+SERIES_CATALOG_DDL = f"""
+CREATE TABLE IF NOT EXISTS {SERIES_CATALOG_TABLE} (
+    series_id VARCHAR PRIMARY KEY, source VARCHAR, name VARCHAR,
+    first_date TIMESTAMP, last_date TIMESTAMP, observations BIGINT,
+    last_vintage TIMESTAMP
+)
+"""
+
+# Vintage store: every distinct value of a (series, date) with the time it
+# was first seen. Rows are only added when the value differs from the
+# latest vintage, so the table grows with revisions rather than with runs.
+SERIES_VINTAGES_TABLE = "series_vintages"
+SERIES_VINTAGES_DDL = """
+CREATE TABLE {name} (
+    series_id VARCHAR, date TIMESTAMP, vintage TIMESTAMP, value DOUBLE,
+    source VARCHAR,
+    PRIMARY KEY (series_id, date, vintage)
+)
+"""
+
+def _dictionary_array(codes, labels, ordered=False):
+    """Dictionary-encoded string array (code -1 = NULL)."""
+    codes = np.asarray(codes)
+    indices = pa.array(codes, mask=codes < 0)
+    dictionary = pa.array(np.asarray(labels, dtype=object), type=pa.string())
+    return pa.DictionaryArray.from_arrays(indices, dictionary, ordered=ordered)
+
+
+def _arrow_array(values):
+    """Arrow array of a Series or Index with an explicit type."""
+    dtype = values.dtype
+    if isinstance(dtype, pd.PeriodDtype):
+        # Labels formatted once per distinct period, e.g. '2024-01', '2024Q1'
+        codes, periods = pd.factorize(values)
+        return _dictionary_array(codes, periods.astype(str), ordered=True)
+    if isinstance(dtype, pd.CategoricalDtype):
+        return _dictionary_array(values.array.codes, dtype.categories.astype(str), dtype.ordered)
+    array = pa.array(values, from_pandas=True)
+    if pa.types.is_timestamp(array.type) and array.type.unit != 'us':
+        # DuckDB TIMESTAMP resolution
+        array = array.cast(pa.timestamp('us', tz=array.type.tz), safe=False)
+    return array
+
+
+def _is_numeric(arrow_type):
+    """Whether an Arrow type holds numbers (booleans included)."""
+    return (pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+            or pa.types.is_decimal(arrow_type) or pa.types.is_boolean(arrow_type))
+
+
+def to_arrow_table(df, index_col=None):
+    """
+    Convert a DataFrame to a pyarrow.Table once, with explicit column types.
+
+    Datetimes become timestamp[us] (DuckDB TIMESTAMP), Period and
+    categorical columns become dictionary-encoded strings (DuckDB VARCHAR,
+    NULL for missing values); numeric columns wrap the pandas buffers. The
+    table can be registered with DuckDB without another copy.
+
+    Args:
+        df: DataFrame (a pyarrow.Table is returned unchanged)
+        index_col: If given, the index is stored first under this name
+            (replaces reset_index() and renaming)
+
+    Returns:
+        pyarrow.Table
+    """
+    if isinstance(df, pa.Table):
+        return df
+    names = [str(col) for col in df.columns]
+    arrays = [_arrow_array(df.iloc[:, i]) for i in range(df.shape[1])]
+    if index_col is not None:
+        if index_col in names:
+            raise ValueError(f"Column '{index_col}' already exists: cannot store the index under that name")
+        names.insert(0, index_col)
+        arrays.insert(0, _arrow_array(df.index))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _log(message):
+    """Print an operation message when TREASURY_DB_VERBOSE=1."""
+    if VERBOSE:
+        print(message)
+
+
+# Process-wide connections: database path -> {'conn', 'read_only', 'users'}
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _acquire(db_path, read_only):
+    """
+    Cursor on the pooled connection of a database (opened on first use).
+
+    A read-only request reuses an open read-write connection; a read-write
+    request while the file is open read-only in this process fails.
+    """
+    key = os.path.abspath(db_path)
+    with _POOL_LOCK:
+        entry = _POOL.get(key)
+        if entry is None:
+            if not read_only:
+                # Ensure directory exists
+                os.makedirs(os.path.dirname(key), exist_ok=True)
+            entry = {'conn': duckdb.connect(db_path, read_only=read_only), 'read_only': read_only, 'users': 0}
+            _POOL[key] = entry
+            _log(f"🔌 Connected to DuckDB at {db_path}{' (read-only)' if read_only else ''}")
+        elif entry['read_only'] and not read_only:
+            raise RuntimeError(f"{db_path} is open read-only in this process: close its readers before writing")
+        entry['users'] += 1
+        return entry['conn'].cursor()
+
+
+def _release(db_path):
+    """Drop one user of a pooled connection; the last one closes it."""
+    key = os.path.abspath(db_path)
+    with _POOL_LOCK:
+        entry = _POOL.get(key)
+        if entry is None:
+            return
+        entry['users'] -= 1
+        if entry['users'] <= 0:
+            entry['conn'].close()
+            del _POOL[key]
+
+
+class TimeSeriesDB:
+    def __init__(self, db_path="database/treasury_data.duckdb", read_only=False, archive=None):
+        """
+        Open a handle on the database (pooled connection, own cursor).
+
+        With read_only=True the database must exist and only reads are
+        allowed (several readers can share the file). Rows added or changed
+        by upserts are also appended to the Parquet archive next to the
+        database (archive=False or TREASURY_ARCHIVE=0 disables it).
+        """
+        self.db_path = db_path
+        self.read_only = read_only
+        if archive is None:
+            archive = ARCHIVE_ENABLED and not read_only and db_path != ':memory:'
+        self.archive = ParquetArchive(archive_path(db_path)) if archive else None
+        if db_path == ':memory:':
+            self._pooled = False
+            self.conn = duckdb.connect(db_path)
+        else:
+            self._pooled = True
+            self.conn = _acquire(db_path, read_only)
+        self._depth = 0            # transaction() nesting
+        self._after_commit = []    # actions run once the outermost transaction commits
+        self._metrics = []         # operation timings not yet stored
+
+    def close(self):
+        """Store pending metrics and release the connection."""
+        if self.conn is None:
+            return
+        try:
+            if self._metrics and not self.read_only:
+                with self.transaction():
+                    pass
+        finally:
+            self.conn.close()
+            self.conn = None
+            if self._pooled:
+                _release(self.db_path)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes (to any number of tables) into one transaction.
+
+        Nested calls join the outer transaction. Everything is rolled back
+        if the block raises; archive writes and pending metrics are applied
+        when the outermost transaction commits.
+
+            with db.transaction():
+                db.upsert_data(daily, "fiscal_daily_metrics")
+                db.upsert_data(weekly, "fiscal_weekly_metrics", key_col="week_start_date")
+        """
+        if self._depth:
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+            return
+
+        self.conn.execute("BEGIN TRANSACTION")
+        self._depth = 1
+        recorded = len(self._metrics)
+        try:
+            yield self
+            if self._metrics and not self.read_only:
+                self._store_metrics()
+            self.conn.execute("COMMIT")
+        except Exception:
+            try:
+                self.conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            self._after_commit.clear()
+            del self._metrics[recorded:]
+            raise
+        finally:
+            self._depth = 0
+
+        actions, self._after_commit = self._after_commit, []
+        for action in actions:
+            action()
+
+    def _record(self, operation, table_name, rows, nbytes, started):
+        """Add an operation timing (stored with the next commit)."""
+        self._metrics.append(
+            (datetime.now(), operation, table_name, int(rows), int(nbytes), (time.perf_counter() - started) * 1000)
+        )
+
+    def _store_metrics(self):
+        self.conn.execute(METRICS_DDL)
+        self.conn.executemany(f"INSERT INTO {METRICS_TABLE} VALUES (?, ?, ?, ?, ?, ?)", self._metrics)
+        self._metrics = []
+
+    def get_metrics(self, operation=None, table_name=None):
+        """
+        Recorded operation timings (recorded_at, operation, table_name,
+        rows, bytes, ms), most recent first.
+        """
+        if not self._table_exists(METRICS_TABLE):
+            return pd.DataFrame(columns=['recorded_at', 'operation', 'table_name', 'rows', 'bytes', 'ms'])
+        conditions, params = [], []
+        for col, value in (('operation', operation), ('table_name', table_name)):
+            if value is not None:
+                conditions.append(f"{col} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.conn.execute(
+            f"SELECT * FROM {METRICS_TABLE}{where} ORDER BY recorded_at DESC", params
+        ).df()
+
+    def _table_exists(self, table_name):
+        """Check if a table exists."""
+        result = self.conn.execute(
+            "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", 
+            [table_name]
+        ).fetchone()
+        return result[0] > 0
+
+    def _key_list(self, key_cols):
+        """Normalize a key column name or list of names to a list."""
+        return [key_cols] if isinstance(key_cols, str) else list(key_cols)
+
+    def _primary_key(self, table_name):
+        """Columns of the table's primary key ([] if none)."""
+        result = self.conn.execute(
+            "SELECT constraint_column_names FROM duckdb_constraints() "
+            "WHERE table_name = ? AND constraint_type = 'PRIMARY KEY'",
+            [table_name]
+        ).fetchone()
+        return list(result[0]) if result else []
+
+    def _create_table(self, source, table_name, primary_key):
+        """Create a table from a registered relation with a declared primary key."""
+        columns = [f'"{col}" {dtype}' for col, dtype in self._batch_types(source).items()]
+        key = ", ".join(f'"{col}"' for col in primary_key)
+        self.conn.execute(f"CREATE TABLE {table_name} ({', '.join(columns)}, PRIMARY KEY ({key}))")
+        self._record_schema_version(table_name, "create")
+
+    def _batch_types(self, source):
+        """DuckDB column types of a registered relation (ENUM stored as VARCHAR)."""
+        rows = self.conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+        return {row[0]: ('VARCHAR' if row[1].startswith('ENUM') else row[1]) for row in rows}
+
+    def _table_types(self, table_name):
+        """Column name -> DuckDB type of a table, in column order."""
+        return dict(self.conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = ? ORDER BY ordinal_position",
+            [table_name]
+        ).fetchall())
+
+    def _common_type(self, current, new):
+        """Smallest DuckDB type holding values of both types."""
+        return self.conn.execute(
+            f"SELECT typeof(x) FROM (SELECT NULL::{current} AS x UNION ALL SELECT NULL::{new}) LIMIT 1"
+        ).fetchone()[0]
+
+    def get_schema_version(self, table_name):
+        """Current schema version of a table (0 if never recorded)."""
+        if not self._table_exists(SCHEMA_VERSIONS_TABLE):
+            return 0
+        return self.conn.execute(
+            f"SELECT coalesce(max(version), 0) FROM {SCHEMA_VERSIONS_TABLE} WHERE table_name = ?",
+            [table_name]
+        ).fetchone()[0]
+
+    def _record_schema_version(self, table_name, change):
+        """Append the table's current columns to the schema history."""
+        self.conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSIONS_TABLE} (
+            table_name VARCHAR, version INTEGER, change VARCHAR,
+            columns VARCHAR, changed_at TIMESTAMP,
+            PRIMARY KEY (table_name, version)
+        )
+        """)
+        version = self.get_schema_version(table_name) + 1
+        self.conn.execute(
+            f"INSERT INTO {SCHEMA_VERSIONS_TABLE} VALUES (?, ?, ?, ?, ?)",
+            [table_name, version, change, json.dumps(self._table_types(table_name)), datetime.now()]
+        )
+        return version
+
+    def evolve_schema(self, source, table_name):
+        """
+        Additive schema evolution for a batch (registered relation).
+
+        New columns are added with ALTER TABLE ADD COLUMN (NULL for existing
+        rows) and columns whose values no longer fit are widened (e.g.
+        BIGINT -> DOUBLE, DATE -> TIMESTAMP). Stored rows are never dropped:
+        a change that would turn a typed column into text raises TypeError.
+        Each change is recorded as a new schema version.
+
+        Returns:
+            List of applied changes
+        """
+        if self.get_schema_version(table_name) == 0:
+            # Table created before schema tracking
+            self._record_schema_version(table_name, "baseline")
+
+        table_types = self._table_types(table_name)
+        primary_key = set(self._primary_key(table_name))
+        changes = []
+        for col, dtype in self._batch_types(source).items():
+            if col not in table_types:
+                self.conn.execute(f'ALTER TABLE {table_name} ADD COLUMN "{col}" {dtype}')
+                changes.append(f"add {col} {dtype}")
+                continue
+            current = table_types[col]
+            if dtype == current or col in primary_key:
+                continue
+            widened = self._common_type(current, dtype)
+            if widened == current:
+                continue
+            if widened == 'VARCHAR':
+                raise TypeError(
+                    f"Column '{col}' of '{table_name}' is {current}: cannot store {dtype} "
+                    f"values without converting its history to text"
+                )
+            self.conn.execute(f'ALTER TABLE {table_name} ALTER COLUMN "{col}" SET DATA TYPE {widened}')
+            changes.append(f"widen {col} {current} -> {widened}")
+
+        if changes:
+            version = self._record_schema_version(table_name, "; ".join(changes))
+            print(f"🧬 Schema of '{table_name}' evolved to v{version}: {', '.join(changes)}")
+        return changes
+
+    def _ensure_primary_key(self, table_name, primary_key):
+        """
+        Add the primary key to a table created without one.
+        Duplicate keys are collapsed to the last inserted row first;
+        secondary indexes are dropped (the primary key index replaces them).
+        """
+        if self._primary_key(table_name):
+            return
+        for (index_name,) in self.conn.execute(
+            "SELECT index_name FROM duckdb_indexes() WHERE table_name = ?", [table_name]
+        ).fetchall():
+            self.conn.execute(f'DROP INDEX "{index_name}"')
+        columns = ", ".join(f'"{col}"' for col in primary_key)
+        duplicates = self.conn.execute(
+            f"SELECT count(*) - count(DISTINCT ({columns})) FROM {table_name}"
+        ).fetchone()[0]
+        if duplicates:
+            print(f"⚠️  Collapsing {duplicates} duplicate keys in '{table_name}'")
+            self.conn.execute(f"""
+            CREATE OR REPLACE TABLE {table_name} AS
+            SELECT * FROM {table_name}
+            QUALIFY row_number() OVER (PARTITION BY {columns} ORDER BY rowid DESC) = 1
+            """)
+        self.conn.execute(f"DELETE FROM {table_name} WHERE " + " OR ".join(f'"{col}" IS NULL' for col in primary_key))
+        self.conn.execute(f"ALTER TABLE {table_name} ADD PRIMARY KEY ({columns})")
+        print(f"🔑 Added primary key ({', '.join(primary_key)}) to '{table_name}'")
+
+    def initialize_table_from_df(self, df, table_name, key_col='record_date'):
+        """
+        Create a table based on the DataFrame schema if it doesn't exist,
+        with a primary key on key_col (a column name or list of names).
+        Existing tables are kept: see evolve_schema for column changes.
+        """
+        primary_key = self._key_list(key_col)
+        if self._table_exists(table_name):
+            self._ensure_primary_key(table_name, primary_key)
+            return
+
+        _log(f"📝 Creating table '{table_name}'...")
+        # DuckDB can infer schema from DataFrame
+        self.conn.register('df_init', df)
+        try:
+            self._create_table('df_init', table_name, primary_key)
+        finally:
+            self.conn.unregister('df_init')
+        _log(f"✅ Table '{table_name}' created.")
+
+    def upsert_data(self, df, table_name, key_col='record_date', primary_key=None, index_col=None):
+        """
+        Insert new data, replacing existing records with the same primary key.
+        Strategy: INSERT OR REPLACE on a table with a declared primary key,
+        in one transaction (or the enclosing transaction()).
+
+        df is a DataFrame or pyarrow.Table. DataFrames are converted once
+        with to_arrow_table (the index is stored as index_col if given, or
+        when it is named key_col) and DuckDB scans the Arrow buffers.
+        key_col is the date column of the table; primary_key (a column name
+        or list of names) identifies a row and defaults to key_col. Rows
+        with duplicate keys in the batch keep the last occurrence.
+        """
+        return self.upsert_batches([df], table_name, key_col, primary_key, index_col)
+
+    def _prepare_batch(self, df, key_col, primary_key, index_col=None):
+        """Arrow table of a batch with non-NULL, unique primary keys (last row wins)."""
+        if isinstance(df, pa.RecordBatch):
+            df = pa.Table.from_batches([df])
+        elif not isinstance(df, pa.Table) and index_col is None:
+            if key_col not in df.columns and df.index.name == key_col:
+                index_col = key_col
+        table = to_arrow_table(df, index_col)
+
+        # Validate that the key columns exist in the batch
+        for col in [key_col] + primary_key:
+            if col not in table.column_names:
+                raise ValueError(f"Key column '{col}' not found in batch. Available columns: {table.column_names}")
+
+        # Primary keys cannot be NULL and must be unique within the batch
+        if any(table[col].null_count for col in primary_key):
+            valid = pc.is_valid(table[primary_key[0]])
+            for col in primary_key[1:]:
+                valid = pc.and_(valid, pc.is_valid(table[col]))
+            table = table.filter(valid)
+        rows = table.append_column('__row', pa.array(np.arange(table.num_rows)))
+        last = rows.group_by(primary_key).aggregate([('__row', 'max')])
+        if last.num_rows < table.num_rows:
+            table = table.take(np.sort(last['__row_max'].to_numpy()))
+        return table
+
+    def _changed_rows(self, table_name, columns, primary_key):
+        """
+        Rows of df_view that are new or differ from the stored rows
+        (pyarrow.Table). Only stored rows with the batch's keys are compared.
+        """
+        projection = ", ".join(f'"{col}"' for col in columns)
+        stored = ", ".join(f't."{col}"' for col in columns)
+        matches = " AND ".join(f'b."{col}" = t."{col}"' for col in primary_key)
+        return self.conn.execute(f"""
+            SELECT {projection} FROM df_view
+            EXCEPT
+            SELECT {stored} FROM {table_name} t
+            WHERE EXISTS (SELECT 1 FROM df_view b WHERE {matches})
+        """).to_arrow_table()
+
+    def _stored_rows(self, table_name, keys, primary_key):
+        """Stored rows with the given keys (pyarrow.Table of primary key columns)."""
+        matches = " AND ".join(f'k."{col}" = t."{col}"' for col in primary_key)
+        self.conn.register('changed_keys', keys)
+        try:
+            return self.conn.execute(f"""
+                SELECT * FROM {table_name} t
+                WHERE EXISTS (SELECT 1 FROM changed_keys k WHERE {matches})
+            """).to_arrow_table()
+        finally:
+            self.conn.unregister('changed_keys')
+
+    def _archive_changes(self, table_name, rows, key_col, primary_key):
+        """Append changed rows to the Parquet archive (the database stays authoritative)."""
+        try:
+            key_type = rows.schema.field(key_col).type
+            if pa.types.is_timestamp(key_type) or pa.types.is_date(key_type):
+                self.archive.write(table_name, rows, key_col, primary_key)
+        except Exception as e:
+            print(f"⚠️ Could not archive changes of '{table_name}': {e}")
+
+    def upsert_batches(self, batches, table_name, key_col='record_date', primary_key=None, index_col=None):
+        """
+        Upsert a stream of batches in a single transaction (joins an
+        enclosing transaction()).
+
+        Batches (DataFrames, pyarrow Tables or RecordBatches) are converted
+        and written one at a time, so a producer can stream a backfill
+        without building the full frame first. Later batches replace rows
+        of earlier ones with the same key; nothing is kept if one fails.
+        Arguments as in upsert_data.
+
+        Returns:
+            Number of rows written
+        """
+        primary_key = self._key_list(primary_key or key_col)
+        started = time.perf_counter()
+        written = nbytes = 0
+        first_key = None
+        changes = []
+        try:
+            with self.transaction():
+                for batch in batches:
+                    table = self._prepare_batch(batch, key_col, primary_key, index_col)
+                    if table.num_rows == 0:
+                        continue
+
+                    # Ensure table exists
+                    self.initialize_table_from_df(table, table_name, primary_key)
+
+                    # The batch is exposed to DuckDB as a view over the Arrow buffers;
+                    # the schema is evolved, then new keys are inserted and existing
+                    # ones replaced
+                    self.conn.register('df_view', table)
+                    try:
+                        self.evolve_schema('df_view', table_name)
+                        if table_name in ROLLUPS or self.archive is not None:
+                            changed = self._changed_rows(table_name, table.column_names, primary_key)
+                            if changed.num_rows:
+                                changes.append(changed.select(primary_key))
+                                batch_first = pc.min(changed[key_col]).as_py()
+                                if first_key is None or batch_first < first_key:
+                                    first_key = batch_first
+                        self.conn.execute(f"INSERT OR REPLACE INTO {table_name} BY NAME SELECT * FROM df_view")
+                    finally:
+                        self.conn.unregister('df_view')
+                    written += table.num_rows
+                    nbytes += table.nbytes
+
+                # Rollups of the source are refreshed from the first changed period
+                # (all periods when a rollup table has not been built yet)
+                if table_name in ROLLUPS:
+                    if rollups_missing(self.conn, table_name):
+                        refresh_rollups(self.conn, table_name, since=None)
+                    elif first_key is not None:
+                        refresh_rollups(self.conn, table_name, since=first_key)
+                if changes and self.archive is not None:
+                    # Full stored rows of the changed keys (columns missing from
+                    # the batches keep their stored values)
+                    archived = self._stored_rows(table_name, pa.concat_tables(changes), primary_key)
+                    self._after_commit.append(
+                        lambda: self._archive_changes(table_name, archived, key_col, primary_key)
+                    )
+                self._record('upsert', table_name, written, nbytes, started)
+
+        except Exception as e:
+            # Stored history is kept on any error (no drop-and-recreate)
+            print(f"❌ Error during upsert into '{table_name}': {e}")
+            raise
+
+        if written:
+            _log(f"💾 Upserted {written} records into '{table_name}'")
+        else:
+            _log("⚠️ No data to upsert.")
+        return written
+
+    def _ensure_series_tables(self):
+        """Create the series store and its catalog if missing."""
+        if not self._table_exists(SERIES_TABLE):
+            self.conn.execute(SERIES_TABLE_DDL.format(name=SERIES_TABLE))
+        if not self._table_exists(SERIES_VINTAGES_TABLE):
+            self.conn.execute(SERIES_VINTAGES_DDL.format(name=SERIES_VINTAGES_TABLE))
+        self.conn.execute(SERIES_CATALOG_DDL)
+
+    def write_series(self, df, source, date_col='record_date', columns=None, vintage=None):
+        """
+        Store the numeric columns of a wide frame in the long-format series store.
+
+        Each column becomes series "<source>.<column>"; NULL/NaN values are
+        skipped. Existing (series_id, date) rows are replaced, new rows are
+        appended in (series_id, date) order, values that differ from the
+        latest vintage (or are new) are added to the vintage store, and the
+        catalog entries of the source are refreshed, all in one transaction.
+
+        Args:
+            df: Wide DataFrame with a date column (or date index named
+                date_col), or a pyarrow.Table
+            source: Source name, usually the wide table name
+            date_col: Date column
+            columns: Columns to store (defaults to all numeric/boolean columns)
+            vintage: Timestamp recorded with the rows, i.e. the time the
+                values were first seen (defaults to now)
+
+        Returns:
+            Number of observations written
+        """
+        index_col = None
+        if not isinstance(df, pa.Table) and date_col not in df.columns and df.index.name == date_col:
+            index_col = date_col
+        table = to_arrow_table(df, index_col)
+        if table.num_rows == 0:
+            return 0
+
+        candidates = columns if columns is not None else table.column_names
+        numeric = [col for col in candidates if col != date_col and _is_numeric(table.schema.field(col).type)]
+        if not numeric:
+            return 0
+
+        source_sql = source.replace("'", "''")
+        values = ", ".join(f'CAST("{col}" AS DOUBLE) AS "{col}"' for col in numeric)
+        started = time.perf_counter()
+        try:
+            self.conn.register('series_batch', table.select([date_col] + numeric))
+            with self.transaction():
+                self._ensure_series_tables()
+                self.conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE series_batch_long AS
+                SELECT '{source_sql}.' || name AS series_id, date, value,
+                       ?::TIMESTAMP AS vintage, '{source_sql}' AS source
+                FROM (
+                    UNPIVOT (SELECT CAST("{date_col}" AS TIMESTAMP) AS date, {values} FROM series_batch)
+                    ON COLUMNS(* EXCLUDE (date)) INTO NAME name VALUE value
+                )
+                WHERE date IS NOT NULL AND NOT isnan(value)
+                ORDER BY series_id, date
+                """, [vintage or datetime.now()])
+                written = self.conn.execute(
+                    f"INSERT OR REPLACE INTO {SERIES_TABLE} BY NAME SELECT * FROM series_batch_long"
+                ).fetchone()[0]
+                # Only values not already known as the latest vintage
+                revised = self.conn.execute(f"""
+                INSERT OR REPLACE INTO {SERIES_VINTAGES_TABLE} BY NAME
+                SELECT b.series_id, b.date, b.vintage, b.value, b.source
+                FROM series_batch_long b
+                LEFT JOIN (
+                    SELECT series_id, date, arg_max(value, vintage) AS value
+                    FROM {SERIES_VINTAGES_TABLE}
+                    WHERE source = '{source_sql}'
+                    GROUP BY series_id, date
+                ) latest USING (series_id, date)
+                WHERE latest.value IS NULL OR latest.value <> b.value
+                ORDER BY b.series_id, b.date
+                """).fetchone()[0]
+                self.conn.execute("DROP TABLE series_batch_long")
+                self.conn.execute(f"""
+                INSERT OR REPLACE INTO {SERIES_CATALOG_TABLE}
+                SELECT series_id, '{source_sql}', substr(series_id, {len(source) + 2}),
+                       min(date), max(date), count(*), max(vintage)
+                FROM {SERIES_TABLE}
+                WHERE source = '{source_sql}'
+                GROUP BY series_id
+                """)
+                self._record('series', source, written, table.nbytes, started)
+        except Exception as e:
+            print(f"❌ Error writing series from '{source}': {e}")
+            raise
+        finally:
+            self.conn.unregister('series_batch')
+
+        _log(f"📈 Stored {written} observations of {len(numeric)} series from '{source}' "
+             f"({revised} new or revised)")
+        return written
+
+    def read_series(self, series, start=None, end=None, source=None, asof=None):
+        """
+        Wide frame of the requested series between start and end (inclusive).
+
+        Args:
+            series: series_id or list of series_ids (or column names with source)
+            start: First date (optional)
+            end: Last date (optional)
+            source: If given, series are column names of this source and the
+                result keeps those names
+            asof: If given, the values as known at this timestamp (latest
+                vintage first seen at or before it) instead of the current ones
+
+        Returns:
+            DataFrame indexed by date with one column per requested series
+            (missing series are all-NaN columns)
+        """
+        names = [series] if isinstance(series, str) else list(series)
+        ids = [f"{source}.{name}" for name in names] if source else names
+        table = SERIES_TABLE if asof is None else SERIES_VINTAGES_TABLE
+        if not self._table_exists(table) or not ids:
+            return pd.DataFrame(columns=names, index=pd.DatetimeIndex([], name='date'))
+
+        conditions = [f"series_id IN ({', '.join('?' for _ in ids)})"]
+        params = list(ids)
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(pd.Timestamp(end).to_pydatetime())
+
+        if asof is None:
+            sql = (f"SELECT series_id, date, value FROM {SERIES_TABLE} "
+                   f"WHERE {' AND '.join(conditions)} ORDER BY series_id, date")
+        else:
+            conditions.append("vintage <= ?")
+            params.append(pd.Timestamp(asof).to_pydatetime())
+            sql = (f"SELECT series_id, date, arg_max(value, vintage) AS value FROM {SERIES_VINTAGES_TABLE} "
+                   f"WHERE {' AND '.join(conditions)} GROUP BY series_id, date ORDER BY series_id, date")
+        long = self.conn.execute(sql, params).df()
+        wide = long.pivot(index='date', columns='series_id', values='value').reindex(columns=ids)
+        wide.columns = names
+        wide.columns.name = None
+        return wide.sort_index()
+
+    def list_series(self, source=None):
+        """
+        Series catalog (series_id, source, name, first/last date, observations,
+        last vintage), optionally for one source.
+        """
+        if not self._table_exists(SERIES_CATALOG_TABLE):
+            return pd.DataFrame()
+        if source is None:
+            return self.conn.execute(f"SELECT * FROM {SERIES_CATALOG_TABLE} ORDER BY series_id").df()
+        return self.conn.execute(
+            f"SELECT * FROM {SERIES_CATALOG_TABLE} WHERE source = ? ORDER BY series_id", [source]
+        ).df()
+
+    def asof(self, timestamp, series, start=None, end=None, source=None):
+        """
+        Point-in-time read: the series as they were known at `timestamp`
+        (see read_series for the arguments).
+        """
+        return self.read_series(series, start, end, source, asof=timestamp)
+
+    def list_vintages(self, series_id):
+        """
+        Every stored value of one series with the time it was first seen
+        (columns date, vintage, value), in (date, vintage) order.
+        """
+        if not self._table_exists(SERIES_VINTAGES_TABLE):
+            return pd.DataFrame(columns=['date', 'vintage', 'value'])
+        return self.conn.execute(
+            f"SELECT date, vintage, value FROM {SERIES_VINTAGES_TABLE} "
+            f"WHERE series_id = ? ORDER BY date, vintage", [series_id]
+        ).df()
+
+    def compact_series(self):
+        """
+        Rewrite the series and vintage stores in (series_id, date) order.
+
+        Upserts append rows in batch order; rewriting restores the global
+        sort so DuckDB zone maps can skip row groups of other series.
+        """
+        stores = [
+            (SERIES_TABLE, SERIES_TABLE_DDL, "series_id, date"),
+            (SERIES_VINTAGES_TABLE, SERIES_VINTAGES_DDL, "series_id, date, vintage"),
+        ]
+        for name, ddl, order in stores:
+            if not self._table_exists(name):
+                continue
+            staging = f"{name}_sorted"
+            started = time.perf_counter()
+            with self.transaction():
+                self.conn.execute(ddl.format(name=staging))
+                rows = self.conn.execute(
+                    f"INSERT INTO {staging} SELECT * FROM {name} ORDER BY {order}"
+                ).fetchone()[0]
+                self.conn.execute(f"DROP TABLE {name}")
+                self.conn.execute(f"ALTER TABLE {staging} RENAME TO {name}")
+                self._record('compact', name, rows, 0, started)
+            print(f"🧹 Compacted '{name}'")
+
+    def read(self, table_name, columns=None, start=None, end=None, asof=None,
+             key_col='record_date', dtype_backend='pyarrow'):
+        """
+        Read a slice of a table with the projection and date filters in SQL.
+
+        Args:
+            table_name: Table to read
+            columns: Column or list of columns besides key_col (None = all).
+                Columns missing from the table are skipped.
+            start: First key date (inclusive, optional)
+            end: Last key date (inclusive, optional)
+            asof: If given, only the last row with key_col <= asof
+                (point-in-time snapshot)
+            key_col: Date column used by the filters and as index
+            dtype_backend: 'pyarrow' (ArrowDtype columns wrapping DuckDB's
+                Arrow result, no copy) or 'numpy'
+
+        Returns:
+            DataFrame indexed by key_col in date order (empty if the table
+            does not exist)
+        """
+        if dtype_backend not in ('pyarrow', 'numpy'):
+            raise ValueError(f"dtype_backend must be 'pyarrow' or 'numpy', got '{dtype_backend}'")
+        if not self._table_exists(table_name):
+            return pd.DataFrame()
+
+        available = self._table_types(table_name)
+        if key_col not in available:
+            raise ValueError(f"Key column '{key_col}' not found in table '{table_name}'")
+        wanted = list(available) if columns is None else self._key_list(columns)
+        select = [key_col] + [col for col in wanted if col in available and col != key_col]
+
+        conditions, params = [], []
+        for op, value in ((">=", start), ("<=", end), ("<=", asof)):
+            if value is not None:
+                conditions.append(f'"{key_col}" {op} ?')
+                params.append(pd.Timestamp(value).to_pydatetime())
+
+        started = time.perf_counter()
+        projection = ", ".join(f'"{col}"' for col in select)
+        sql = f"SELECT {projection} FROM {table_name}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        sql += f' ORDER BY "{key_col}"' + (" DESC LIMIT 1" if asof is not None else "")
+
+        result = self.conn.execute(sql, params)
+        if dtype_backend == 'numpy':
+            df = result.df()
+            nbytes = df.memory_usage(index=False).sum()
+        else:
+            arrow = result.to_arrow_table()
+            nbytes = arrow.nbytes
+            df = arrow.to_pandas(types_mapper=pd.ArrowDtype)
+        self._record('read', table_name, len(df), nbytes, started)
+        index = pd.DatetimeIndex(pd.to_datetime(df.pop(key_col).to_numpy()), name=key_col)
+        return df.set_index(index)
+
+    def get_columns(self, table_name):
+        """
+        Column names of a table in order ([] if it doesn't exist).
+        """
+        return list(self._table_types(table_name))
+
+    def get_latest_date(self, table_name, key_col='record_date'):
+        """
+        Get the maximum date currently in the table.
+        Returns None if table doesn't exist or is empty.
+        """
+        if not self._table_exists(table_name):
+            return None
+        
+        result = self.conn.execute(f"SELECT MAX({key_col}) FROM {table_name}").fetchone()
+        return result[0] if result else None
+
+    def get_all_data(self, table_name):
+        """
+        Retrieve all data from a table as a DataFrame.
+        """
+        if not self._table_exists(table_name):
+            print(f"⚠️ Table '{table_name}' does not exist.")
+            return pd.DataFrame()
+        
+        return self.conn.execute(f"SELECT * FROM {table_name} ORDER BY 1").df()
+
+    def query(self, sql):
+        """
+        Execute a raw SQL query and return a DataFrame.
+        """
+        return self.conn.execute(sql).df()
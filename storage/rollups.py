@@ -0,0 +1,250 @@
+"""
+Period rollups of the daily tables, maintained in DuckDB.
+
+Each (source table, period) pair has a rollup table keyed by
+period_start with one row per period: period_end (last observed date),
+days (rows in the period) and one column per measure "<column>_<agg>".
+The row of the current period holds the to-date values (MTD, QTD, FYTD,
+week to date). Rolling rollups ('3m') are keyed by record date and hold
+trailing-window aggregates over ROLLING_DAYS rows (like
+pandas rolling(ROLLING_DAYS).sum(): NULL until the window is full).
+
+TimeSeriesDB refreshes the rollups of a source in the upsert transaction,
+recomputing only the periods at or after the first date whose row was
+added or changed by the batch.
+"""
+
+import numpy as np
+import pandas as pd
+
+ROLLING_DAYS = 63  # ~3 months of business days
+
+# Period start of a date column (SQL, as TIMESTAMP)
+PERIODS = {
+    # Fiscal week, Wednesday to Tuesday (get_fiscal_week_bounds)
+    'week': "CAST(CAST({d} AS DATE) - CAST((isodow({d}) + 4) % 7 AS INTEGER) AS TIMESTAMP)",
+    'month': "CAST(date_trunc('month', {d}) AS TIMESTAMP)",
+    'quarter': "CAST(date_trunc('quarter', {d}) AS TIMESTAMP)",
+    # Federal fiscal year, starting October 1
+    'fiscal_year': "CAST(make_date(year({d}) - CASE WHEN month({d}) < 10 THEN 1 ELSE 0 END, 10, 1) AS TIMESTAMP)",
+}
+
+# Aggregates over the rows of a period (NULLs skipped)
+AGGREGATES = {
+    'sum': "sum({x})",
+    'avg': "avg({x})",
+    'min': "min({x})",
+    'max': "max({x})",
+    'std': "stddev_samp({x})",
+    'first': "first({x} ORDER BY {d}) FILTER (WHERE {x} IS NOT NULL)",
+    'last': "last({x} ORDER BY {d}) FILTER (WHERE {x} IS NOT NULL)",
+    'count': "count({x})",
+    'true': "sum(CAST({x} AS INTEGER))",
+}
+
+# Rollups maintained per source table. Measures of columns missing from
+# the source are skipped.
+ROLLUPS = {
+    'fiscal_daily_metrics': {
+        'key_col': 'record_date',
+        'periods': ['week', 'month', 'quarter', 'fiscal_year'],
+        'measures': {
+            'Total_Spending': ['sum'],
+            'Total_Taxes': ['sum'],
+            'Net_Impulse': ['sum'],
+            'Household_Spending': ['sum'],
+            'TGA_Balance': ['first', 'last'],
+        },
+        'rolling': {'Net_Impulse': ['sum']},
+    },
+    'fed_liquidity_daily': {
+        'key_col': 'record_date',
+        'periods': ['week', 'month', 'quarter'],
+        'measures': {
+            'RRP_Balance': ['first', 'last', 'avg'],
+            'RRP_Change': ['sum'],
+            'RRP_Imputed': ['true'],
+            'Net_Liquidity': ['first', 'last', 'avg'],
+            'Net_Liq_Change': ['sum'],
+            'Fed_Total_Assets': ['first', 'last', 'avg'],
+            'TGA_Balance': ['first', 'last'],
+            'Spread_SOFR_IORB': ['avg', 'min', 'max', 'std'],
+            'Spread_EFFR_IORB': ['avg'],
+            'Repo_Ops_Balance_M': ['avg'],
+        },
+    },
+}
+
+
+def rollup_table(source, period):
+    """Name of the rollup table of a source for a period ('3m' = rolling)."""
+    return f"rollup_{source}_{period}"
+
+
+def _quote(name):
+    return f'"{name}"'
+
+
+def _source_columns(conn, source):
+    return [row[0] for row in conn.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+        [source]
+    ).fetchall()]
+
+
+def _table_exists(conn, table_name):
+    return conn.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table_name]
+    ).fetchone()[0] > 0
+
+
+def _measure_list(measures, available):
+    """(column, aggregate, output name) of the measures present in the source."""
+    return [
+        (col, agg, f"{col}_{agg}")
+        for col, aggs in measures.items() if col in available
+        for agg in aggs
+    ]
+
+
+def _period_select(source, period, key_col, measures, since_sql=None):
+    """SELECT computing the rows of a period rollup (optionally from a period start on)."""
+    start = PERIODS[period].format(d=_quote(key_col))
+    values = ",\n        ".join(
+        f'{AGGREGATES[agg].format(x=_quote(col), d=_quote(key_col))} AS "{name}"'
+        for col, agg, name in measures
+    )
+    where = f"WHERE {start} >= {since_sql}" if since_sql else ""
+    return f"""
+    SELECT {start} AS period_start,
+        max("{key_col}") AS period_end,
+        count(*) AS days,
+        {values}
+    FROM {source}
+    {where}
+    GROUP BY period_start
+    ORDER BY period_start
+    """
+
+
+def _rolling_select(source, key_col, measures, since_sql=None):
+    """SELECT computing trailing-window rows (NULL until the window is full of values)."""
+    window = f'(ORDER BY "{key_col}" ROWS BETWEEN {ROLLING_DAYS - 1} PRECEDING AND CURRENT ROW)'
+    values = ",\n        ".join(
+        f'CASE WHEN count("{col}") OVER {window} = {ROLLING_DAYS} '
+        f'THEN {agg}("{col}") OVER {window} END AS "{name}"'
+        for col, agg, name in measures
+    )
+    where = ""
+    if since_sql:
+        # Rows of the windows ending at or after `since`
+        where = f"""WHERE "{key_col}" >= coalesce((
+            SELECT min("{key_col}") FROM (
+                SELECT "{key_col}" FROM {source} WHERE "{key_col}" < {since_sql}
+                ORDER BY "{key_col}" DESC LIMIT {ROLLING_DAYS - 1}
+            )), {since_sql})"""
+    select = f"""
+    SELECT "{key_col}",
+        {values}
+    FROM {source}
+    {where}
+    """
+    if since_sql:
+        select = f'SELECT * FROM ({select}) WHERE "{key_col}" >= {since_sql}'
+    return select + f' ORDER BY "{key_col}"'
+
+
+def _needs_rebuild(conn, table, columns):
+    """True if a rollup table is missing or does not have the expected columns."""
+    return not _table_exists(conn, table) or _source_columns(conn, table) != columns
+
+
+def _replace_rows(conn, table, select, key, since_sql):
+    """
+    Rebuild a rollup table (since_sql=None, unfiltered select), or only its
+    rows from `since_sql` on.
+    """
+    if since_sql is None:
+        conn.execute(f"CREATE OR REPLACE TABLE {table} AS {select}")
+        return
+    conn.execute(f'DELETE FROM {table} WHERE "{key}" >= {since_sql}')
+    conn.execute(f"INSERT INTO {table} {select}")
+
+
+def rollups_missing(conn, source):
+    """True if a rollup table of the source has not been built yet."""
+    spec = ROLLUPS[source]
+    periods = spec['periods'] + (['3m'] if spec.get('rolling') else [])
+    return any(not _table_exists(conn, rollup_table(source, period)) for period in periods)
+
+
+def refresh_rollups(conn, source, since=None):
+    """
+    Recompute the rollups of a source table.
+
+    Args:
+        conn: DuckDB connection (runs inside the caller's transaction)
+        source: Source table with a ROLLUPS entry
+        since: First date touched by new rows; periods starting before the
+            period of `since` are kept. None rebuilds every rollup.
+
+    Returns:
+        List of refreshed rollup tables
+    """
+    spec = ROLLUPS.get(source)
+    if spec is None or not _table_exists(conn, source):
+        return []
+    key_col = spec['key_col']
+    available = set(_source_columns(conn, source))
+    since = pd.Timestamp(since) if since is not None else None
+    refreshed = []
+
+    for period in spec['periods']:
+        measures = _measure_list(spec['measures'], available)
+        table = rollup_table(source, period)
+        columns = ['period_start', 'period_end', 'days'] + [name for _, _, name in measures]
+        since_sql = None
+        # A missing table or changed measures need the full history
+        if since is not None and not _needs_rebuild(conn, table, columns):
+            since_sql = PERIODS[period].format(d=f"TIMESTAMP '{since:%Y-%m-%d %H:%M:%S}'")
+        _replace_rows(conn, table, _period_select(source, period, key_col, measures, since_sql),
+                      'period_start', since_sql)
+        refreshed.append(table)
+
+    rolling = _measure_list(spec.get('rolling', {}), available)
+    if rolling:
+        table = rollup_table(source, '3m')
+        columns = [key_col] + [name for _, _, name in rolling]
+        since_sql = None
+        if since is not None and not _needs_rebuild(conn, table, columns):
+            since_sql = f"TIMESTAMP '{since:%Y-%m-%d %H:%M:%S}'"
+        _replace_rows(conn, table, _rolling_select(source, key_col, rolling, since_sql),
+                      key_col, since_sql)
+        refreshed.append(table)
+    return refreshed
+
+
+def read_rollup(db, source, period, columns=None, start=None, end=None, asof=None):
+    """
+    Rows of a rollup table through TimeSeriesDB.read.
+
+    Args:
+        db: TimeSeriesDB
+        source: Source table
+        period: 'week', 'month', 'quarter', 'fiscal_year' or '3m'
+        columns: Columns to read (None = all)
+        start, end: Period start (or date for '3m') range
+        asof: Only the period containing this date (or the last row before it)
+
+    Returns:
+        DataFrame indexed by period_start (record date for '3m')
+    """
+    key_col = ROLLUPS[source]['key_col'] if period == '3m' else 'period_start'
+    return db.read(rollup_table(source, period), columns, start, end, asof,
+                   key_col=key_col, dtype_backend='numpy')
+
+
+def period_value(row, column, default=np.nan):
+    """Value of a rollup column in a row (default if missing or NULL)."""
+    value = row.get(column, default) if row is not None else default
+    return default if pd.isna(value) else value
@@ -0,0 +1,458 @@
+"""
+Single-writer access to the DuckDB database.
+
+DuckDB allows one read-write process per database file. Pipeline stages
+running in parallel therefore spool their batches to a write queue (Arrow
+IPC files next to the database) instead of opening the file; one writer
+at a time (file lock) applies the queued batches in batched transactions
+and publishes a read-only snapshot copy for readers.
+
+Modes (TREASURY_DB_WRITER environment variable, see open_writer):
+    direct   TimeSeriesDB with its own read-write connection; close()
+             publishes the reader snapshot (default)
+    queue    batches are queued; close() drains the queue (waits for the lock)
+    service  batches are queued; a writer service drains them:
+                 python -m storage.writer --interval 5
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+
+from .engine import TimeSeriesDB, to_arrow_table
+
+DB_PATH = "database/treasury_data.duckdb"
+WRITER_MODE = os.getenv("TREASURY_DB_WRITER", "direct")
+
+QUEUE_DIR = "write_queue"          # Next to the database file
+FAILED_DIR = "failed"              # Inside the queue: batches that could not be applied
+SNAPSHOT_DIR = "snapshots"         # Next to the database file
+LOCK_FILE = ".writer.lock"
+REQUEST_KEY = b"treasury_write_request"
+# Seconds after which an incomplete queued transaction is rejected
+TXN_TIMEOUT = float(os.getenv("TREASURY_QUEUE_TXN_TIMEOUT", "600"))
+
+
+def queue_path(db_path=DB_PATH):
+    """Write queue directory of a database."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), QUEUE_DIR)
+
+
+def _txn_id(path):
+    """Transaction id of a queued batch file name (None outside transactions)."""
+    parts = os.path.basename(path)[:-len('.arrow')].split('.')
+    return parts[1] if len(parts) == 2 else None
+
+
+def _submitted(path):
+    """Submission time (epoch seconds) of a queued batch file name."""
+    return int(os.path.basename(path).split('-')[0]) / 1e9
+
+
+def snapshot_path(db_path=DB_PATH):
+    """Read-only snapshot copy of a database."""
+    directory = os.path.dirname(os.path.abspath(db_path))
+    return os.path.join(directory, SNAPSHOT_DIR, os.path.basename(db_path))
+
+
+class WriteQueue:
+    """
+    Spool directory of pending writes for one database.
+
+    Each batch is an Arrow IPC file whose schema metadata holds the write
+    request (operation, table, keys). Files are named by submission time
+    (plus the transaction id for QueuedWriter.transaction() batches) and
+    applied in that order.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.queue_dir = queue_path(db_path)
+        os.makedirs(self.queue_dir, exist_ok=True)
+
+    def submit(self, table, request):
+        """
+        Atomically add a batch to the queue.
+
+        Args:
+            table: pyarrow.Table
+            request: JSON-serializable dict describing the write
+
+        Returns:
+            Path of the queued batch
+        """
+        txn = request.get('txn')
+        suffix = f".{txn['id']}" if txn else ""
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}{suffix}.arrow"
+        path = os.path.join(self.queue_dir, name)
+        metadata = dict(table.schema.metadata or {})
+        metadata[REQUEST_KEY] = json.dumps(request).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return path
+
+    def pending(self):
+        """Queued batch files in submission order."""
+        return sorted(
+            os.path.join(self.queue_dir, name)
+            for name in os.listdir(self.queue_dir) if name.endswith('.arrow')
+        )
+
+    def _load(self, path):
+        """Memory-mapped batch (without the request metadata)."""
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        return table.replace_schema_metadata(None)
+
+    def _request(self, path):
+        """Write request of a batch (read from the file schema only)."""
+        schema = pa.ipc.open_file(pa.memory_map(path)).schema
+        return json.loads(schema.metadata[REQUEST_KEY])
+
+    def _groups(self, paths):
+        """
+        Consecutive batches with the same request, as (request, paths).
+
+        Unreadable batches are rejected together with the other batches of
+        their transaction.
+        """
+        groups, failed = [], set()
+        for path in paths:
+            try:
+                request = self._request(path)
+            except Exception as e:
+                self._reject(path, e)
+                if _txn_id(path) is not None:
+                    failed.add(_txn_id(path))
+                continue
+            if groups and groups[-1][0] == request:
+                groups[-1][1].append(path)
+            else:
+                groups.append((request, [path]))
+        if not failed:
+            return groups
+        kept = []
+        for request, group in groups:
+            if request.get('txn') and request['txn']['id'] in failed:
+                for path in group:
+                    self._reject(path, "another batch of its transaction could not be read")
+            else:
+                kept.append((request, group))
+        return kept
+
+    def _transactions(self, groups):
+        """
+        Groups to apply together, in queue order.
+
+        Groups of a QueuedWriter.transaction() are applied as one unit once
+        all of its files are queued. Units stop at the first incomplete
+        transaction, so later batches are never applied before it; a
+        transaction still incomplete TXN_TIMEOUT seconds after its first
+        batch was queued (e.g. its producer died) is rejected.
+        """
+        units, by_txn, sizes = [], {}, {}
+        for request, paths in groups:
+            txn = request.get('txn')
+            if txn is None:
+                units.append([(request, paths)])
+                continue
+            if txn['id'] not in by_txn:
+                by_txn[txn['id']] = []
+                sizes[txn['id']] = txn['size']
+                units.append(by_txn[txn['id']])
+            by_txn[txn['id']].append((request, paths))
+        ready = []
+        for unit in units:
+            txn = unit[0][0].get('txn')
+            files = [path for _, paths in unit for path in paths]
+            if txn is not None and len(files) < sizes[txn['id']]:
+                age = time.time() - min(_submitted(path) for path in files)
+                if age <= TXN_TIMEOUT:
+                    break
+                for path in files:
+                    self._reject(path, f"transaction incomplete after {age:.0f}s "
+                                       f"({len(files)} of {sizes[txn['id']]} batches)")
+                continue
+            ready.append(unit)
+        return ready
+
+    def _reject(self, path, error):
+        """Move a batch that could not be applied out of the queue."""
+        failed_dir = os.path.join(self.queue_dir, FAILED_DIR)
+        os.makedirs(failed_dir, exist_ok=True)
+        os.replace(path, os.path.join(failed_dir, os.path.basename(path)))
+        print(f"❌ Queued batch {os.path.basename(path)} failed and was moved to '{FAILED_DIR}': {error}")
+
+    def _apply(self, db, request, paths):
+        """Apply one group of batches (upserts of a group share one transaction)."""
+        if request['op'] == 'upsert':
+            db.upsert_batches(
+                (self._load(path) for path in paths),
+                request['table'], request['key_col'], request['primary_key']
+            )
+        elif request['op'] == 'series':
+            vintage = pd.Timestamp(request['vintage']).to_pydatetime() if request['vintage'] else None
+            for path in paths:
+                db.write_series(self._load(path), request['source'], request['date_col'],
+                                request['columns'], vintage)
+        else:
+            raise ValueError(f"Unknown queued operation '{request['op']}'")
+
+    def drain(self, snapshot=True):
+        """
+        Apply all queued batches as the single writer.
+
+        Waits for the writer lock, so concurrent drains are serialized and
+        batches queued meanwhile are picked up by whoever holds the lock.
+        A group (or queued transaction) that fails is rolled back and its
+        files are moved to the failed directory; the others are still
+        applied.
+
+        Args:
+            snapshot: Publish a reader snapshot after applying batches
+
+        Returns:
+            Number of batch files applied
+        """
+        applied = 0
+        with open(os.path.join(self.queue_dir, LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if not self.pending():
+                    return 0
+                db = TimeSeriesDB(self.db_path)
+                try:
+                    while True:
+                        units = self._transactions(self._groups(self.pending()))
+                        if not units:
+                            break
+                        for unit in units:
+                            files = [path for _, group in unit for path in group]
+                            try:
+                                with db.transaction():
+                                    for request, group in unit:
+                                        self._apply(db, request, group)
+                            except Exception as e:
+                                for path in files:
+                                    self._reject(path, e)
+                                continue
+                            for path in files:
+                                os.remove(path)
+                            applied += len(files)
+                    waiting = len(self.pending())
+                    if waiting:
+                        print(f"⏳ {waiting} queued batches wait for an incomplete transaction")
+                    if applied and snapshot:
+                        publish_snapshot(db)
+                finally:
+                    db.close()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        print(f"✅ Applied {applied} queued batches to {self.db_path}")
+        return applied
+
+
+def publish_snapshot(db):
+    """
+    Copy a checkpointed database to its snapshot path for readers.
+
+    Readers holding the previous snapshot keep reading it; new readers
+    open the new copy (atomic rename).
+    """
+    db.conn.execute("CHECKPOINT")
+    target = snapshot_path(db.db_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.tmp"
+    shutil.copyfile(db.db_path, tmp_path)
+    os.replace(tmp_path, target)
+    print(f"📸 Published reader snapshot {target}")
+
+
+class DirectWriter(TimeSeriesDB):
+    """
+    TimeSeriesDB of the 'direct' mode: close() publishes the reader
+    snapshot if anything was written, so snapshot readers are not left on
+    the copy of an earlier queued run.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        super().__init__(db_path)
+        self._written = False
+
+    def upsert_batches(self, *args, **kwargs):
+        written = super().upsert_batches(*args, **kwargs)
+        self._written = self._written or written > 0
+        return written
+
+    def write_series(self, *args, **kwargs):
+        written = super().write_series(*args, **kwargs)
+        self._written = self._written or written > 0
+        return written
+
+    def close(self):
+        """Publish the reader snapshot (after writes) and release the connection."""
+        if self.conn is not None and self._written:
+            try:
+                if self._metrics:
+                    with self.transaction():
+                        pass
+                publish_snapshot(self)
+            except Exception as e:
+                print(f"⚠️ Could not publish reader snapshot: {e}")
+            self._written = False
+        super().close()
+
+
+class QueuedWriter:
+    """
+    TimeSeriesDB stand-in for pipeline stages: upsert_data and write_series
+    queue the batch instead of opening the database. Writes inside
+    transaction() are queued together and applied in one transaction.
+    """
+
+    def __init__(self, db_path=DB_PATH, drain_on_close=True):
+        """
+        Args:
+            db_path: Database the batches are written to
+            drain_on_close: Apply the queue in close() (False when a writer
+                service drains it)
+        """
+        self.db_path = db_path
+        self.queue = WriteQueue(db_path)
+        self.drain_on_close = drain_on_close
+        self._pending = None       # (table, request) of the open transaction()
+        print(f"📨 Queuing writes for {db_path}")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Queue the writes of the block as one transaction (see
+        TimeSeriesDB.transaction). Nothing is queued if the block raises.
+        """
+        if self._pending is not None:
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+            txn = {'id': uuid.uuid4().hex, 'size': len(self._pending)}
+            for table, request in self._pending:
+                self.queue.submit(table, dict(request, txn=txn))
+        finally:
+            self._pending = None
+
+    def _submit(self, table, request):
+        if self._pending is not None:
+            self._pending.append((table, request))
+        else:
+            self.queue.submit(table, request)
+
+    def upsert_data(self, df, table_name, key_col='record_date', primary_key=None, index_col=None):
+        """Queue an upsert (see TimeSeriesDB.upsert_data). Returns queued rows."""
+        if not isinstance(df, pa.Table) and index_col is None:
+            if key_col not in df.columns and df.index.name == key_col:
+                index_col = key_col
+        table = to_arrow_table(df, index_col)
+        if table.num_rows == 0:
+            print("⚠️ No data to upsert.")
+            return 0
+        self._submit(table, {
+            'op': 'upsert',
+            'table': table_name,
+            'key_col': key_col,
+            'primary_key': [primary_key] if isinstance(primary_key, str) else primary_key,
+        })
+        print(f"📨 Queued {table.num_rows} records for '{table_name}'")
+        return table.num_rows
+
+    def write_series(self, df, source, date_col='record_date', columns=None, vintage=None):
+        """Queue a series store write (see TimeSeriesDB.write_series). Returns queued rows."""
+        index_col = None
+        if not isinstance(df, pa.Table) and date_col not in df.columns and df.index.name == date_col:
+            index_col = date_col
+        table = to_arrow_table(df, index_col)
+        if table.num_rows == 0:
+            return 0
+        self._submit(table, {
+            'op': 'series',
+            'source': source,
+            'date_col': date_col,
+            'columns': list(columns) if columns is not None else None,
+            # Vintage of the stage run, not of the drain
+            'vintage': pd.Timestamp(vintage or datetime.now()).isoformat(),
+        })
+        return table.num_rows
+
+    def close(self):
+        """Drain the queue unless a writer service does."""
+        if self.drain_on_close:
+            self.queue.drain()
+
+
+def open_writer(db_path=DB_PATH, mode=None):
+    """
+    Database handle for a pipeline stage.
+
+    Args:
+        db_path: Database file
+        mode: 'direct', 'queue' or 'service' (defaults to TREASURY_DB_WRITER)
+
+    Returns:
+        DirectWriter ('direct') or QueuedWriter
+    """
+    mode = mode or WRITER_MODE
+    if mode == 'direct':
+        return DirectWriter(db_path)
+    if mode not in ('queue', 'service'):
+        raise ValueError(f"Unknown writer mode '{mode}' (expected direct, queue or service)")
+    return QueuedWriter(db_path, drain_on_close=(mode == 'queue'))
+
+
+def open_snapshot(db_path=DB_PATH):
+    """
+    Read-only handle for readers that must not block on the writer.
+
+    Opens the last published snapshot, or the database itself (read-only)
+    if no snapshot exists yet.
+    """
+    path = snapshot_path(db_path)
+    return TimeSeriesDB(path if os.path.exists(path) else db_path, read_only=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply queued database writes (single writer)")
+    parser.add_argument("--db", default=DB_PATH, help="Database file")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="Poll the queue every N seconds (default: drain once and exit)")
+    args = parser.parse_args()
+
+    queue = WriteQueue(args.db)
+    if args.interval is None:
+        queue.drain()
+        return
+    print(f"🖊️  Writer service for {args.db} (polling every {args.interval}s, Ctrl+C to stop)")
+    try:
+        while True:
+            if queue.pending():
+                queue.drain()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nWriter service stopped")
+
+
+if __name__ == "__main__":
+    main()